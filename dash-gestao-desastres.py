@@ -10,6 +10,7 @@ from src.evacuation_decision import evacuation_system # Novo: Para suporte à de
 from src.community_support import community_aid_platform # Novo: Para comunidades isoladas
 from src.data_analysis_disaster import disaster_data_analysis # Adaptado de data_science
 from src.ai_predictive_modeling import predictive_ml # Adaptado de detect_images (poderia ser IA para previsão de inundação)
+from src.admin_desempenho import painel_desempenho_bd
 
 
 # Inicializa o estado da sessão para armazenar alertas ou dados históricos, se necessário
@@ -28,6 +29,7 @@ with st.sidebar:
     "3. Plataforma de Apoio a Comunidades Isoladas",
     "4. Análise de Dados Pós-Desastre",
     "5. Modelagem Preditiva e Cenários",
+    "6. Administração e Desempenho do Banco",
 ])
 
 if fase == "1. Monitoramento Ambiental e Alerta de Inundação":
@@ -45,6 +47,9 @@ elif fase == "4. Análise de Dados Pós-Desastre":
          
 elif fase == "5. Modelagem Preditiva e Cenários":
     predictive_ml() # Isso poderia usar IA para prever caminhos de inundação, avaliar riscos e simular cenários
+
+elif fase == "6. Administração e Desempenho do Banco":
+    painel_desempenho_bd() # Consultas mais custosas, pool de conexões e caches
     
 
 # Rodapé opcional
@@ -0,0 +1,78 @@
+"""
+Benchmark de ingestão de leituras: compara o caminho atual (uma conexão e um
+commit por leitura, via `salvar_leitura_no_bd`) com a ingestão em lote
+(`salvar_leituras_em_lote`, usando COPY e INSERT multi-linha).
+
+Uso (a partir da raiz do projeto, com as variáveis PG_* configuradas):
+    python -m scripts.python.benchmark_ingestao --linhas 20000 --linhas-atual 500
+
+As leituras de teste são gravadas com UNIDADE_MEDIDA = 'benchmark' e removidas ao final.
+"""
+import argparse
+import datetime
+import time
+
+import numpy as np
+
+from src.bd_conection import conexao_postgres
+from src.flood_monitoring import salvar_leitura_no_bd
+from src.ingestao_leituras import salvar_leituras_em_lote
+
+UNIDADE_BENCHMARK = 'benchmark'
+
+
+def gerar_lote(sensor_ids, n):
+    """Gera n leituras sintéticas distribuídas entre os sensores informados."""
+    agora = np.datetime64(datetime.datetime.now(), 'us')
+    return (
+        np.resize(np.asarray(sensor_ids), n),
+        np.round(np.random.uniform(0, 10, n), 2),
+        np.full(n, UNIDADE_BENCHMARK),
+        agora - np.arange(n).astype('timedelta64[ms]'),
+    )
+
+def medir(nome, funcao, n):
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<32} {n:>8} linhas  {duracao:8.2f} s  {n / duracao:12.0f} linhas/s")
+    return n / duracao
+
+def limpar():
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM LEITURAS_SENSORES WHERE UNIDADE_MEDIDA = %s", (UNIDADE_BENCHMARK,))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingestão de leituras de sensores.")
+    parser.add_argument("--linhas", type=int, default=20000, help="Linhas por execução em lote.")
+    parser.add_argument("--linhas-atual", type=int, default=500, help="Linhas para o caminho atual (uma por conexão).")
+    parser.add_argument("--tamanho-lote", type=int, default=5000)
+    args = parser.parse_args()
+
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT SENSOR_ID FROM SENSORES_AMBIENTAIS ORDER BY SENSOR_ID")
+            sensor_ids = [row[0] for row in cursor.fetchall()]
+    if not sensor_ids:
+        print("Nenhum sensor cadastrado; cadastre ao menos um sensor antes do benchmark.")
+        return
+
+    try:
+        ids, valores, unidades, timestamps = gerar_lote(sensor_ids, args.linhas_atual)
+        linhas_atual = list(zip(ids.tolist(), valores.tolist(), unidades.tolist(), timestamps.astype(datetime.datetime)))
+        base = medir("Atual (salvar_leitura_no_bd)", lambda: [salvar_leitura_no_bd(*linha) for linha in linhas_atual], args.linhas_atual)
+
+        for metodo in ('values', 'copy'):
+            lote = gerar_lote(sensor_ids, args.linhas)
+            def executar():
+                for inicio in range(0, args.linhas, args.tamanho_lote):
+                    salvar_leituras_em_lote(tuple(a[inicio:inicio + args.tamanho_lote] for a in lote), metodo=metodo)
+            taxa = medir(f"Lote ({metodo}, {args.tamanho_lote}/transação)", executar, args.linhas)
+            print(f"{'':<32} {taxa / base:8.1f}x mais rápido que o caminho atual")
+    finally:
+        limpar()
+
+
+if __name__ == "__main__":
+    main()
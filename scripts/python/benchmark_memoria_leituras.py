@@ -0,0 +1,77 @@
+"""
+Benchmark de memória dos leitores de histórico de leituras.
+
+Compara o carregador anterior (pd.read_sql com o resultado inteiro no cliente,
+colunas de texto como object e VALOR_LIDO como Decimal) com o leitor em blocos
+por cursor no servidor (`iterar_leituras_em_blocos`), tanto concatenando os
+blocos quanto agregando bloco a bloco (memória limitada a um bloco).
+
+Uso (a partir da raiz do projeto, com as variáveis PG_* configuradas):
+    python -m scripts.python.benchmark_memoria_leituras --dias 365 --bloco 50000
+"""
+import argparse
+import datetime
+import gc
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.bd_conection import get_postgres_connection
+from src.utils import iterar_leituras_em_blocos, concatenar_blocos_leituras
+
+
+def carregador_anterior(periodo_dias):
+    """Reprodução do carregador original de `obter_dados_leituras_sensores`."""
+    conn = get_postgres_connection()
+    try:
+        end_date = datetime.datetime.now()
+        start_date = end_date - datetime.timedelta(days=periodo_dias)
+        query = """
+        SELECT l.timestamp_leitura, s.tipo_sensor, s.localizacao_geo, l.valor_lido, l.unidade_medida
+        FROM leituras_sensores l
+        JOIN sensores_ambientais s ON l.sensor_id = s.sensor_id
+        WHERE l.timestamp_leitura BETWEEN %s AND %s
+        ORDER BY l.timestamp_leitura ASC;
+        """
+        df = pd.read_sql(query, conn, params=(start_date, end_date))
+        df.columns = ['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+        return df
+    finally:
+        conn.close()
+
+def media_por_sensor_em_blocos(periodo_dias, tamanho_bloco):
+    """Exemplo de processamento com memória limitada: soma e contagem acumuladas bloco a bloco."""
+    somas = None
+    for bloco in iterar_leituras_em_blocos(periodo_dias, tamanho_bloco):
+        parcial = bloco.groupby(['Tipo Sensor', 'Localização'], observed=True)['Valor Lido'].agg(['sum', 'count'])
+        somas = parcial if somas is None else somas.add(parcial, fill_value=0)
+    return None if somas is None else somas['sum'] / somas['count']
+
+def medir(nome, funcao):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    linhas = len(resultado) if resultado is not None else 0
+    final = resultado.memory_usage(deep=True).sum() / 2**20 if isinstance(resultado, pd.DataFrame) else 0.0
+    print(f"{nome:<38} {linhas:>10} linhas  pico {pico / 2**20:9.1f} MiB  resultado {final:9.1f} MiB  {duracao:7.2f} s")
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória dos leitores de histórico.")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--bloco", type=int, default=50_000)
+    args = parser.parse_args()
+
+    medir("pd.read_sql (anterior)", lambda: carregador_anterior(args.dias))
+    medir("cursor no servidor + concatenação", lambda: concatenar_blocos_leituras(iterar_leituras_em_blocos(args.dias, args.bloco)))
+    medir("cursor no servidor + agregação/bloco", lambda: media_por_sensor_em_blocos(args.dias, args.bloco))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cliente de teste do servidor de ingestão (src/servidor_ingestao.py): simula vários gateways de campo
+enviando lotes de leituras em paralelo, por HTTP (texto) ou UDP (binário).
+
+Cada gateway fica com uma fatia dos sensores e envia, a cada intervalo, um passo da rede sintética
+(src/simulacao_sensores.py) dessa fatia. Ao final, mostra lotes enviados, respostas 202/503 e a
+latência das requisições HTTP.
+
+Uso (a partir da raiz do projeto, com o servidor rodando):
+    python -m scripts.python.cliente_ingestao --gateways 20 --duracao 30 --protocolo http
+    python -m scripts.python.cliente_ingestao --gateways 20 --protocolo udp --sensor-ids 1-500
+
+Sem --sensor-ids, usa os sensores cadastrados em SENSORES_AMBIENTAIS.
+"""
+import argparse
+import asyncio
+import socket
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.servidor_ingestao import codificar_binario
+from src.simulacao_sensores import RedeSensoresSimulada
+
+
+def carregar_sensores(intervalo_ids):
+    if intervalo_ids:
+        inicio, _, fim = intervalo_ids.partition('-')
+        ids = np.arange(int(inicio), int(fim or inicio) + 1)
+        return ids, np.full(len(ids), 'Nível de Água', dtype=object)
+    from src.bd_conection import conexao_postgres
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT SENSOR_ID, TIPO_SENSOR FROM SENSORES_AMBIENTAIS WHERE STATUS_OPERACIONAL <> 'INATIVO'")
+            linhas = cursor.fetchall()
+    ids, tipos = zip(*linhas)
+    return np.array(ids), np.array(tipos, dtype=object)
+
+def corpo_texto(ids, valores, timestamps):
+    return "\n".join(f"{s},{v},{t:.3f}" for s, v, t in zip(ids.tolist(), valores.tolist(), timestamps.tolist())).encode()
+
+
+async def gateway_http(rede, host, porta, duracao, intervalo, resultados, latencias):
+    reader, writer = await asyncio.open_connection(host, porta)
+    fim = time.monotonic() + duracao
+    try:
+        while time.monotonic() < fim:
+            ids, valores, _, _ = rede.passo()
+            corpo = corpo_texto(ids, valores, np.full(len(ids), time.time()))
+            inicio = time.perf_counter()
+            writer.write(f"POST /leituras HTTP/1.1\r\nHost: {host}\r\nContent-Type: text/plain\r\n"
+                         f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            tamanho = 0
+            while (linha := await reader.readline()) not in (b'\r\n', b''):
+                if linha.lower().startswith(b'content-length:'):
+                    tamanho = int(linha.split(b':')[1])
+            await reader.readexactly(tamanho)
+            latencias.append(time.perf_counter() - inicio)
+            resultados[status] += 1
+            resultados['leituras'] += len(ids)
+            await asyncio.sleep(intervalo)
+    finally:
+        writer.close()
+
+async def gateway_udp(rede, host, porta, duracao, intervalo, resultados):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        fim = time.monotonic() + duracao
+        while time.monotonic() < fim:
+            ids, valores, _, _ = rede.passo()
+            # Datagramas de até ~60 KB: 3000 registros de 20 bytes
+            for inicio in range(0, len(ids), 3000):
+                parte = slice(inicio, inicio + 3000)
+                sock.sendto(codificar_binario(ids[parte], valores[parte], np.full(len(ids[parte]), time.time())), (host, porta))
+                resultados['datagramas'] += 1
+            resultados['leituras'] += len(ids)
+            await asyncio.sleep(intervalo)
+
+
+async def executar(args):
+    ids, tipos = carregar_sensores(args.sensor_ids)
+    fatias = np.array_split(np.arange(len(ids)), args.gateways)
+    resultados, latencias = Counter(), []
+    tarefas = []
+    for i, fatia in enumerate(fatias):
+        rede = RedeSensoresSimulada(ids[fatia], tipos[fatia], passo_s=args.intervalo, semente=i)
+        if args.protocolo == 'http':
+            tarefas.append(gateway_http(rede, args.host, args.porta, args.duracao, args.intervalo, resultados, latencias))
+        else:
+            tarefas.append(gateway_udp(rede, args.host, args.porta, args.duracao, args.intervalo, resultados))
+    inicio = time.perf_counter()
+    await asyncio.gather(*tarefas)
+    segundos = time.perf_counter() - inicio
+
+    print(f"{args.gateways} gateways, {len(ids)} sensores, {segundos:.1f} s")
+    print(f"Leituras enviadas: {resultados['leituras']} ({resultados['leituras'] / segundos:,.0f}/s)")
+    if args.protocolo == 'http':
+        print(f"Respostas: 202={resultados[202]}  503={resultados[503]}  400={resultados[400]}")
+        if latencias:
+            ms = np.array(latencias) * 1000
+            print(f"Latência HTTP: p50 {np.percentile(ms, 50):.1f} ms  p95 {np.percentile(ms, 95):.1f} ms  máx {ms.max():.1f} ms")
+    else:
+        print(f"Datagramas enviados: {resultados['datagramas']} (confira perdas em GET /saude)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateways simulados para o servidor de ingestão.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=None, help="Padrão: 8080 (HTTP) ou 9999 (UDP).")
+    parser.add_argument("--protocolo", choices=["http", "udp"], default="http")
+    parser.add_argument("--gateways", type=int, default=10)
+    parser.add_argument("--duracao", type=float, default=30.0)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre lotes de cada gateway.")
+    parser.add_argument("--sensor-ids", help="Faixa de IDs (ex.: 1-500) em vez dos sensores do banco.")
+    args = parser.parse_args()
+    args.porta = args.porta or (8080 if args.protocolo == 'http' else 9999)
+    asyncio.run(executar(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Teste de carga do pipeline de monitoramento com a rede de sensores sintética (src/simulacao_sensores.py).
+
+Cadastra N sensores temporários, gera os passos da rede o mais rápido possível (ou numa taxa fixa),
+envia cada passo ao IngestorLeituras (COPY em lote) e, opcionalmente, ao motor de alertas.
+Mede a vazão de ponta a ponta e a latência entre a geração de cada passo e a gravação da última
+leitura dele no banco.
+
+Uso (a partir da raiz do projeto, com as variáveis PG_* configuradas):
+    python -m scripts.python.teste_carga_monitoramento --sensores 5000 --duracao 60
+    python -m scripts.python.teste_carga_monitoramento --sensores 5000 --somente-geracao
+
+Os sensores de teste são cadastrados com DESCRICAO = 'carga-sintetica' e removidos ao final
+(junto com leituras, agregados e alertas), a menos que --manter seja informado.
+"""
+import argparse
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from src.bd_conection import conexao_postgres
+from src.ingestao_leituras import IngestorLeituras
+from src.motor_alertas import MotorAlertas
+from src.simulacao_sensores import RedeSensoresSimulada, TaxasFalha, TIPOS_SIMULADOS, PROPORCAO_TIPOS_PADRAO
+
+DESCRICAO_TESTE = 'carga-sintetica'
+
+
+def cadastrar_sensores(n):
+    """Cadastra n sensores de teste; retorna (ids, tipos, localizações)."""
+    tipos = np.random.default_rng(0).choice(np.array(TIPOS_SIMULADOS, dtype=object), size=n, p=PROPORCAO_TIPOS_PADRAO)
+    lat = np.random.uniform(-5.3, -4.9, n)
+    lon = np.random.uniform(-43.0, -42.6, n)
+    linhas = [(tipo, f"Lat:{la:.5f}, Lon:{lo:.5f}, Sensor sintético {i}", DESCRICAO_TESTE)
+              for i, (tipo, la, lo) in enumerate(zip(tipos, lat, lon))]
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            retorno = execute_values(cursor, """
+                INSERT INTO SENSORES_AMBIENTAIS (TIPO_SENSOR, LOCALIZACAO_GEO, DESCRICAO) VALUES %s
+                RETURNING SENSOR_ID, TIPO_SENSOR, LOCALIZACAO_GEO
+            """, linhas, page_size=len(linhas), fetch=True)
+    ids, tipos, localizacoes = zip(*retorno)
+    return np.array(ids), np.array(tipos, dtype=object), list(localizacoes)
+
+def remover_sensores():
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT ARRAY_AGG(SENSOR_ID) FROM SENSORES_AMBIENTAIS WHERE DESCRICAO = %s", (DESCRICAO_TESTE,))
+            ids = cursor.fetchone()[0] or []
+            if not ids:
+                return 0
+            for tabela in ('ALERTAS_DESASTRE', 'LEITURAS_SENSORES', 'LEITURAS_SENSORES_HORA', 'LEITURAS_SENSORES_DIA', 'SENSORES_AMBIENTAIS'):
+                cursor.execute(f"DELETE FROM {tabela} WHERE SENSOR_ID = ANY(%s)", (ids,))
+    return len(ids)
+
+
+class MedidorLatencia:
+    """Acompanha `linhas_gravadas` do ingestor e mede quanto cada passo levou até estar todo no banco."""
+
+    def __init__(self, ingestor):
+        self.ingestor = ingestor
+        self._pendentes = deque()     # (total acumulado de linhas até o passo, instante da geração)
+        self._lock = threading.Lock()
+        self.latencias = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def registrar(self, acumulado, instante):
+        with self._lock:
+            self._pendentes.append((acumulado, instante))
+
+    def _verificar(self):
+        gravadas = self.ingestor.linhas_gravadas + self.ingestor.descartadas
+        agora = time.perf_counter()
+        with self._lock:
+            while self._pendentes and self._pendentes[0][0] <= gravadas:
+                self.latencias.append(agora - self._pendentes.popleft()[1])
+
+    def _loop(self):
+        while not self._parar.wait(0.005):
+            self._verificar()
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        self._verificar()
+
+    def resumo(self):
+        if not self.latencias:
+            return "sem amostras"
+        ms = np.array(self.latencias) * 1000
+        return f"p50 {np.percentile(ms, 50):.0f} ms  p95 {np.percentile(ms, 95):.0f} ms  máx {ms.max():.0f} ms ({len(ms)} passos)"
+
+
+def executar(rede, duracao, taxa, ingestor=None, motor=None, infos=None):
+    """Gera passos por `duracao` segundos; retorna (passos, leituras, transições de alerta, segundos)."""
+    medidor = MedidorLatencia(ingestor).iniciar() if ingestor else None
+    passos = leituras = transicoes = 0
+    inicio = time.perf_counter()
+    try:
+        while time.perf_counter() - inicio < duracao:
+            instante = time.perf_counter()
+            lote = rede.passo()
+            leituras += len(lote[0])
+            if ingestor:
+                ingestor.adicionar_lote(lote)
+                medidor.registrar(leituras, instante)
+            if motor:
+                lidos = [(infos[s], v) for s, v in zip(lote[0].tolist(), lote[1].tolist())]
+                resultado = motor.processar(lidos, rede.momento)
+                motor.gravar()
+                transicoes += len(resultado)
+            passos += 1
+            if taxa:
+                time.sleep(max(0.0, instante + 1 / taxa - time.perf_counter()))
+        if ingestor:
+            ingestor.flush()
+    finally:
+        if medidor:
+            medidor.parar()
+    return passos, leituras, transicoes, time.perf_counter() - inicio, medidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do pipeline de monitoramento com sensores sintéticos.")
+    parser.add_argument("--sensores", type=int, default=2000)
+    parser.add_argument("--duracao", type=float, default=30.0, help="Segundos de execução.")
+    parser.add_argument("--taxa", type=float, default=0.0, help="Passos da rede por segundo (0 = o mais rápido possível).")
+    parser.add_argument("--passo", type=float, default=10.0, help="Segundos simulados por passo.")
+    parser.add_argument("--tamanho-lote", type=int, default=5000)
+    parser.add_argument("--dropout", type=float, default=0.01)
+    parser.add_argument("--pico", type=float, default=0.002)
+    parser.add_argument("--alertas", action="store_true", help="Passa as leituras também pelo motor de alertas.")
+    parser.add_argument("--somente-geracao", action="store_true", help="Mede só o gerador, sem banco.")
+    parser.add_argument("--manter", action="store_true", help="Não remove os sensores e leituras de teste.")
+    args = parser.parse_args()
+
+    falhas = TaxasFalha(dropout=args.dropout, pico=args.pico)
+    if args.somente_geracao:
+        rede = RedeSensoresSimulada.sintetica(args.sensores, passo_s=args.passo, falhas=falhas, semente=0)
+        passos, leituras, _, segundos, _ = executar(rede, args.duracao, args.taxa)
+        print(f"Geração: {passos} passos, {leituras} leituras em {segundos:.1f} s = {leituras / segundos:,.0f} leituras/s")
+        return
+
+    ids, tipos, localizacoes = cadastrar_sensores(args.sensores)
+    try:
+        rede = RedeSensoresSimulada(ids, tipos, passo_s=args.passo, falhas=falhas, semente=0)
+        ingestor = IngestorLeituras(tamanho_lote=args.tamanho_lote).iniciar()
+        motor = infos = None
+        if args.alertas:
+            motor = MotorAlertas(permanencia_descida=0, permanencia_resolucao=0)
+            infos = {int(s): {'SENSOR_ID': int(s), 'TIPO_SENSOR': t, 'LOCALIZACAO_GEO': loc}
+                     for s, t, loc in zip(ids, tipos, localizacoes)}
+        passos, leituras, transicoes, segundos, medidor = executar(rede, args.duracao, args.taxa, ingestor, motor, infos)
+        ingestor.parar()
+
+        estat = ingestor.estatisticas()
+        print(f"Sensores: {args.sensores}  passos: {passos}  leituras geradas: {leituras}")
+        print(f"Gravadas: {estat['linhas_gravadas']} em {estat['lotes_gravados']} lotes "
+              f"({estat['falhas']} falhas, {estat['descartadas']} descartadas)")
+        print(f"Vazão: {estat['linhas_gravadas'] / segundos:,.0f} leituras/s")
+        print(f"Latência geração -> banco: {medidor.resumo()}")
+        if motor:
+            print(f"Alertas: {transicoes} transições; {motor.estatisticas()}")
+    finally:
+        if not args.manter:
+            print(f"{remover_sensores()} sensores de teste removidos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Teste do despacho assíncrono de alertas (src/despacho_alertas.py) contra servidores locais de mentira.
+
+Sobe, no próprio processo, um servidor SMTP mínimo e um servidor HTTP que faz as vezes de webhook
+e de gateway de SMS, ambos com atraso e taxa de falha configuráveis. Gera alertas com
+`gerar_alerta` (parte deles repetidos, para exercitar a deduplicação), mede quanto tempo cada
+chamada a `enviar` segura quem gera o alerta e, ao final, mostra entregas, repetições, falhas e a
+latência de entrega por destino.
+
+Uso (a partir da raiz do projeto; não precisa de banco):
+    python -m scripts.python.teste_despacho_alertas --alertas 2000 --atraso 0.5 --taxa-falha 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.classificacao_alertas import NIVEIS_ALERTA
+from src.despacho_alertas import DespachanteAlertas, DestinoArquivo, DestinoSMS, DestinoSMTP, DestinoWebhook
+from src.flood_monitoring import gerar_alerta
+
+
+class ServidoresLocais:
+    """SMTP e HTTP locais num loop asyncio em thread própria, com atraso e falhas injetadas."""
+
+    def __init__(self, atraso, taxa_falha):
+        self.atraso = atraso
+        self.taxa_falha = taxa_falha
+        self.recebidos = Counter()
+        self.loop = asyncio.new_event_loop()
+        self.portas = {}
+
+    async def _http(self, reader, writer):
+        try:
+            requisicao = await reader.readline()
+            tamanho = 0
+            while (linha := await reader.readline()) not in (b'\r\n', b''):
+                if linha.lower().startswith(b'content-length:'):
+                    tamanho = int(linha.split(b':')[1])
+            await reader.readexactly(tamanho)
+            await asyncio.sleep(self.atraso)
+            caminho = requisicao.split()[1].decode()
+            if random.random() < self.taxa_falha:
+                status = b'500 Internal Server Error'
+                self.recebidos[f'{caminho} 500'] += 1
+            else:
+                status = b'200 OK'
+                self.recebidos[caminho] += 1
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _smtp(self, reader, writer):
+        responder = lambda texto: writer.write(texto.encode() + b'\r\n')
+        try:
+            responder("220 localhost SMTP de teste")
+            while linha := await reader.readline():
+                comando = linha.decode(errors='replace').strip().upper()
+                if comando.startswith(('EHLO', 'HELO')):
+                    responder("250 localhost")
+                elif comando.startswith('DATA'):
+                    responder("354 fim com <CRLF>.<CRLF>")
+                    while (linha := await reader.readline()) not in (b'.\r\n', b''):
+                        pass
+                    await asyncio.sleep(self.atraso)
+                    if random.random() < self.taxa_falha:
+                        self.recebidos['smtp 451'] += 1
+                        responder("451 falha temporária")
+                    else:
+                        self.recebidos['smtp'] += 1
+                        responder("250 aceito")
+                elif comando.startswith('QUIT'):
+                    responder("221 tchau")
+                    break
+                else:
+                    responder("250 ok")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _subir(self):
+        http = await asyncio.start_server(self._http, '127.0.0.1', 0)
+        smtp = await asyncio.start_server(self._smtp, '127.0.0.1', 0)
+        self.portas = {'http': http.sockets[0].getsockname()[1], 'smtp': smtp.sockets[0].getsockname()[1]}
+
+    def iniciar(self):
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._subir(), self.loop).result()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste do despacho de alertas com servidores locais.")
+    parser.add_argument("--alertas", type=int, default=1000)
+    parser.add_argument("--locais", type=int, default=200, help="Locais distintos; alertas repetidos são deduplicados.")
+    parser.add_argument("--taxa", type=float, default=500.0, help="Alertas gerados por segundo.")
+    parser.add_argument("--atraso", type=float, default=0.2, help="Segundos que os servidores levam para responder.")
+    parser.add_argument("--taxa-falha", type=float, default=0.1, help="Fração das entregas que os servidores recusam.")
+    parser.add_argument("--espera-final", type=float, default=30.0, help="Segundos para esvaziar as filas ao final.")
+    args = parser.parse_args()
+
+    servidores = ServidoresLocais(args.atraso, args.taxa_falha).iniciar()
+    arquivo = os.path.join(tempfile.mkdtemp(), "alertas.jsonl")
+    base = f"http://127.0.0.1:{servidores.portas['http']}"
+    destinos = [
+        DestinoSMTP('127.0.0.1', servidores.portas['smtp'], 'alertas@localhost', ['defesa.civil@localhost']),
+        DestinoWebhook(f"{base}/webhook"),
+        DestinoSMS(f"{base}/sms", ['+5586999990000']),
+        DestinoArquivo(arquivo),
+    ]
+    despachante = DespachanteAlertas(destinos, espera_base=0.2).iniciar()
+
+    rng = np.random.default_rng(0)
+    chamadas = []
+    inicio = time.perf_counter()
+    for i in range(args.alertas):
+        nivel = NIVEIS_ALERTA[rng.integers(1, len(NIVEIS_ALERTA))]
+        alerta = gerar_alerta('Nível de Água', nivel, round(float(rng.uniform(2, 8)), 2), 'm', f"Local {rng.integers(args.locais)}")
+        antes = time.perf_counter()
+        despachante.enviar({**alerta, 'Evento': 'ABERTO'})
+        chamadas.append(time.perf_counter() - antes)
+        time.sleep(max(0.0, inicio + (i + 1) / args.taxa - time.perf_counter()))
+    geracao = time.perf_counter() - inicio
+    despachante.parar(timeout=args.espera_final)
+
+    us = np.array(chamadas) * 1e6
+    estat = despachante.estatisticas()
+    print(f"{args.alertas} alertas gerados em {geracao:.1f} s ({estat['duplicados']} duplicados descartados)")
+    print(f"Tempo de enviar(): p50 {np.percentile(us, 50):.0f} µs  p99 {np.percentile(us, 99):.0f} µs  máx {us.max():.0f} µs")
+    for nome, d in estat['destinos'].items():
+        print(f"{nome:8s} entregues {d['entregues']:6d} em {d['lotes']:4d} lotes  repetições {d['repeticoes']:4d}  "
+              f"falhas {d['falhas']:4d}  descartados {d['descartados']:4d}  "
+              f"latência p50 {d['latencia_p50_ms']} ms  p95 {d['latencia_p95_ms']} ms  máx {d['latencia_max_ms']} ms")
+    print(f"Recebido pelos servidores locais: {dict(servidores.recebidos)}")
+    print(f"Arquivo de alertas: {arquivo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,156 @@ CREATE TABLE SENSORES_AMBIENTAIS (
     SENSOR_ID         SERIAL PRIMARY KEY,
     TIPO_SENSOR       VARCHAR(50) NOT NULL, -- Ex: "Nível de Água", "Pluviômetro", "Umidade do Solo"
     LOCALIZACAO_GEO   VARCHAR(255),          -- Coordenadas geográficas (latitude, longitude) ou descrição do local
+    LATITUDE          DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),     -- Preenchidas a partir de LOCALIZACAO_GEO (ver 11.)
+    LONGITUDE         DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180),
     DESCRICAO         VARCHAR(500),
     STATUS_OPERACIONAL VARCHAR(20) DEFAULT 'ATIVO' NOT NULL CHECK (STATUS_OPERACIONAL IN ('ATIVO', 'INATIVO', 'MANUTENCAO')),
     DATA_INSTALACAO   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- 2. Tabela para armazenar leituras dos sensores (Monitoramento Ambiental)
+-- Particionada por mês em TIMESTAMP_LEITURA: consultas por período só varrem os meses envolvidos.
+-- A chave primária precisa incluir a coluna de particionamento.
 CREATE TABLE LEITURAS_SENSORES (
-    LEITURA_ID        SERIAL PRIMARY KEY,
+    LEITURA_ID        SERIAL,
     SENSOR_ID         INTEGER NOT NULL,
     VALOR_LIDO        NUMERIC NOT NULL,
     UNIDADE_MEDIDA    VARCHAR(20),           -- Ex: "m", "mm", "%"
     TIMESTAMP_LEITURA TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT PK_LEITURAS_SENSORES PRIMARY KEY (LEITURA_ID, TIMESTAMP_LEITURA),
     CONSTRAINT FK_LEITURAS_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
+) PARTITION BY RANGE (TIMESTAMP_LEITURA);
+
+-- Partição padrão para leituras fora dos meses já criados
+CREATE TABLE LEITURAS_SENSORES_PADRAO PARTITION OF LEITURAS_SENSORES DEFAULT;
+
+-- Cria (se ainda não existirem) as partições mensais a partir de um mês inicial.
+-- Deve ser executada periodicamente (ex.: mensalmente via pg_cron) para manter meses futuros criados.
+CREATE OR REPLACE FUNCTION CRIAR_PARTICOES_LEITURAS(MES_INICIAL DATE, QTD_MESES INTEGER) RETURNS VOID AS $$
+DECLARE
+    MES DATE;
+BEGIN
+    FOR I IN 0..QTD_MESES - 1 LOOP
+        MES := (DATE_TRUNC('month', MES_INICIAL) + MAKE_INTERVAL(MONTHS => I))::DATE;
+        EXECUTE FORMAT(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF LEITURAS_SENSORES FOR VALUES FROM (%L) TO (%L)',
+            'leituras_sensores_' || TO_CHAR(MES, 'YYYY_MM'),
+            MES,
+            (MES + INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Um ano para trás (dados históricos de exemplo) e um ano à frente
+SELECT CRIAR_PARTICOES_LEITURAS((CURRENT_DATE - INTERVAL '12 months')::DATE, 25);
+
+-- 2.1. Agregados horários e diários das leituras, mantidos por trigger a cada INSERT/UPDATE/DELETE.
+-- Consultas de tendência e o treinamento de modelos leem estes agregados em vez das leituras brutas.
+CREATE TABLE LEITURAS_SENSORES_HORA (
+    SENSOR_ID         INTEGER NOT NULL,
+    HORA              TIMESTAMP NOT NULL,
+    SOMA              DOUBLE PRECISION NOT NULL,
+    CONTAGEM          INTEGER NOT NULL,
+    MINIMO            DOUBLE PRECISION NOT NULL,
+    MAXIMO            DOUBLE PRECISION NOT NULL,
+    MEDIA             DOUBLE PRECISION GENERATED ALWAYS AS (SOMA / CONTAGEM) STORED,
+    UNIDADE_MEDIDA    VARCHAR(20),
+    CONSTRAINT PK_LEITURAS_HORA PRIMARY KEY (SENSOR_ID, HORA),
+    CONSTRAINT FK_LEITURAS_HORA_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
+);
+
+CREATE TABLE LEITURAS_SENSORES_DIA (
+    SENSOR_ID         INTEGER NOT NULL,
+    DIA               TIMESTAMP NOT NULL,
+    SOMA              DOUBLE PRECISION NOT NULL,
+    CONTAGEM          INTEGER NOT NULL,
+    MINIMO            DOUBLE PRECISION NOT NULL,
+    MAXIMO            DOUBLE PRECISION NOT NULL,
+    MEDIA             DOUBLE PRECISION GENERATED ALWAYS AS (SOMA / CONTAGEM) STORED,
+    UNIDADE_MEDIDA    VARCHAR(20),
+    CONSTRAINT PK_LEITURAS_DIA PRIMARY KEY (SENSOR_ID, DIA),
+    CONSTRAINT FK_LEITURAS_DIA_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
 );
 
+-- Inserções: soma as novas leituras aos agregados existentes (um único upsert por comando, não por linha)
+CREATE OR REPLACE FUNCTION ACUMULAR_AGREGADOS_LEITURAS() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO LEITURAS_SENSORES_HORA AS A (SENSOR_ID, HORA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA), SUM(VALOR_LIDO), COUNT(*), MIN(VALOR_LIDO), MAX(VALOR_LIDO), MAX(UNIDADE_MEDIDA)
+    FROM NOVAS_LEITURAS
+    GROUP BY 1, 2
+    ON CONFLICT (SENSOR_ID, HORA) DO UPDATE SET
+        SOMA = A.SOMA + EXCLUDED.SOMA,
+        CONTAGEM = A.CONTAGEM + EXCLUDED.CONTAGEM,
+        MINIMO = LEAST(A.MINIMO, EXCLUDED.MINIMO),
+        MAXIMO = GREATEST(A.MAXIMO, EXCLUDED.MAXIMO),
+        UNIDADE_MEDIDA = COALESCE(EXCLUDED.UNIDADE_MEDIDA, A.UNIDADE_MEDIDA);
+
+    INSERT INTO LEITURAS_SENSORES_DIA AS A (SENSOR_ID, DIA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT SENSOR_ID, DATE_TRUNC('day', TIMESTAMP_LEITURA), SUM(VALOR_LIDO), COUNT(*), MIN(VALOR_LIDO), MAX(VALOR_LIDO), MAX(UNIDADE_MEDIDA)
+    FROM NOVAS_LEITURAS
+    GROUP BY 1, 2
+    ON CONFLICT (SENSOR_ID, DIA) DO UPDATE SET
+        SOMA = A.SOMA + EXCLUDED.SOMA,
+        CONTAGEM = A.CONTAGEM + EXCLUDED.CONTAGEM,
+        MINIMO = LEAST(A.MINIMO, EXCLUDED.MINIMO),
+        MAXIMO = GREATEST(A.MAXIMO, EXCLUDED.MAXIMO),
+        UNIDADE_MEDIDA = COALESCE(EXCLUDED.UNIDADE_MEDIDA, A.UNIDADE_MEDIDA);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Remoções/alterações: mínimo e máximo não podem ser "desfeitos", então os períodos afetados são recalculados
+CREATE OR REPLACE FUNCTION RECALCULAR_AGREGADOS_LEITURAS() RETURNS TRIGGER AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS PERIODOS_AFETADOS (SENSOR_ID INTEGER, HORA TIMESTAMP) ON COMMIT DROP;
+    TRUNCATE PERIODOS_AFETADOS;
+    INSERT INTO PERIODOS_AFETADOS
+    SELECT DISTINCT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA) FROM LEITURAS_ALTERADAS;
+    IF TG_OP = 'UPDATE' THEN
+        -- Se o timestamp ou o sensor mudou, o período de destino também precisa ser recalculado
+        INSERT INTO PERIODOS_AFETADOS
+        SELECT DISTINCT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA) FROM NOVAS_LEITURAS;
+    END IF;
+
+    DELETE FROM LEITURAS_SENSORES_HORA A USING PERIODOS_AFETADOS P
+    WHERE A.SENSOR_ID = P.SENSOR_ID AND A.HORA = P.HORA;
+    INSERT INTO LEITURAS_SENSORES_HORA (SENSOR_ID, HORA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT L.SENSOR_ID, DATE_TRUNC('hour', L.TIMESTAMP_LEITURA), SUM(L.VALOR_LIDO), COUNT(*), MIN(L.VALOR_LIDO), MAX(L.VALOR_LIDO), MAX(L.UNIDADE_MEDIDA)
+    FROM LEITURAS_SENSORES L
+    JOIN (SELECT DISTINCT SENSOR_ID, HORA FROM PERIODOS_AFETADOS) P ON L.SENSOR_ID = P.SENSOR_ID
+        AND L.TIMESTAMP_LEITURA >= P.HORA AND L.TIMESTAMP_LEITURA < P.HORA + INTERVAL '1 hour'
+    GROUP BY 1, 2;
+
+    DELETE FROM LEITURAS_SENSORES_DIA A
+    USING (SELECT DISTINCT SENSOR_ID, DATE_TRUNC('day', HORA) AS DIA FROM PERIODOS_AFETADOS) P
+    WHERE A.SENSOR_ID = P.SENSOR_ID AND A.DIA = P.DIA;
+    INSERT INTO LEITURAS_SENSORES_DIA (SENSOR_ID, DIA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT H.SENSOR_ID, DATE_TRUNC('day', H.HORA), SUM(H.SOMA), SUM(H.CONTAGEM), MIN(H.MINIMO), MAX(H.MAXIMO), MAX(H.UNIDADE_MEDIDA)
+    FROM LEITURAS_SENSORES_HORA H
+    JOIN (SELECT DISTINCT SENSOR_ID, DATE_TRUNC('day', HORA) AS DIA FROM PERIODOS_AFETADOS) P
+        ON H.SENSOR_ID = P.SENSOR_ID AND H.HORA >= P.DIA AND H.HORA < P.DIA + INTERVAL '1 day'
+    GROUP BY 1, 2;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_INSERT
+AFTER INSERT ON LEITURAS_SENSORES
+REFERENCING NEW TABLE AS NOVAS_LEITURAS
+FOR EACH STATEMENT EXECUTE FUNCTION ACUMULAR_AGREGADOS_LEITURAS();
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_DELETE
+AFTER DELETE ON LEITURAS_SENSORES
+REFERENCING OLD TABLE AS LEITURAS_ALTERADAS
+FOR EACH STATEMENT EXECUTE FUNCTION RECALCULAR_AGREGADOS_LEITURAS();
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_UPDATE
+AFTER UPDATE ON LEITURAS_SENSORES
+REFERENCING OLD TABLE AS LEITURAS_ALTERADAS NEW TABLE AS NOVAS_LEITURAS
+FOR EACH STATEMENT EXECUTE FUNCTION RECALCULAR_AGREGADOS_LEITURAS();
+
 -- 3. Tabela para registrar alertas de desastre (Monitoramento Ambiental e Evacuação)
 CREATE TABLE ALERTAS_DESASTRE (
     ALERTA_ID         SERIAL PRIMARY KEY,
@@ -30,7 +165,9 @@ CREATE TABLE ALERTAS_DESASTRE (
     AREA_AFETADA      VARCHAR(500),          -- Descrição da área ou coordenadas
     RECOMENDACAO      VARCHAR(1000),         -- Ex: "Evacuar áreas de risco", "Procurar abrigo"
     TIMESTAMP_ALERTA  TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    STATUS_ALERTA     VARCHAR(20) DEFAULT 'ATIVO' NOT NULL CHECK (STATUS_ALERTA IN ('ATIVO', 'RESOLVIDO', 'CANCELADO'))
+    STATUS_ALERTA     VARCHAR(20) DEFAULT 'ATIVO' NOT NULL CHECK (STATUS_ALERTA IN ('ATIVO', 'RESOLVIDO', 'CANCELADO')),
+    SENSOR_ID         INTEGER REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE SET NULL, -- Sensor de origem (alertas do motor de alertas)
+    TIMESTAMP_ATUALIZACAO TIMESTAMP          -- Última mudança de nível ou de status
 );
 
 -- 4. Tabela para gerenciar comunidades (Plataforma de Apoio a Comunidades Isoladas)
@@ -38,6 +175,8 @@ CREATE TABLE COMUNIDADES (
     COMUNIDADE_ID     SERIAL PRIMARY KEY,
     NOME_COMUNIDADE   VARCHAR(100) NOT NULL,
     LOCALIZACAO_GEO   VARCHAR(255),
+    LATITUDE          DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),     -- Preenchidas a partir de LOCALIZACAO_GEO (ver 11.)
+    LONGITUDE         DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180),
     POPULACAO_ESTIMADA INTEGER,
     DESCRICAO         VARCHAR(500),
     CONTATO_PRINCIPAL VARCHAR(100)           -- Nome de uma pessoa de contato
@@ -61,7 +200,7 @@ CREATE TABLE RECURSOS (
     RECURSO_ID        SERIAL PRIMARY KEY,
     NOME_RECURSO      VARCHAR(100) NOT NULL, -- Ex: "Kit de Primeiros Socorros", "Barco de Resgate", "Alimentos Enlatados"
     TIPO_RECURSO      VARCHAR(50),           -- Ex: "Equipamento", "Alimento", "Medicamento", "Humano"
-    QUANTIDADE_DISPONIVEL INTEGER DEFAULT 0 NOT NULL,
+    QUANTIDADE_DISPONIVEL INTEGER DEFAULT 0 NOT NULL CONSTRAINT CK_RECURSOS_QUANTIDADE_NAO_NEGATIVA CHECK (QUANTIDADE_DISPONIVEL >= 0),
     UNIDADE           VARCHAR(20),           -- Ex: "unidades", "litros", "kg", "pessoas"
     LOCAL_ARMAZENAMENTO VARCHAR(255)
 );
@@ -93,6 +232,8 @@ CREATE TABLE ABRIGOS (
     ABRIGO_ID         SERIAL PRIMARY KEY,
     NOME_ABRIGO       VARCHAR(100) NOT NULL,
     LOCALIZACAO_GEO   VARCHAR(255),
+    LATITUDE          DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),     -- Preenchidas a partir de LOCALIZACAO_GEO (ver 11.)
+    LONGITUDE         DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180),
     CAPACIDADE_MAXIMA INTEGER,
     CAPACIDADE_ATUAL  INTEGER DEFAULT 0,
     ENDERECO          VARCHAR(255),
@@ -105,17 +246,85 @@ CREATE TABLE ABRIGOS (
 CREATE TABLE DADOS_MOBILIDADE (
     DADO_ID           SERIAL PRIMARY KEY,
     LOCALIZACAO_GEO   VARCHAR(255),
+    LATITUDE          DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),     -- Preenchidas a partir de LOCALIZACAO_GEO (ver 11.)
+    LONGITUDE         DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180),
     NIVEL_TRAFEGO     VARCHAR(50),           -- Ex: "BAIXO", "MODERADO", "ALTO", "ENGARRAFADO"
     TEMPO_VIAGEM_ESTIMADO INTEGER,           -- Em minutos
     TIMESTAMP_DADO    TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
 );
 
+-- 11. Coordenadas numéricas das tabelas com localização.
+-- LATITUDE/LONGITUDE são extraídas do texto livre "Lat:-5.09, Lon:-42.81, ..." a cada INSERT ou alteração de LOCALIZACAO_GEO,
+-- para que mapas e consultas espaciais leiam números prontos. Com PostGIS, ST_SetSRID(ST_MakePoint(LONGITUDE, LATITUDE), 4326)
+-- gera a geometria equivalente a partir destas colunas.
+CREATE OR REPLACE FUNCTION EXTRAIR_COORDENADAS_GEO() RETURNS TRIGGER AS $$
+DECLARE
+    PARTES TEXT[];
+BEGIN
+    PARTES := regexp_match(NEW.LOCALIZACAO_GEO, 'Lat:\s*([-+]?[0-9]+(?:\.[0-9]+)?)\s*,\s*Lon:\s*([-+]?[0-9]+(?:\.[0-9]+)?)');
+    IF PARTES IS NOT NULL AND PARTES[1]::DOUBLE PRECISION BETWEEN -90 AND 90 AND PARTES[2]::DOUBLE PRECISION BETWEEN -180 AND 180 THEN
+        NEW.LATITUDE := PARTES[1]::DOUBLE PRECISION;
+        NEW.LONGITUDE := PARTES[2]::DOUBLE PRECISION;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Texto sem coordenadas válidas: as coordenadas antigas deixam de valer
+        NEW.LATITUDE := NULL;
+        NEW.LONGITUDE := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER TRG_SENSORES_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON SENSORES_AMBIENTAIS
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE TRIGGER TRG_COMUNIDADES_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON COMUNIDADES
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE TRIGGER TRG_ABRIGOS_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON ABRIGOS
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE TRIGGER TRG_MOBILIDADE_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON DADOS_MOBILIDADE
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+
+-- 12. Limiares de alerta por tipo de sensor (SENSOR_ID nulo) e, opcionalmente, por sensor (ex.: trecho de rio com margem mais baixa).
+-- Lidos por src/classificacao_alertas.py; o limiar do sensor tem precedência sobre o do tipo.
+CREATE TABLE LIMIARES_ALERTA (
+    LIMIAR_ID         SERIAL PRIMARY KEY,
+    TIPO_SENSOR       VARCHAR(50) NOT NULL,
+    SENSOR_ID         INTEGER REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE CASCADE,
+    LIMIAR_BAIXO      NUMERIC(10, 2) NOT NULL,
+    LIMIAR_MEDIO      NUMERIC(10, 2) NOT NULL,
+    LIMIAR_ALTO       NUMERIC(10, 2) NOT NULL,
+    LIMIAR_CRITICO    NUMERIC(10, 2) NOT NULL,
+    CONSTRAINT CK_LIMIARES_CRESCENTES CHECK (LIMIAR_BAIXO <= LIMIAR_MEDIO AND LIMIAR_MEDIO <= LIMIAR_ALTO AND LIMIAR_ALTO <= LIMIAR_CRITICO),
+    CONSTRAINT UQ_LIMIARES_TIPO_SENSOR UNIQUE NULLS NOT DISTINCT (TIPO_SENSOR, SENSOR_ID)
+);
+
+INSERT INTO LIMIARES_ALERTA (TIPO_SENSOR, SENSOR_ID, LIMIAR_BAIXO, LIMIAR_MEDIO, LIMIAR_ALTO, LIMIAR_CRITICO) VALUES
+('Nível de Água', NULL, 2.0, 3.5, 5.0, 6.5),   -- metros
+('Pluviômetro', NULL, 5, 20, 40, 60);          -- mm/h
+
+-- 13. Saúde dos sensores calculada pelo detector de anomalias (src/deteccao_anomalias.py).
+-- Sensores em FALHA são movidos para STATUS_OPERACIONAL = 'MANUTENCAO' e voltam a 'ATIVO' ao se recuperar.
+CREATE TABLE SAUDE_SENSORES (
+    SENSOR_ID         INTEGER PRIMARY KEY REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE CASCADE,
+    STATUS_SAUDE      VARCHAR(20) NOT NULL CHECK (STATUS_SAUDE IN ('OK', 'SUSPEITO', 'FALHA')),
+    TAXA_ANOMALIAS    NUMERIC(5, 4) NOT NULL,    -- Fração recente de leituras em quarentena (média móvel exponencial)
+    ULTIMO_MOTIVO     VARCHAR(20),               -- FORA_DA_FAIXA, TRAVADO, TAXA ou PICO
+    TIMESTAMP_ATUALIZACAO TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
 -- Índices para melhor desempenho (opcional, mas recomendado para grandes volumes de dados)
-CREATE INDEX IDX_LEITURAS_SENSOR_ID ON LEITURAS_SENSORES (SENSOR_ID);
+-- Em tabela particionada, os índices são criados automaticamente em cada partição
+CREATE INDEX IDX_LEITURAS_SENSOR_TIMESTAMP ON LEITURAS_SENSORES (SENSOR_ID, TIMESTAMP_LEITURA);
 CREATE INDEX IDX_LEITURAS_TIMESTAMP ON LEITURAS_SENSORES (TIMESTAMP_LEITURA);
+CREATE INDEX IDX_LEITURAS_HORA ON LEITURAS_SENSORES_HORA (HORA);
+CREATE INDEX IDX_LEITURAS_DIA ON LEITURAS_SENSORES_DIA (DIA);
 CREATE INDEX IDX_ALERTAS_TIMESTAMP ON ALERTAS_DESASTRE (TIMESTAMP_ALERTA);
-CREATE INDEX IDX_SOLICITACOES_COMUNIDADE ON SOLICITACOES_AJUDA (COMUNIDADE_ID);
-CREATE INDEX IDX_SOLICITACOES_STATUS ON SOLICITACOES_AJUDA (STATUS_SOLICITACAO);
+-- Alertas abertos por sensor (recuperação do estado do motor de alertas)
+CREATE INDEX IDX_ALERTAS_SENSOR_ATIVO ON ALERTAS_DESASTRE (SENSOR_ID) WHERE STATUS_ALERTA = 'ATIVO';
+-- Fila de solicitações: paginação por (TIMESTAMP_SOLICITACAO, SOLICITACAO_ID) decrescente, com ou sem filtros
+CREATE INDEX IDX_SOLICITACOES_TIMESTAMP ON SOLICITACOES_AJUDA (TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+CREATE INDEX IDX_SOLICITACOES_COMUNIDADE ON SOLICITACOES_AJUDA (COMUNIDADE_ID, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+CREATE INDEX IDX_SOLICITACOES_STATUS ON SOLICITACOES_AJUDA (STATUS_SOLICITACAO, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+CREATE INDEX IDX_SOLICITACOES_STATUS_PRIORIDADE ON SOLICITACOES_AJUDA (STATUS_SOLICITACAO, PRIORIDADE, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
 CREATE INDEX IDX_ALOCACAO_SOLICITACAO ON ALOCACAO_RECURSOS (SOLICITACAO_ID);
 CREATE INDEX IDX_ALOCACAO_RECURSO ON ALOCACAO_RECURSOS (RECURSO_ID);
 
@@ -124,6 +333,8 @@ COMMENT ON TABLE SENSORES_AMBIENTAIS IS 'Armazena informações sobre os sensore
 COMMENT ON COLUMN SENSORES_AMBIENTAIS.TIPO_SENSOR IS 'Tipo do sensor, ex: Nível de Água, Pluviômetro.';
 COMMENT ON TABLE LEITURAS_SENSORES IS 'Registra as leituras coletadas pelos sensores ambientais.';
 COMMENT ON COLUMN LEITURAS_SENSORES.VALOR_LIDO IS 'Valor da leitura do sensor.';
+COMMENT ON TABLE LEITURAS_SENSORES_HORA IS 'Agregados horários (soma, contagem, mínimo, máximo, média) das leituras, mantidos por trigger.';
+COMMENT ON TABLE LEITURAS_SENSORES_DIA IS 'Agregados diários (soma, contagem, mínimo, máximo, média) das leituras, mantidos por trigger.';
 COMMENT ON TABLE ALERTAS_DESASTRE IS 'Armazena informações sobre os alertas de desastre emitidos.';
 COMMENT ON COLUMN ALERTAS_DESASTRE.NIVEL_ALERTA IS 'Nível de severidade do alerta: BAIXO, MEDIO, ALTO, CRITICO.';
 COMMENT ON TABLE COMUNIDADES IS 'Detalhes sobre as comunidades que podem ser afetadas ou precisar de apoio.';
@@ -133,6 +344,8 @@ COMMENT ON TABLE ALOCACAO_RECURSOS IS 'Associa recursos específicos a solicita
 COMMENT ON TABLE ROTAS_EVACUACAO IS 'Detalhes sobre rotas de evacuação seguras.';
 COMMENT ON TABLE ABRIGOS IS 'Informações sobre abrigos de emergência.';
 COMMENT ON TABLE DADOS_MOBILIDADE IS 'Dados sobre o tráfego e mobilidade em áreas afetadas ou rotas de evacuação.';
+COMMENT ON TABLE LIMIARES_ALERTA IS 'Limiares de nível de alerta por tipo de sensor e por sensor.';
+COMMENT ON TABLE SAUDE_SENSORES IS 'Saúde de cada sensor segundo a detecção de anomalias das leituras.';
 
 -- Opcional: Criação de um usuário específico para o aplicativo
 /*
@@ -0,0 +1,14 @@
+-- Migração: alertas ligados ao sensor de origem, atualizados no lugar pelo motor de alertas (src/motor_alertas.py).
+-- Para bancos criados com a versão anterior de criar_tabelas.sql.
+-- Os alertas antigos ficam com SENSOR_ID nulo e não são retomados pelo motor; o UPDATE opcional
+-- abaixo encerra os que ficaram ATIVO indefinidamente.
+-- COMPATÍVEL COM POSTGRESQL 16
+
+ALTER TABLE ALERTAS_DESASTRE
+    ADD COLUMN IF NOT EXISTS SENSOR_ID INTEGER REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS TIMESTAMP_ATUALIZACAO TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS IDX_ALERTAS_SENSOR_ATIVO ON ALERTAS_DESASTRE (SENSOR_ID) WHERE STATUS_ALERTA = 'ATIVO';
+
+-- UPDATE ALERTAS_DESASTRE SET STATUS_ALERTA = 'RESOLVIDO', TIMESTAMP_ATUALIZACAO = CURRENT_TIMESTAMP
+-- WHERE STATUS_ALERTA = 'ATIVO' AND SENSOR_ID IS NULL;
@@ -0,0 +1,56 @@
+-- Migração: adiciona LATITUDE/LONGITUDE numéricas às tabelas com LOCALIZACAO_GEO
+-- (SENSORES_AMBIENTAIS, COMUNIDADES, ABRIGOS e DADOS_MOBILIDADE), o trigger que as mantém
+-- e preenche as linhas existentes a partir do texto "Lat:-5.09, Lon:-42.81, ...".
+-- Para bancos criados com a versão anterior de criar_tabelas.sql. Execute o script inteiro numa única transação.
+-- COMPATÍVEL COM POSTGRESQL 16
+
+BEGIN;
+
+-- 1. Colunas numéricas (mesma definição de criar_tabelas.sql)
+ALTER TABLE SENSORES_AMBIENTAIS
+    ADD COLUMN IF NOT EXISTS LATITUDE DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),
+    ADD COLUMN IF NOT EXISTS LONGITUDE DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180);
+ALTER TABLE COMUNIDADES
+    ADD COLUMN IF NOT EXISTS LATITUDE DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),
+    ADD COLUMN IF NOT EXISTS LONGITUDE DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180);
+ALTER TABLE ABRIGOS
+    ADD COLUMN IF NOT EXISTS LATITUDE DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),
+    ADD COLUMN IF NOT EXISTS LONGITUDE DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180);
+ALTER TABLE DADOS_MOBILIDADE
+    ADD COLUMN IF NOT EXISTS LATITUDE DOUBLE PRECISION CHECK (LATITUDE BETWEEN -90 AND 90),
+    ADD COLUMN IF NOT EXISTS LONGITUDE DOUBLE PRECISION CHECK (LONGITUDE BETWEEN -180 AND 180);
+
+-- 2. Função e triggers de sincronização com LOCALIZACAO_GEO
+CREATE OR REPLACE FUNCTION EXTRAIR_COORDENADAS_GEO() RETURNS TRIGGER AS $$
+DECLARE
+    PARTES TEXT[];
+BEGIN
+    PARTES := regexp_match(NEW.LOCALIZACAO_GEO, 'Lat:\s*([-+]?[0-9]+(?:\.[0-9]+)?)\s*,\s*Lon:\s*([-+]?[0-9]+(?:\.[0-9]+)?)');
+    IF PARTES IS NOT NULL AND PARTES[1]::DOUBLE PRECISION BETWEEN -90 AND 90 AND PARTES[2]::DOUBLE PRECISION BETWEEN -180 AND 180 THEN
+        NEW.LATITUDE := PARTES[1]::DOUBLE PRECISION;
+        NEW.LONGITUDE := PARTES[2]::DOUBLE PRECISION;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Texto sem coordenadas válidas: as coordenadas antigas deixam de valer
+        NEW.LATITUDE := NULL;
+        NEW.LONGITUDE := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER TRG_SENSORES_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON SENSORES_AMBIENTAIS
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE OR REPLACE TRIGGER TRG_COMUNIDADES_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON COMUNIDADES
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE OR REPLACE TRIGGER TRG_ABRIGOS_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON ABRIGOS
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+CREATE OR REPLACE TRIGGER TRG_MOBILIDADE_COORDENADAS BEFORE INSERT OR UPDATE OF LOCALIZACAO_GEO ON DADOS_MOBILIDADE
+    FOR EACH ROW EXECUTE FUNCTION EXTRAIR_COORDENADAS_GEO();
+
+-- 3. Preenche as linhas existentes (o UPDATE de LOCALIZACAO_GEO dispara o trigger)
+UPDATE SENSORES_AMBIENTAIS SET LOCALIZACAO_GEO = LOCALIZACAO_GEO WHERE LOCALIZACAO_GEO IS NOT NULL;
+UPDATE COMUNIDADES SET LOCALIZACAO_GEO = LOCALIZACAO_GEO WHERE LOCALIZACAO_GEO IS NOT NULL;
+UPDATE ABRIGOS SET LOCALIZACAO_GEO = LOCALIZACAO_GEO WHERE LOCALIZACAO_GEO IS NOT NULL;
+UPDATE DADOS_MOBILIDADE SET LOCALIZACAO_GEO = LOCALIZACAO_GEO WHERE LOCALIZACAO_GEO IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Migração: impede estoque negativo em RECURSOS (alocações concorrentes).
+-- Para bancos criados com a versão anterior de criar_tabelas.sql.
+-- NOT VALID: a regra vale para toda escrita nova sem exigir que linhas antigas já estejam corretas;
+-- depois de corrigir eventuais saldos negativos, rode o VALIDATE CONSTRAINT abaixo.
+-- COMPATÍVEL COM POSTGRESQL 16
+
+ALTER TABLE RECURSOS
+    ADD CONSTRAINT CK_RECURSOS_QUANTIDADE_NAO_NEGATIVA CHECK (QUANTIDADE_DISPONIVEL >= 0) NOT VALID;
+
+-- UPDATE RECURSOS SET QUANTIDADE_DISPONIVEL = 0 WHERE QUANTIDADE_DISPONIVEL < 0;
+-- ALTER TABLE RECURSOS VALIDATE CONSTRAINT CK_RECURSOS_QUANTIDADE_NAO_NEGATIVA;
@@ -0,0 +1,21 @@
+-- Migração: índices compostos para a fila paginada de SOLICITACOES_AJUDA
+-- (ordem TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC, com filtros por status, prioridade e comunidade).
+-- Para bancos criados com a versão anterior de criar_tabelas.sql.
+-- CONCURRENTLY não bloqueia escritas, mas não pode rodar dentro de uma transação: execute comando a comando (ex.: psql sem -1).
+-- COMPATÍVEL COM POSTGRESQL 16
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS IDX_SOLICITACOES_TIMESTAMP
+    ON SOLICITACOES_AJUDA (TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS IDX_SOLICITACOES_STATUS_PRIORIDADE
+    ON SOLICITACOES_AJUDA (STATUS_SOLICITACAO, PRIORIDADE, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+
+-- Os índices de uma coluna são substituídos pelas versões compostas (que também atendem as buscas antigas)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS IDX_SOLICITACOES_COMUNIDADE_TS
+    ON SOLICITACOES_AJUDA (COMUNIDADE_ID, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+DROP INDEX CONCURRENTLY IF EXISTS IDX_SOLICITACOES_COMUNIDADE;
+ALTER INDEX IDX_SOLICITACOES_COMUNIDADE_TS RENAME TO IDX_SOLICITACOES_COMUNIDADE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS IDX_SOLICITACOES_STATUS_TS
+    ON SOLICITACOES_AJUDA (STATUS_SOLICITACAO, TIMESTAMP_SOLICITACAO DESC, SOLICITACAO_ID DESC);
+DROP INDEX CONCURRENTLY IF EXISTS IDX_SOLICITACOES_STATUS;
+ALTER INDEX IDX_SOLICITACOES_STATUS_TS RENAME TO IDX_SOLICITACOES_STATUS;
@@ -0,0 +1,26 @@
+-- Migração: limiares de alerta configuráveis (tabela LIMIARES_ALERTA).
+-- Para bancos criados com a versão anterior de criar_tabelas.sql.
+-- Os valores inseridos são os limiares fixos usados até aqui; limiares de um sensor específico
+-- entram como linhas com SENSOR_ID preenchido, ex.:
+--   INSERT INTO LIMIARES_ALERTA (TIPO_SENSOR, SENSOR_ID, LIMIAR_BAIXO, LIMIAR_MEDIO, LIMIAR_ALTO, LIMIAR_CRITICO)
+--   VALUES ('Nível de Água', 3, 1.5, 2.5, 4.0, 5.0);
+-- COMPATÍVEL COM POSTGRESQL 16
+
+CREATE TABLE IF NOT EXISTS LIMIARES_ALERTA (
+    LIMIAR_ID         SERIAL PRIMARY KEY,
+    TIPO_SENSOR       VARCHAR(50) NOT NULL,
+    SENSOR_ID         INTEGER REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE CASCADE,
+    LIMIAR_BAIXO      NUMERIC(10, 2) NOT NULL,
+    LIMIAR_MEDIO      NUMERIC(10, 2) NOT NULL,
+    LIMIAR_ALTO       NUMERIC(10, 2) NOT NULL,
+    LIMIAR_CRITICO    NUMERIC(10, 2) NOT NULL,
+    CONSTRAINT CK_LIMIARES_CRESCENTES CHECK (LIMIAR_BAIXO <= LIMIAR_MEDIO AND LIMIAR_MEDIO <= LIMIAR_ALTO AND LIMIAR_ALTO <= LIMIAR_CRITICO),
+    CONSTRAINT UQ_LIMIARES_TIPO_SENSOR UNIQUE NULLS NOT DISTINCT (TIPO_SENSOR, SENSOR_ID)
+);
+
+INSERT INTO LIMIARES_ALERTA (TIPO_SENSOR, SENSOR_ID, LIMIAR_BAIXO, LIMIAR_MEDIO, LIMIAR_ALTO, LIMIAR_CRITICO) VALUES
+('Nível de Água', NULL, 2.0, 3.5, 5.0, 6.5),
+('Pluviômetro', NULL, 5, 20, 40, 60)
+ON CONFLICT ON CONSTRAINT UQ_LIMIARES_TIPO_SENSOR DO NOTHING;
+
+COMMENT ON TABLE LIMIARES_ALERTA IS 'Limiares de nível de alerta por tipo de sensor e por sensor.';
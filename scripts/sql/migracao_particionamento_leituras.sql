@@ -0,0 +1,185 @@
+-- Migração: converte LEITURAS_SENSORES (tabela única) em tabela particionada por mês
+-- e cria os agregados horários/diários mantidos por trigger.
+-- Para bancos criados com a versão anterior de criar_tabelas.sql. Execute o script inteiro numa única transação.
+-- COMPATÍVEL COM POSTGRESQL 16
+
+BEGIN;
+
+-- 1. Preserva a tabela antiga e libera os nomes de índices/constraints
+ALTER TABLE LEITURAS_SENSORES RENAME TO LEITURAS_SENSORES_ANTIGA;
+ALTER TABLE LEITURAS_SENSORES_ANTIGA RENAME CONSTRAINT FK_LEITURAS_SENSOR TO FK_LEITURAS_SENSOR_ANTIGA;
+DROP INDEX IF EXISTS IDX_LEITURAS_SENSOR_ID;
+DROP INDEX IF EXISTS IDX_LEITURAS_TIMESTAMP;
+
+-- 2. Nova estrutura (mesma definição de criar_tabelas.sql)
+-- Particionada por mês em TIMESTAMP_LEITURA: consultas por período só varrem os meses envolvidos.
+-- A chave primária precisa incluir a coluna de particionamento.
+CREATE TABLE LEITURAS_SENSORES (
+    LEITURA_ID        SERIAL,
+    SENSOR_ID         INTEGER NOT NULL,
+    VALOR_LIDO        NUMERIC NOT NULL,
+    UNIDADE_MEDIDA    VARCHAR(20),           -- Ex: "m", "mm", "%"
+    TIMESTAMP_LEITURA TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT PK_LEITURAS_SENSORES PRIMARY KEY (LEITURA_ID, TIMESTAMP_LEITURA),
+    CONSTRAINT FK_LEITURAS_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
+) PARTITION BY RANGE (TIMESTAMP_LEITURA);
+
+-- Partição padrão para leituras fora dos meses já criados
+CREATE TABLE LEITURAS_SENSORES_PADRAO PARTITION OF LEITURAS_SENSORES DEFAULT;
+
+-- Cria (se ainda não existirem) as partições mensais a partir de um mês inicial.
+-- Deve ser executada periodicamente (ex.: mensalmente via pg_cron) para manter meses futuros criados.
+CREATE OR REPLACE FUNCTION CRIAR_PARTICOES_LEITURAS(MES_INICIAL DATE, QTD_MESES INTEGER) RETURNS VOID AS $$
+DECLARE
+    MES DATE;
+BEGIN
+    FOR I IN 0..QTD_MESES - 1 LOOP
+        MES := (DATE_TRUNC('month', MES_INICIAL) + MAKE_INTERVAL(MONTHS => I))::DATE;
+        EXECUTE FORMAT(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF LEITURAS_SENSORES FOR VALUES FROM (%L) TO (%L)',
+            'leituras_sensores_' || TO_CHAR(MES, 'YYYY_MM'),
+            MES,
+            (MES + INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Um ano para trás (dados históricos de exemplo) e um ano à frente
+SELECT CRIAR_PARTICOES_LEITURAS((CURRENT_DATE - INTERVAL '12 months')::DATE, 25);
+
+-- Agregados horários e diários das leituras, mantidos por trigger a cada INSERT/UPDATE/DELETE.
+-- Consultas de tendência e o treinamento de modelos leem estes agregados em vez das leituras brutas.
+CREATE TABLE LEITURAS_SENSORES_HORA (
+    SENSOR_ID         INTEGER NOT NULL,
+    HORA              TIMESTAMP NOT NULL,
+    SOMA              DOUBLE PRECISION NOT NULL,
+    CONTAGEM          INTEGER NOT NULL,
+    MINIMO            DOUBLE PRECISION NOT NULL,
+    MAXIMO            DOUBLE PRECISION NOT NULL,
+    MEDIA             DOUBLE PRECISION GENERATED ALWAYS AS (SOMA / CONTAGEM) STORED,
+    UNIDADE_MEDIDA    VARCHAR(20),
+    CONSTRAINT PK_LEITURAS_HORA PRIMARY KEY (SENSOR_ID, HORA),
+    CONSTRAINT FK_LEITURAS_HORA_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
+);
+
+CREATE TABLE LEITURAS_SENSORES_DIA (
+    SENSOR_ID         INTEGER NOT NULL,
+    DIA               TIMESTAMP NOT NULL,
+    SOMA              DOUBLE PRECISION NOT NULL,
+    CONTAGEM          INTEGER NOT NULL,
+    MINIMO            DOUBLE PRECISION NOT NULL,
+    MAXIMO            DOUBLE PRECISION NOT NULL,
+    MEDIA             DOUBLE PRECISION GENERATED ALWAYS AS (SOMA / CONTAGEM) STORED,
+    UNIDADE_MEDIDA    VARCHAR(20),
+    CONSTRAINT PK_LEITURAS_DIA PRIMARY KEY (SENSOR_ID, DIA),
+    CONSTRAINT FK_LEITURAS_DIA_SENSOR FOREIGN KEY (SENSOR_ID) REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID)
+);
+
+-- Inserções: soma as novas leituras aos agregados existentes (um único upsert por comando, não por linha)
+CREATE OR REPLACE FUNCTION ACUMULAR_AGREGADOS_LEITURAS() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO LEITURAS_SENSORES_HORA AS A (SENSOR_ID, HORA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA), SUM(VALOR_LIDO), COUNT(*), MIN(VALOR_LIDO), MAX(VALOR_LIDO), MAX(UNIDADE_MEDIDA)
+    FROM NOVAS_LEITURAS
+    GROUP BY 1, 2
+    ON CONFLICT (SENSOR_ID, HORA) DO UPDATE SET
+        SOMA = A.SOMA + EXCLUDED.SOMA,
+        CONTAGEM = A.CONTAGEM + EXCLUDED.CONTAGEM,
+        MINIMO = LEAST(A.MINIMO, EXCLUDED.MINIMO),
+        MAXIMO = GREATEST(A.MAXIMO, EXCLUDED.MAXIMO),
+        UNIDADE_MEDIDA = COALESCE(EXCLUDED.UNIDADE_MEDIDA, A.UNIDADE_MEDIDA);
+
+    INSERT INTO LEITURAS_SENSORES_DIA AS A (SENSOR_ID, DIA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT SENSOR_ID, DATE_TRUNC('day', TIMESTAMP_LEITURA), SUM(VALOR_LIDO), COUNT(*), MIN(VALOR_LIDO), MAX(VALOR_LIDO), MAX(UNIDADE_MEDIDA)
+    FROM NOVAS_LEITURAS
+    GROUP BY 1, 2
+    ON CONFLICT (SENSOR_ID, DIA) DO UPDATE SET
+        SOMA = A.SOMA + EXCLUDED.SOMA,
+        CONTAGEM = A.CONTAGEM + EXCLUDED.CONTAGEM,
+        MINIMO = LEAST(A.MINIMO, EXCLUDED.MINIMO),
+        MAXIMO = GREATEST(A.MAXIMO, EXCLUDED.MAXIMO),
+        UNIDADE_MEDIDA = COALESCE(EXCLUDED.UNIDADE_MEDIDA, A.UNIDADE_MEDIDA);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Remoções/alterações: mínimo e máximo não podem ser "desfeitos", então os períodos afetados são recalculados
+CREATE OR REPLACE FUNCTION RECALCULAR_AGREGADOS_LEITURAS() RETURNS TRIGGER AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS PERIODOS_AFETADOS (SENSOR_ID INTEGER, HORA TIMESTAMP) ON COMMIT DROP;
+    TRUNCATE PERIODOS_AFETADOS;
+    INSERT INTO PERIODOS_AFETADOS
+    SELECT DISTINCT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA) FROM LEITURAS_ALTERADAS;
+    IF TG_OP = 'UPDATE' THEN
+        -- Se o timestamp ou o sensor mudou, o período de destino também precisa ser recalculado
+        INSERT INTO PERIODOS_AFETADOS
+        SELECT DISTINCT SENSOR_ID, DATE_TRUNC('hour', TIMESTAMP_LEITURA) FROM NOVAS_LEITURAS;
+    END IF;
+
+    DELETE FROM LEITURAS_SENSORES_HORA A USING PERIODOS_AFETADOS P
+    WHERE A.SENSOR_ID = P.SENSOR_ID AND A.HORA = P.HORA;
+    INSERT INTO LEITURAS_SENSORES_HORA (SENSOR_ID, HORA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT L.SENSOR_ID, DATE_TRUNC('hour', L.TIMESTAMP_LEITURA), SUM(L.VALOR_LIDO), COUNT(*), MIN(L.VALOR_LIDO), MAX(L.VALOR_LIDO), MAX(L.UNIDADE_MEDIDA)
+    FROM LEITURAS_SENSORES L
+    JOIN (SELECT DISTINCT SENSOR_ID, HORA FROM PERIODOS_AFETADOS) P ON L.SENSOR_ID = P.SENSOR_ID
+        AND L.TIMESTAMP_LEITURA >= P.HORA AND L.TIMESTAMP_LEITURA < P.HORA + INTERVAL '1 hour'
+    GROUP BY 1, 2;
+
+    DELETE FROM LEITURAS_SENSORES_DIA A
+    USING (SELECT DISTINCT SENSOR_ID, DATE_TRUNC('day', HORA) AS DIA FROM PERIODOS_AFETADOS) P
+    WHERE A.SENSOR_ID = P.SENSOR_ID AND A.DIA = P.DIA;
+    INSERT INTO LEITURAS_SENSORES_DIA (SENSOR_ID, DIA, SOMA, CONTAGEM, MINIMO, MAXIMO, UNIDADE_MEDIDA)
+    SELECT H.SENSOR_ID, DATE_TRUNC('day', H.HORA), SUM(H.SOMA), SUM(H.CONTAGEM), MIN(H.MINIMO), MAX(H.MAXIMO), MAX(H.UNIDADE_MEDIDA)
+    FROM LEITURAS_SENSORES_HORA H
+    JOIN (SELECT DISTINCT SENSOR_ID, DATE_TRUNC('day', HORA) AS DIA FROM PERIODOS_AFETADOS) P
+        ON H.SENSOR_ID = P.SENSOR_ID AND H.HORA >= P.DIA AND H.HORA < P.DIA + INTERVAL '1 day'
+    GROUP BY 1, 2;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_INSERT
+AFTER INSERT ON LEITURAS_SENSORES
+REFERENCING NEW TABLE AS NOVAS_LEITURAS
+FOR EACH STATEMENT EXECUTE FUNCTION ACUMULAR_AGREGADOS_LEITURAS();
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_DELETE
+AFTER DELETE ON LEITURAS_SENSORES
+REFERENCING OLD TABLE AS LEITURAS_ALTERADAS
+FOR EACH STATEMENT EXECUTE FUNCTION RECALCULAR_AGREGADOS_LEITURAS();
+
+CREATE TRIGGER TRG_LEITURAS_AGREGADOS_UPDATE
+AFTER UPDATE ON LEITURAS_SENSORES
+REFERENCING OLD TABLE AS LEITURAS_ALTERADAS NEW TABLE AS NOVAS_LEITURAS
+FOR EACH STATEMENT EXECUTE FUNCTION RECALCULAR_AGREGADOS_LEITURAS();
+
+CREATE INDEX IDX_LEITURAS_SENSOR_TIMESTAMP ON LEITURAS_SENSORES (SENSOR_ID, TIMESTAMP_LEITURA);
+CREATE INDEX IDX_LEITURAS_TIMESTAMP ON LEITURAS_SENSORES (TIMESTAMP_LEITURA);
+CREATE INDEX IDX_LEITURAS_HORA ON LEITURAS_SENSORES_HORA (HORA);
+CREATE INDEX IDX_LEITURAS_DIA ON LEITURAS_SENSORES_DIA (DIA);
+
+-- 3. Partições para todo o histórico existente (o que sobrar vai para a partição padrão)
+SELECT CRIAR_PARTICOES_LEITURAS(
+    COALESCE((SELECT MIN(TIMESTAMP_LEITURA) FROM LEITURAS_SENSORES_ANTIGA), CURRENT_DATE)::DATE,
+    (SELECT (EXTRACT(YEAR FROM AGE(CURRENT_DATE, COALESCE(MIN(TIMESTAMP_LEITURA), CURRENT_DATE))) * 12
+           + EXTRACT(MONTH FROM AGE(CURRENT_DATE, COALESCE(MIN(TIMESTAMP_LEITURA), CURRENT_DATE))))::INTEGER + 13
+     FROM LEITURAS_SENSORES_ANTIGA)
+);
+
+-- 4. Copia os dados; o trigger de INSERT preenche os agregados horários e diários
+INSERT INTO LEITURAS_SENSORES (LEITURA_ID, SENSOR_ID, VALOR_LIDO, UNIDADE_MEDIDA, TIMESTAMP_LEITURA)
+SELECT LEITURA_ID, SENSOR_ID, VALOR_LIDO, UNIDADE_MEDIDA, TIMESTAMP_LEITURA
+FROM LEITURAS_SENSORES_ANTIGA;
+
+SELECT SETVAL(PG_GET_SERIAL_SEQUENCE('leituras_sensores', 'leitura_id'),
+              COALESCE((SELECT MAX(LEITURA_ID) FROM LEITURAS_SENSORES), 0) + 1, FALSE);
+
+-- 5. Remove a tabela antiga
+DROP TABLE LEITURAS_SENSORES_ANTIGA;
+
+COMMIT;
+
+ANALYZE LEITURAS_SENSORES;
+ANALYZE LEITURAS_SENSORES_HORA;
+ANALYZE LEITURAS_SENSORES_DIA;
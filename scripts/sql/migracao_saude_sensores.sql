@@ -0,0 +1,13 @@
+-- Migração: registro da saúde dos sensores (detector de anomalias, src/deteccao_anomalias.py).
+-- Para bancos criados com a versão anterior de criar_tabelas.sql.
+-- COMPATÍVEL COM POSTGRESQL 16
+
+CREATE TABLE IF NOT EXISTS SAUDE_SENSORES (
+    SENSOR_ID         INTEGER PRIMARY KEY REFERENCES SENSORES_AMBIENTAIS(SENSOR_ID) ON DELETE CASCADE,
+    STATUS_SAUDE      VARCHAR(20) NOT NULL CHECK (STATUS_SAUDE IN ('OK', 'SUSPEITO', 'FALHA')),
+    TAXA_ANOMALIAS    NUMERIC(5, 4) NOT NULL,
+    ULTIMO_MOTIVO     VARCHAR(20),
+    TIMESTAMP_ATUALIZACAO TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+COMMENT ON TABLE SAUDE_SENSORES IS 'Saúde de cada sensor segundo a detecção de anomalias das leituras.';
@@ -0,0 +1,165 @@
+"""
+Busca dos abrigos disponíveis mais próximos.
+
+Os abrigos ficam numa KD-tree (scipy) sobre as coordenadas convertidas em vetores
+unitários 3D, onde a distância euclidiana cresce junto com a distância sobre a
+esfera. Status e vagas ficam numa máscara separada: mudanças de capacidade só
+atualizam a máscara, e a árvore só é reconstruída quando abrigos entram, saem ou mudam de lugar.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from src.geo import RAIO_TERRA_KM, coordenadas_em_array, vetores_unitarios
+
+COLUNAS_RESULTADO = ['Ponto', 'Ordem', 'ID Abrigo', 'Nome do Abrigo', 'Distância (km)', 'Vagas']
+
+
+def _corda_para_km(corda):
+    """Distância em linha reta entre vetores unitários -> distância sobre a superfície, em km."""
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.clip(corda / 2, 0, 1))
+
+
+class IndiceAbrigos:
+    """Índice espacial dos abrigos, com elegibilidade (status e vagas) mantida à parte da árvore."""
+
+    def __init__(self, df_abrigos=None):
+        self._lock = threading.Lock()
+        self.reconstrucoes = 0
+        self.atualizacoes_capacidade = 0
+        self._construir(df_abrigos if df_abrigos is not None else pd.DataFrame())
+
+    # --- Construção e atualização ---
+    def _construir(self, df_abrigos):
+        if df_abrigos.empty:
+            coordenadas, validas = np.empty((0, 2)), np.zeros(0, dtype=bool)
+        else:
+            coordenadas, validas = coordenadas_em_array(df_abrigos)
+        df = df_abrigos[validas] if len(validas) else df_abrigos
+        self.ids = df['ID'].to_numpy() if not df.empty else np.empty(0, dtype=np.int64)
+        self.nomes = df['Nome do Abrigo'].to_numpy() if not df.empty else np.empty(0, dtype=object)
+        self.coordenadas = coordenadas
+        self._posicoes = {int(abrigo_id): i for i, abrigo_id in enumerate(self.ids)}
+        self._arvore = cKDTree(vetores_unitarios(coordenadas)) if len(coordenadas) else None
+        self.capacidade_maxima = np.zeros(len(self.ids), dtype=np.int64)
+        self.capacidade_atual = np.zeros(len(self.ids), dtype=np.int64)
+        self.status = np.full(len(self.ids), 'FECHADO', dtype=object)
+        if not df.empty:
+            self._copiar_capacidades(df)
+        self.reconstrucoes += 1
+
+    def _copiar_capacidades(self, df):
+        self.capacidade_maxima[:] = pd.to_numeric(df['Capacidade Máxima'], errors='coerce').fillna(0).to_numpy()
+        self.capacidade_atual[:] = pd.to_numeric(df['Capacidade Atual'], errors='coerce').fillna(0).to_numpy()
+        self.status[:] = df['Status'].to_numpy()
+
+    def sincronizar(self, df_abrigos):
+        """
+        Alinha o índice com a tabela de abrigos. Se só capacidades/status mudaram, atualiza a
+        máscara de elegibilidade; se a localização ou o conjunto de abrigos mudou, reconstrói a árvore.
+        Retorna True quando houve reconstrução.
+        """
+        with self._lock:
+            coordenadas, validas = coordenadas_em_array(df_abrigos) if not df_abrigos.empty else (np.empty((0, 2)), None)
+            df = df_abrigos[validas] if validas is not None else df_abrigos
+            ids = df['ID'].to_numpy() if not df.empty else np.empty(0, dtype=np.int64)
+            mesma_geometria = np.array_equal(ids, self.ids) and np.array_equal(coordenadas, self.coordenadas)
+            if not mesma_geometria:
+                self._construir(df_abrigos)
+                return True
+            if not df.empty:
+                self._copiar_capacidades(df)
+                self.atualizacoes_capacidade += 1
+            return False
+
+    def atualizar_capacidade(self, abrigo_id, capacidade_atual=None, status=None, capacidade_maxima=None):
+        """Atualiza um abrigo sem reconstruir a árvore (ex.: após registrar a chegada de pessoas)."""
+        with self._lock:
+            i = self._posicoes.get(int(abrigo_id))
+            if i is None:
+                return False
+            if capacidade_atual is not None:
+                self.capacidade_atual[i] = capacidade_atual
+            if capacidade_maxima is not None:
+                self.capacidade_maxima[i] = capacidade_maxima
+            if status is not None:
+                self.status[i] = status
+            self.atualizacoes_capacidade += 1
+            return True
+
+    def vagas(self):
+        return np.maximum(self.capacidade_maxima - self.capacidade_atual, 0)
+
+    def elegiveis(self, vagas_minimas=1):
+        """Máscara dos abrigos abertos (STATUS_ABRIGO = 'DISPONIVEL') com pelo menos `vagas_minimas` vagas."""
+        return (self.status == 'DISPONIVEL') & (self.vagas() >= max(vagas_minimas, 1))
+
+    # --- Consultas ---
+    def consultar(self, coordenadas, k=3, vagas_minimas=1, elegiveis=None):
+        """
+        Para cada ponto [lat, lon] de `coordenadas` (array (m, 2)), retorna os `k` abrigos elegíveis mais próximos.
+        Todos os pontos são consultados de uma vez; se abrigos inelegíveis ocupam as primeiras posições,
+        a busca é repetida com o dobro de vizinhos até haver `k` elegíveis por ponto.
+        `elegiveis` permite informar outra máscara (na ordem de `ids`) no lugar de status/vagas.
+        Retorna (indices, distancias_km), ambos (m, k'), com k' = min(k, abrigos elegíveis).
+        """
+        with self._lock:
+            coordenadas = np.asarray(coordenadas, dtype='float64').reshape(-1, 2)
+            if elegiveis is None:
+                elegiveis = self.elegiveis(vagas_minimas)
+            k_efetivo = min(k, int(elegiveis.sum()))
+            m, n = len(coordenadas), len(self.ids)
+            if self._arvore is None or k_efetivo == 0 or m == 0:
+                return np.empty((m, 0), dtype=np.int64), np.empty((m, 0))
+
+            vetores = vetores_unitarios(coordenadas)
+            k_busca = k_efetivo
+            while True:
+                cordas, indices = self._arvore.query(vetores, k=k_busca)
+                cordas, indices = cordas.reshape(m, k_busca), indices.reshape(m, k_busca)
+                validos = elegiveis[indices]
+                if k_busca == n or (validos.sum(axis=1) >= k_efetivo).all():
+                    break
+                k_busca = min(n, 2 * k_busca)
+
+            # Ordenação estável: elegíveis primeiro, mantendo a ordem de distância
+            ordem = np.argsort(~validos, axis=1, kind='stable')[:, :k_efetivo]
+            indices = np.take_along_axis(indices, ordem, axis=1)
+            distancias = _corda_para_km(np.take_along_axis(cordas, ordem, axis=1))
+            return indices, distancias
+
+    def abrigos_mais_proximos(self, df_pontos, coluna_nome, k=3, vagas_minimas=1):
+        """
+        Consulta em lote para um DataFrame de pontos com 'Latitude'/'Longitude' (comunidades, sensores...).
+        Retorna uma linha por (ponto, abrigo), com a ordem de proximidade, distância e vagas.
+        """
+        coordenadas, validas = coordenadas_em_array(df_pontos)
+        indices, distancias = self.consultar(coordenadas, k, vagas_minimas)
+        if indices.size == 0:
+            return pd.DataFrame(columns=COLUNAS_RESULTADO)
+        m, k_efetivo = indices.shape
+        planos = indices.ravel()
+        return pd.DataFrame({
+            'Ponto': np.repeat(df_pontos.loc[validas, coluna_nome].to_numpy(), k_efetivo),
+            'Ordem': np.tile(np.arange(1, k_efetivo + 1), m),
+            'ID Abrigo': self.ids[planos],
+            'Nome do Abrigo': self.nomes[planos],
+            'Distância (km)': np.round(distancias.ravel(), 2),
+            'Vagas': self.vagas()[planos],
+        })
+
+
+_indice = None
+_lock_indice = threading.Lock()
+
+def obter_indice_abrigos(df_abrigos):
+    """Índice compartilhado pelo processo, sincronizado com a tabela de abrigos recebida (ver `obter_abrigos`)."""
+    global _indice
+    with _lock_indice:
+        if _indice is None:
+            _indice = IndiceAbrigos(df_abrigos)
+        else:
+            _indice.sincronizar(df_abrigos)
+        return _indice
@@ -0,0 +1,81 @@
+import pandas as pd
+import streamlit as st
+
+from src.bd_conection import obter_metricas_pool
+from src.cache_referencia import obter_estatisticas_cache
+from src.instrumentacao_consultas import (
+    LIMIAR_CONSULTA_LENTA_MS,
+    INSTRUMENTACAO_ATIVA,
+    obter_principais_consultas,
+    limpar_estatisticas_consultas,
+)
+from src.utils import obter_estatisticas_cache_leituras
+from src.armazem_leituras import estatisticas_armazem
+
+
+ORDENACOES = {
+    "Tempo total": "tempo_total_ms",
+    "Latência p95": "p95_ms",
+    "Latência p99": "p99_ms",
+    "Chamadas": "chamadas",
+    "Linhas retornadas": "linhas",
+    "Volume aproximado": "bytes_aprox",
+}
+
+
+# --- Função Principal do Módulo Streamlit ---
+def painel_desempenho_bd():
+    st.header("🛠️ Administração e Desempenho do Banco")
+    st.write("Consultas executadas por este processo do painel, agrupadas pela forma do SQL (sem literais e parâmetros).")
+
+    if not INSTRUMENTACAO_ATIVA:
+        st.warning("A instrumentação de consultas está desativada (PG_INSTRUMENTACAO=0).")
+        return
+
+    # --- Consultas mais custosas ---
+    st.subheader("Consultas Mais Custosas")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    criterio = col1.selectbox("Ordenar por:", list(ORDENACOES))
+    quantidade = col2.number_input("Quantidade:", min_value=5, max_value=100, value=20, step=5)
+    if col3.button("Zerar estatísticas"):
+        limpar_estatisticas_consultas()
+
+    consultas = obter_principais_consultas(int(quantidade), ORDENACOES[criterio])
+    if consultas:
+        df_consultas = pd.DataFrame(consultas)
+        st.dataframe(df_consultas.drop(columns=["ultimo_plano"]), use_container_width=True, hide_index=True)
+
+        com_plano = [c for c in consultas if c["ultimo_plano"]]
+        if com_plano:
+            st.write(f"#### Planos das Consultas Lentas (acima de {LIMIAR_CONSULTA_LENTA_MS:.0f} ms)")
+            for consulta in com_plano:
+                with st.expander(consulta["consulta"][:120]):
+                    st.code(consulta["ultimo_plano"], language="text")
+    else:
+        st.info("Nenhuma consulta registrada ainda. Navegue pelos outros módulos para gerar estatísticas.")
+
+    st.markdown("---")
+
+    # --- Pool de conexões e caches ---
+    st.subheader("Pool de Conexões")
+    metricas_pool = obter_metricas_pool()
+    if metricas_pool:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Em uso", f"{metricas_pool['em_uso']} / {metricas_pool['max_conexoes']}")
+        col2.metric("Checkouts", metricas_pool["checkouts"])
+        col3.metric("Espera p95", f"{metricas_pool['espera']['p95_ms']} ms")
+        col4.metric("Timeouts", metricas_pool["timeouts"])
+    else:
+        st.info("O pool ainda não foi criado neste processo.")
+
+    st.subheader("Caches")
+    st.write("#### Tabelas de Referência")
+    estatisticas_cache = obter_estatisticas_cache()
+    if estatisticas_cache:
+        st.dataframe(pd.DataFrame.from_dict(estatisticas_cache, orient="index").fillna(0), use_container_width=True)
+    else:
+        st.info("Nenhuma leitura de tabela de referência em cache.")
+    st.write("#### Leituras de Sensores")
+    st.json(obter_estatisticas_cache_leituras())
+    st.write("#### Armazém de Leituras ao Vivo")
+    st.json(estatisticas_armazem() or {"info": "ainda não criado neste processo"})
@@ -4,7 +4,6 @@ import datetime
 import plotly.express as px
 import random
 import os
-import unidecode
 from fpdf import FPDF
 
 # Importações de Machine Learning
@@ -16,96 +15,70 @@ from sklearn.metrics import mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler
 import joblib
 
-# Importar funções de utilidade do novo módulo utils.py
-from src.utils import obter_dados_leituras_sensores
+# Textos exibidos para cada nível de alerta previsto (o nível vem dos limiares de 'Nível de Água' em LIMIARES_ALERTA)
+CONTEXTO_NIVEL_PREVISTO = {
+    'CRITICO': "CRÍTICO - Perigo Iminente!",
+    'ALTO': "ALTO - Risco de Inundação Grave!",
+    'MEDIO': "MÉDIO - Atenção para Alagamentos!",
+    'BAIXO': "BAIXO - Monitoramento Necessário.",
+    'SEGURO': "SEGURO - Nível Normal.",
+}
+
+# Risco e recomendação do simulador de cenários por nível de alerta previsto
+RISCO_CENARIO_POR_NIVEL = {
+    'CRITICO': ("Desastre Catastrófico", "Evacuação total imediata da região."),
+    'ALTO': ("Inundação Severa", "Evacuação de áreas de risco."),
+    'MEDIO': ("Inundação Moderada", "Monitoramento contínuo. Atenção às autoridades."),
+    'BAIXO': ("Risco Baixo", "Situação normal. Continuar monitoramento."),
+    'SEGURO': ("Risco Baixo", "Situação normal. Continuar monitoramento."),
+}
+
+from src.classificacao_alertas import obter_classificador
+from src.arquivo_parquet import arquivo_disponivel
+from src.base_features import COLUNA_ALVO, obter_base_features
 from scripts.python.analise_ndwi import analisar_ndwi_com_ml
 
 
 
 
-def obter_dados_historicos_para_ml(periodo_dias=90, intervalo_horas=1):
+def obter_dados_historicos_para_ml(periodo_dias=90, intervalo_horas=1, fonte='banco'):
     """
-    Obtém dados históricos de sensores e os prepara para modelagem ML.
-    Cria features de chuva acumulada e valores defasados.
-    NÃO usa mais dados de CSVs.
+    Obtém a matriz de features para modelagem ML da base de features (src/base_features.py):
+    valores defasados de nível/umidade e chuva acumulada, já calculados e persistidos por intervalo.
+    Antes de ler, acrescenta à base apenas os intervalos fechados desde a última atualização.
+    fonte='banco' parte dos agregados do PostgreSQL; fonte='parquet' do arquivo colunar (src/arquivo_parquet.py).
     """
-    # Usa a função reutilizada de src.utils
-    df_raw = obter_dados_leituras_sensores(periodo_dias)
-    
-    if df_raw.empty:
-        st.warning("Não há leituras de sensores disponíveis para o período selecionado.")
+    base = obter_base_features(intervalo_horas, fonte)
+    try:
+        if base.precisa_atualizar():
+            base.atualizar()
+        df_resampled, features, target_col = base.matriz(periodo_dias)
+    except (OSError, ValueError) as e:
+        st.error(f"Erro ao atualizar a base de features: {e}")
         return pd.DataFrame(), None, None, None, None, None
 
-    try:
-        # Pivota a tabela para ter tipos de sensor como colunas
-        # Combinamos Tipo Sensor e Localização para chaves únicas
-        df_raw['Sensor_Key'] = df_raw['Tipo Sensor'] + '_' + df_raw['Localização'].str.replace(' ', '_').str.replace(':', '').str.replace(',', '_').str.replace('-', '_').str.replace('/', '_')
-
-        df_pivot = df_raw.pivot_table(index='Timestamp', columns='Sensor_Key', values='Valor Lido')
-        df_pivot = df_pivot.sort_index()
-
-        # Resample para um intervalo regular (ex: 1 hora) e preenche valores ausentes
-        df_resampled = df_pivot.resample(f'{intervalo_horas}h').mean()
-        df_resampled = df_resampled.ffill().bfill() # Preenche NaNs de resample
-
-        # Engenharia de Features
-        # target_col = None
-        # for col in df_resampled.columns:
-        #     if 'Nível_de_Água' in col: # Procurar por Nível_de_Água em qualquer Sensor_Key
-        #         target_col = col
-        #         break
-        
-        target_col = None
-        for col in df_resampled.columns:
-            col_sem_acento = unidecode.unidecode(col.lower())
-            if 'nivel' in col_sem_acento and 'agua' in col_sem_acento:
-                target_col = col
-                break
-
-        if target_col is None:
-            st.warning("Não foram encontrados sensores de 'Nível de Água' para treinar o modelo.")
-            return pd.DataFrame(), None, None, None, None, None
-
-        features = []
-        for col in df_resampled.columns:
-            # Features defasadas de sensores
-            if 'Nível_de_Água' in col:
-                df_resampled[f'{col}_lag1'] = df_resampled[col].shift(1)
-                df_resampled[f'{col}_lag3'] = df_resampled[col].shift(3)
-                df_resampled[f'{col}_lag6'] = df_resampled[col].shift(6)
-                features.extend([f'{col}_lag1', f'{col}_lag3', f'{col}_lag6'])
-            elif 'Pluviômetro' in col:
-                df_resampled[f'{col}_acc3h'] = df_resampled[col].rolling(window=3, min_periods=1).sum().shift(1)
-                df_resampled[f'{col}_acc6h'] = df_resampled[col].rolling(window=6, min_periods=1).sum().shift(1)
-                df_resampled[f'{col}_acc12h'] = df_resampled[col].rolling(window=12, min_periods=1).sum().shift(1)
-                features.extend([f'{col}_acc3h', f'{col}_acc6h', f'{col}_acc12h'])
-            elif 'Umidade_do_Solo' in col:
-                df_resampled[f'{col}_lag1'] = df_resampled[col].shift(1)
-                features.append(f'{col}_lag1')
-            
-        # Definir o TARGET: Nível de água 1 hora no futuro
-        horizonte_previsao = 1 
-        df_resampled['TARGET_Nivel_Agua_Futuro'] = df_resampled[target_col].shift(-horizonte_previsao)
-        
-        # Remover linhas com valores NaN que surgiram devido ao shift e preenchimento inicial
-        df_final = df_resampled.dropna(subset=['TARGET_Nivel_Agua_Futuro'] + features)
+    if df_resampled.empty:
+        st.warning("Não há leituras de sensores disponíveis para o período selecionado.")
+        return pd.DataFrame(), None, None, None, None, None
+    if target_col is None:
+        st.warning("Não foram encontrados sensores de 'Nível de Água' para treinar o modelo.")
+        return pd.DataFrame(), None, None, None, None, None
 
-        if df_final.empty:
-            st.warning("Dados insuficientes após engenharia de features. Tente aumentar o período de análise ou garantir mais dados nos sensores.")
-            return pd.DataFrame(), None, None, None, None, None
+    # TARGET: nível de água um intervalo no futuro (coluna da base); remove as linhas sem alvo ou sem features
+    df_final = df_resampled.dropna(subset=[COLUNA_ALVO] + features)
 
-        X = df_final[features]
-        y = df_final['TARGET_Nivel_Agua_Futuro']
-        
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        return X_scaled, y, features, scaler, target_col, df_final 
-        
-    except Exception as e: # Captura outros erros de Pandas/processamento
-        st.error(f"Erro inesperado durante a preparação de dados: {e}")
+    if df_final.empty:
+        st.warning("Dados insuficientes após engenharia de features. Tente aumentar o período de análise ou garantir mais dados nos sensores.")
         return pd.DataFrame(), None, None, None, None, None
 
+    X = df_final[features]
+    y = df_final[COLUNA_ALVO]
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    return X_scaled, y, features, scaler, target_col, df_final
+
 
 # --- Funções para Treinar e Avaliar Modelos (Sem alteração significativa aqui) ---
 def treinar_e_avaliar_modelos(X, y):
@@ -180,11 +153,15 @@ def predictive_ml():
     st.subheader("⚙️ Configuração de Dados para Treinamento")
     periodo_dias = st.slider("Período de dados históricos para treinamento (dias):", min_value=7, max_value=365, value=90)
     intervalo_horas = st.selectbox("Intervalo de amostragem de dados (horas):", [1, 3, 6, 12], index=0)
+    fonte_dados = 'banco'
+    if arquivo_disponivel():
+        fonte_escolhida = st.radio("Fonte dos dados históricos:", ["Banco de Dados (agregados)", "Arquivo Parquet"], horizontal=True)
+        fonte_dados = 'parquet' if fonte_escolhida == "Arquivo Parquet" else 'banco'
 
     # Botão para carregar e preparar dados
     if st.button("Preparar Dados e Treinar Modelos"):
         with st.spinner("Preparando dados e treinando modelos..."):
-            X_scaled, y, features, scaler, target_col, df_final_features = obter_dados_historicos_para_ml(periodo_dias, intervalo_horas)
+            X_scaled, y, features, scaler, target_col, df_final_features = obter_dados_historicos_para_ml(periodo_dias, intervalo_horas, fonte_dados)
             
             if X_scaled is not None and y is not None and len(X_scaled) > 0:
                 st.session_state['X_scaled'] = X_scaled
@@ -193,6 +170,7 @@ def predictive_ml():
                 st.session_state['scaler'] = scaler
                 st.session_state['target_water_level_col'] = target_col
                 st.session_state['df_final_features'] = df_final_features
+                st.session_state['base_features_treino'] = (intervalo_horas, fonte_dados)
 
                 trained_models, model_results = treinar_e_avaliar_modelos(X_scaled, y)
                 st.session_state['trained_models'] = trained_models
@@ -211,7 +189,7 @@ def predictive_ml():
 
             else:
                 st.error("Não foi possível preparar os dados para treinamento. Verifique se há dados suficientes e sensores de nível de água.")
-                for key in ['X_scaled', 'y', 'features', 'scaler', 'target_water_level_col', 'trained_models', 'model_results', 'df_final_features']:
+                for key in ['X_scaled', 'y', 'features', 'scaler', 'target_water_level_col', 'trained_models', 'model_results', 'df_final_features', 'base_features_treino']:
                     if key in st.session_state:
                         del st.session_state[key]
 
@@ -233,9 +211,18 @@ def predictive_ml():
         df_final_features = st.session_state['df_final_features'] 
 
         st.write("#### Entrada para Previsão (Últimos Valores Conhecidos)")
-        st.info("Os valores padrão são os últimos do conjunto de dados de treinamento. Ajuste para simular condições atuais.")
-
-        last_known_features = df_final_features.iloc[-1][features].to_dict()
+        # Valores padrão: features do intervalo fechado mais recente na base (mesmo intervalo e fonte do treino)
+        base = obter_base_features(*st.session_state.get('base_features_treino', (1, 'banco')))
+        try:
+            if base.precisa_atualizar():
+                base.atualizar()
+            momento, last_known_features = base.ultima_linha(features)
+        except (OSError, ValueError) as e:
+            st.error(f"Erro ao atualizar a base de features: {e}")
+            momento, last_known_features = None, {}
+        if momento is None or any(pd.isna(valor) for valor in last_known_features.values()):
+            momento, last_known_features = df_final_features.index[-1], df_final_features.iloc[-1][features].to_dict()
+        st.info(f"Os valores padrão são as features do intervalo de {pd.Timestamp(momento):%d/%m/%Y %H:%M} na base de features. Ajuste para simular condições atuais.")
 
         current_features_input = {}
         for feature_name in features:
@@ -256,12 +243,8 @@ def predictive_ml():
                 st.success(f"**Previsão de Nível de Água (Modelo {model_choice}):**")
                 st.metric(label="Nível de Água Previsto", value=f"{prediction:.2f} m")
 
-                nivel_alerta_previsto = ""
-                if prediction >= 6.5: nivel_alerta_previsto = "CRÍTICO - Perigo Iminente!"
-                elif prediction >= 5.0: nivel_alerta_previsto = "ALTO - Risco de Inundação Grave!"
-                elif prediction >= 3.5: nivel_alerta_previsto = "MÉDIO - Atenção para Alagamentos!"
-                elif prediction >= 2.0: nivel_alerta_previsto = "BAIXO - Monitoramento Necessário."
-                else: nivel_alerta_previsto = "SEGURO - Nível Normal."
+                nivel_previsto = obter_classificador().nivel('Nível de Água', prediction)
+                nivel_alerta_previsto = CONTEXTO_NIVEL_PREVISTO[nivel_previsto]
                 st.write(f"Contexto de Risco Previsto: **{nivel_alerta_previsto}**")
             except Exception as e:
                 st.error(f"Erro ao gerar previsão: {e}")
@@ -358,16 +341,5 @@ def simular_cenario_inundacao_ml(chuva_total_mm, duracao_horas, nivel_agua_inici
     input_scaled = scaler.transform(df_input)
     pred = modelo.predict(input_scaled)[0]
 
-    if pred >= 6.5:
-        risco = "Desastre Catastrófico"
-        recomendacao = "Evacuação total imediata da região."
-    elif pred >= 5.0:
-        risco = "Inundação Severa"
-        recomendacao = "Evacuação de áreas de risco."
-    elif pred >= 3.5:
-        risco = "Inundação Moderada"
-        recomendacao = "Monitoramento contínuo. Atenção às autoridades."
-    else:
-        risco = "Risco Baixo"
-        recomendacao = "Situação normal. Continuar monitoramento."
+    risco, recomendacao = RISCO_CENARIO_POR_NIVEL[obter_classificador().nivel('Nível de Água', pred)]
     return round(pred, 2), risco, recomendacao
@@ -0,0 +1,376 @@
+"""
+Alerta antecipado de inundação pela taxa de subida do nível de água.
+
+Os alertas do motor (src/motor_alertas.py) só disparam quando o nível já cruzou um limiar. Aqui,
+para cada sensor de nível de água, o estado mantido a cada leitura é:
+- a taxa de subida suavizada (m/h), média exponencial da derivada ponderada pelo intervalo entre
+  leituras (constante de tempo `tau_h`);
+- a chuva acumulada em 1/3/6/12 h nos pluviômetros vizinhos, a partir de baldes de 10 minutos por
+  pluviômetro (buffer circular de 12 h).
+
+Com isso o nível é projetado `horizonte_h` horas à frente (horizonte ampliado quando a chuva
+recente na vizinhança indica que a subida vai continuar). Se a projeção cruza um limiar acima do
+nível atual, abre-se um alerta preditivo (TIPO_ALERTA 'Previsão de Inundação') com o tempo
+estimado até o limiar, gerado por `gerar_alerta` e gravado em ALERTAS_DESASTRE ligado ao sensor.
+
+Não há cadastro de bacias nem de cotas, então "a montante" é aproximado pelos `k_vizinhos`
+pluviômetros mais próximos dentro de `raio_km` (KD-tree refeita só quando entram sensores novos).
+O estado ocupa posições fixas em arrays NumPy e cada leitura custa O(1).
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from src.bd_conection import conexao_postgres
+from src.classificacao_alertas import CODIGO_NIVEL, NIVEIS_ALERTA, obter_classificador
+from src.flood_monitoring import gerar_alerta
+from src.geo import extrair_coordenadas, km_para_corda, vetores_unitarios
+from src.motor_alertas import ABERTO, ESCALADO, RESOLVIDO, gravar_alertas
+
+logger = logging.getLogger(__name__)
+
+TIPO_PREVISAO = 'Previsão de Inundação'
+TIPO_NIVEL, TIPO_CHUVA = 'Nível de Água', 'Pluviômetro'
+
+HORAS_ACUMULADO = (1, 3, 6, 12)
+LARGURA_BALDE_S = 600                                   # baldes de chuva de 10 minutos
+N_BALDES = HORAS_ACUMULADO[-1] * 3600 // LARGURA_BALDE_S
+INTERVALO_MAXIMO_S = 3600.0                             # acima disso a taxa recomeça do zero
+
+HORIZONTE_PADRAO_H = 3.0
+TAU_PADRAO_H = 0.5
+TAXA_MINIMA_PADRAO = 0.05                               # m/h; abaixo disso o nível é considerado estável
+CHUVA_PERSISTENTE_MM = 25.0                             # chuva em 3 h na vizinhança que amplia o horizonte
+FATOR_HORIZONTE_CHUVA = 1.5
+NIVEL_MINIMO_PREVISAO = CODIGO_NIVEL['MEDIO']
+PERMANENCIA_RESOLUCAO_PADRAO = 900.0
+
+
+@dataclass
+class Previsao:
+    evento: str                     # ABERTO, ESCALADO ou RESOLVIDO
+    sensor_id: int
+    area: str
+    nivel_atual: int                # códigos em NIVEIS_ALERTA
+    nivel_previsto: int
+    valor: float                    # última leitura aceita (m)
+    projetado: float                # nível projetado no horizonte (m)
+    taxa: float                     # m/h
+    horas_ate_limiar: float         # até o limiar do nível previsto
+    chuva: dict = field(default_factory=dict)   # {horas: mm acumulados na vizinhança}
+    timestamp: object = None
+    nivel_anterior: int = 0         # nível previsto antes do evento (0 ao abrir)
+
+    def alerta(self):
+        """Dicionário no formato de `gerar_alerta`, com a taxa, o tempo até o limiar e a chuva na descrição."""
+        alerta = gerar_alerta(TIPO_PREVISAO, NIVEIS_ALERTA[self.nivel_previsto], round(self.projetado, 2), 'm', self.area)
+        if self.evento == RESOLVIDO:
+            return alerta
+        chuva = ", ".join(f"{h}h: {mm:.0f} mm" for h, mm in self.chuva.items() if not np.isnan(mm)) or "sem pluviômetros próximos"
+        alerta['DescricaoCompleta'] = (
+            f"Nível em {self.valor:.2f} m subindo {self.taxa:.2f} m/h; limiar {NIVEIS_ALERTA[self.nivel_previsto]} "
+            f"em ~{self.horas_ate_limiar * 60:.0f} min. Chuva na vizinhança ({chuva}). " + alerta['DescricaoCompleta']
+        )
+        return alerta
+
+
+class AlertaAntecipado:
+    """Taxa de subida e chuva acumulada por sensor, com custo constante por leitura, e alertas preditivos."""
+
+    def __init__(self, horizonte_h=HORIZONTE_PADRAO_H, tau_h=TAU_PADRAO_H, taxa_minima=TAXA_MINIMA_PADRAO,
+                 raio_km=20.0, k_vizinhos=3, min_leituras=6, permanencia_resolucao=PERMANENCIA_RESOLUCAO_PADRAO,
+                 classificador=None, capacidade=1024):
+        self.horizonte_h = horizonte_h
+        self.tau_h = tau_h
+        self.taxa_minima = taxa_minima
+        self.raio_km = raio_km
+        self.k_vizinhos = k_vizinhos
+        self.min_leituras = min_leituras
+        self.permanencia_resolucao = permanencia_resolucao
+        self._classificador = classificador
+        self._lock = threading.Lock()
+        self._posicoes = {}
+        self._alocar(capacidade)
+        self._n = 0
+        self._vizinhos_desatualizados = False
+        # Alertas preditivos abertos: {sensor_id: [nível previsto, sem previsão desde (s) ou None]}
+        self._abertos = {}
+        # Persistência, separada da decisão: linhas ATIVO no banco {sensor_id: ALERTA_ID} e o último
+        # evento de cada sensor ainda não confirmado pelo commit {sensor_id: Previsao}
+        self._alerta_ids = {}
+        self._pendentes = {}
+        self.contadores = {ABERTO: 0, ESCALADO: 0, RESOLVIDO: 0, 'leituras': 0, 'gravacoes': 0}
+
+    # --- Estado ---
+    def _alocar(self, capacidade, anterior=None):
+        campos = {
+            'ids': (np.int64, 0), 'chuva': (bool, False), 'areas': (object, ''), 'lat': (np.float64, np.nan),
+            'lon': (np.float64, np.nan), 'ultimo': (np.float64, np.nan), 'ultimo_ts': (np.float64, np.nan),
+            'taxa': (np.float64, np.nan), 'contagem': (np.int64, 0),
+        }
+        for nome, (dtype, inicial) in campos.items():
+            novo = np.full(capacidade, inicial, dtype=dtype)
+            if anterior:
+                novo[:len(anterior[nome])] = anterior[nome]
+            setattr(self, '_' + nome, novo)
+        matrizes = {'vizinhos': (self.k_vizinhos, np.int64, -1), 'baldes': (N_BALDES, np.float64, 0.0),
+                    'balde_abs': (N_BALDES, np.int64, -1)}
+        for nome, (colunas, dtype, inicial) in matrizes.items():
+            nova = np.full((capacidade, colunas), inicial, dtype=dtype)
+            if anterior:
+                nova[:len(anterior[nome])] = anterior[nome]
+            setattr(self, '_' + nome, nova)
+
+    def _slots(self, infos):
+        slots = np.empty(len(infos), dtype=np.int64)
+        novos = []
+        for i, info in enumerate(infos):
+            slot = self._posicoes.get(info['SENSOR_ID'])
+            if slot is None:
+                if self._n == len(self._ids):
+                    nomes = ['ids', 'chuva', 'areas', 'lat', 'lon', 'ultimo', 'ultimo_ts', 'taxa', 'contagem',
+                             'vizinhos', 'baldes', 'balde_abs']
+                    self._alocar(2 * len(self._ids), {nome: getattr(self, '_' + nome) for nome in nomes})
+                slot = self._posicoes[info['SENSOR_ID']] = self._n
+                self._ids[slot] = info['SENSOR_ID']
+                self._chuva[slot] = info['TIPO_SENSOR'] == TIPO_CHUVA
+                self._areas[slot] = info.get('LOCALIZACAO_GEO') or ''
+                self._lat[slot] = np.nan if info.get('LATITUDE') is None else info['LATITUDE']
+                self._lon[slot] = np.nan if info.get('LONGITUDE') is None else info['LONGITUDE']
+                self._n += 1
+                novos.append(slot)
+            slots[i] = slot
+        if novos:
+            novos = np.array(novos)
+            sem_coordenadas = novos[np.isnan(self._lat[novos]) | np.isnan(self._lon[novos])]
+            if len(sem_coordenadas):
+                coordenadas = extrair_coordenadas(self._areas[sem_coordenadas])
+                self._lat[sem_coordenadas] = coordenadas['lat'].to_numpy()
+                self._lon[sem_coordenadas] = coordenadas['lon'].to_numpy()
+            self._vizinhos_desatualizados = True
+        return slots
+
+    def _atualizar_vizinhos(self):
+        """Associa cada sensor de nível aos pluviômetros mais próximos (só quando entram sensores novos)."""
+        n = self._n
+        com_coordenadas = ~(np.isnan(self._lat[:n]) | np.isnan(self._lon[:n]))
+        pluviometros = np.nonzero(self._chuva[:n] & com_coordenadas)[0]
+        niveis = np.nonzero(~self._chuva[:n] & com_coordenadas)[0]
+        self._vizinhos[:n] = -1
+        if len(pluviometros) and len(niveis):
+            arvore = cKDTree(vetores_unitarios(np.column_stack([self._lat[pluviometros], self._lon[pluviometros]])))
+            k = min(self.k_vizinhos, len(pluviometros))
+            _, indices = arvore.query(vetores_unitarios(np.column_stack([self._lat[niveis], self._lon[niveis]])),
+                                      k=k, distance_upper_bound=km_para_corda(self.raio_km))
+            indices = indices.reshape(len(niveis), k)
+            encontrados = indices < len(pluviometros)   # sem vizinho no raio, o cKDTree devolve len(pluviometros)
+            self._vizinhos[niveis[:, None], np.arange(k)] = np.where(encontrados, pluviometros[np.minimum(indices, len(pluviometros) - 1)], -1)
+        self._vizinhos_desatualizados = False
+
+    def carregar_ativos(self):
+        """Recupera do banco os alertas preditivos ATIVO. Retorna quantos foram carregados."""
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT SENSOR_ID, NIVEL_ALERTA, ALERTA_ID FROM ALERTAS_DESASTRE
+                    WHERE STATUS_ALERTA = 'ATIVO' AND TIPO_ALERTA = %s AND SENSOR_ID IS NOT NULL
+                """, (TIPO_PREVISAO,))
+                linhas = cursor.fetchall()
+        with self._lock:
+            for sensor_id, nivel, alerta_id in linhas:
+                self._abertos[sensor_id] = [CODIGO_NIVEL[nivel], None]
+                self._alerta_ids[sensor_id] = alerta_id
+        return len(linhas)
+
+    # --- Atualização incremental ---
+    def _acumular_chuva(self, p, intensidades, t):
+        """Soma a chuva (mm/h x horas desde a leitura anterior) no balde de 10 minutos corrente."""
+        dt_h = np.clip(t - self._ultimo_ts[p], 0, INTERVALO_MAXIMO_S) / 3600
+        mm = np.where(np.isnan(dt_h), 0.0, np.maximum(intensidades, 0) * np.nan_to_num(dt_h))
+        balde = np.int64(t // LARGURA_BALDE_S)
+        coluna = balde % N_BALDES
+        antigos = self._balde_abs[p, coluna] != balde
+        self._baldes[p[antigos], coluna] = 0.0
+        self._balde_abs[p, coluna] = balde
+        self._baldes[p, coluna] += mm
+        self._ultimo[p], self._ultimo_ts[p] = intensidades, t
+
+    def _atualizar_taxa(self, s, v, t):
+        """Média exponencial da taxa de subida, com peso 1 - exp(-dt/tau) (independe da cadência)."""
+        dt_h = (t - self._ultimo_ts[s]) / 3600
+        continua = dt_h > 0
+        continua &= dt_h <= INTERVALO_MAXIMO_S / 3600
+        instantanea = np.where(continua, (v - self._ultimo[s]) / np.where(continua, dt_h, 1.0), np.nan)
+        alfa = 1 - np.exp(-np.where(continua, dt_h, 0.0) / self.tau_h)
+        anterior = self._taxa[s]
+        taxa = np.where(np.isnan(anterior), instantanea, anterior + alfa * (instantanea - anterior))
+        self._taxa[s] = np.where(continua, taxa, np.nan)
+        self._contagem[s] = np.where(continua, self._contagem[s] + 1, 0)
+        self._ultimo[s], self._ultimo_ts[s] = v, t
+
+    def chuva_acumulada(self, pluviometros, t):
+        """mm acumulados em cada janela de HORAS_ACUMULADO, array (n, 4), para os slots de pluviômetro informados."""
+        idade = np.int64(t // LARGURA_BALDE_S) - self._balde_abs[pluviometros]
+        baldes = self._baldes[pluviometros]
+        return np.column_stack([np.where((idade >= 0) & (idade < h * 3600 // LARGURA_BALDE_S), baldes, 0.0).sum(axis=1)
+                                for h in HORAS_ACUMULADO])
+
+    def _chuva_vizinha(self, s, t):
+        """Média da chuva acumulada nos pluviômetros vizinhos de cada sensor de nível (NaN sem vizinhos)."""
+        vizinhos = self._vizinhos[s]
+        validos = vizinhos >= 0
+        chuva = np.full(vizinhos.shape + (len(HORAS_ACUMULADO),), np.nan)
+        if validos.any():
+            chuva[validos] = self.chuva_acumulada(vizinhos[validos], t)
+        with np.errstate(invalid='ignore'):
+            soma = np.nansum(chuva, axis=1)
+            return np.where(validos.any(axis=1)[:, None], soma / np.maximum(validos.sum(axis=1), 1)[:, None], np.nan)
+
+    # --- Previsão ---
+    def processar(self, leituras, timestamp):
+        """
+        Aplica as leituras de um ciclo [(sensor_info, valor)] (sensor_info com SENSOR_ID, TIPO_SENSOR,
+        LOCALIZACAO_GEO e, se houver, LATITUDE/LONGITUDE) e retorna as mudanças nos alertas
+        preditivos. Só nível de água e pluviômetros entram; não grava nada (ver `gravar`).
+        """
+        leituras = [(info, valor) for info, valor in leituras if info['TIPO_SENSOR'] in (TIPO_NIVEL, TIPO_CHUVA)]
+        if not leituras:
+            return []
+        t = pd.Timestamp(timestamp).timestamp()
+        with self._lock:
+            slots = self._slots([info for info, _ in leituras])
+            valores = np.array([valor for _, valor in leituras], dtype=np.float64)
+            # Uma leitura por sensor no ciclo: repetições ficam com a última
+            _, ultimas = np.unique(slots[::-1], return_index=True)
+            manter = len(slots) - 1 - ultimas
+            slots, valores = slots[manter], valores[manter]
+            if self._vizinhos_desatualizados:
+                self._atualizar_vizinhos()
+
+            chuva = self._chuva[slots]
+            if chuva.any():
+                self._acumular_chuva(slots[chuva], valores[chuva], t)
+            previsoes = []
+            if (~chuva).any():
+                s, v = slots[~chuva], valores[~chuva]
+                self._atualizar_taxa(s, v, t)
+                previsoes = self._prever(s, v, t, timestamp)
+            self.contadores['leituras'] += len(leituras)
+        return previsoes
+
+    def _prever(self, s, v, t, timestamp):
+        classificador = self._classificador or obter_classificador()
+        ids = self._ids[s]
+        tipos = np.full(len(s), TIPO_NIVEL, dtype=object)
+        taxa = self._taxa[s]
+        chuva = self._chuva_vizinha(s, t)
+        horizonte = np.where(np.nan_to_num(chuva[:, HORAS_ACUMULADO.index(3)]) >= CHUVA_PERSISTENTE_MM,
+                             self.horizonte_h * FATOR_HORIZONTE_CHUVA, self.horizonte_h)
+        subindo = (taxa >= self.taxa_minima) & (self._contagem[s] >= self.min_leituras)
+        projetado = v + np.where(subindo, taxa, 0.0) * horizonte
+        atual = classificador.classificar(v, ids, tipos)
+        previsto = classificador.classificar(projetado, ids, tipos)
+        em_risco = subindo & (previsto > atual) & (previsto >= NIVEL_MINIMO_PREVISAO)
+
+        # Só os sensores com previsão nova ou alerta preditivo aberto seguem para o laço em Python
+        abertos = pd.Series(ids).isin(list(self._abertos)).to_numpy() if self._abertos else np.zeros(len(s), dtype=bool)
+        indices = np.nonzero(em_risco | abertos)[0]
+        if not len(indices):
+            return []
+        limiares = classificador.limiares_de(ids[indices], tipos[indices])
+        limiar = limiares[np.arange(len(indices)), np.maximum(previsto[indices], 1) - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            horas = np.maximum((limiar - v[indices]) / taxa[indices], 0.0)
+
+        previsoes = []
+        for j, i in enumerate(indices):
+            sensor_id = int(ids[i])
+            aberto = self._abertos.get(sensor_id)
+            dados = dict(sensor_id=sensor_id, area=self._areas[s[i]], nivel_atual=int(atual[i]), valor=float(v[i]),
+                         projetado=float(projetado[i]), taxa=float(taxa[i]), horas_ate_limiar=float(horas[j]),
+                         chuva=dict(zip(HORAS_ACUMULADO, chuva[i].tolist())), timestamp=timestamp)
+            if em_risco[i]:
+                if aberto is None:
+                    self._abertos[sensor_id] = [int(previsto[i]), None]
+                    previsoes.append(Previsao(ABERTO, nivel_previsto=int(previsto[i]), **dados))
+                elif previsto[i] > aberto[0]:
+                    anterior = aberto[0]
+                    aberto[0], aberto[1] = int(previsto[i]), None
+                    previsoes.append(Previsao(ESCALADO, nivel_previsto=int(previsto[i]), nivel_anterior=anterior, **dados))
+                else:
+                    aberto[1] = None
+                continue
+            # Sem previsão de cruzamento: resolve quando o nível já chegou ao previsto (o motor de alertas
+            # assume) ou depois de `permanencia_resolucao` segundos sem a previsão se repetir
+            if aberto[1] is None:
+                aberto[1] = t
+            if atual[i] >= aberto[0] or t - aberto[1] >= self.permanencia_resolucao:
+                del self._abertos[sensor_id]
+                previsoes.append(Previsao(RESOLVIDO, nivel_previsto=aberto[0], nivel_anterior=aberto[0], **dados))
+        for previsao in previsoes:
+            self.contadores[previsao.evento] += 1
+            self._pendentes[previsao.sensor_id] = previsao
+        return previsoes
+
+    # --- Persistência ---
+    def gravar(self):
+        """
+        Grava o último evento pendente de cada sensor (abertura, escalada ou resolução) numa única
+        transação. Os ALERTA_ID só mudam depois do commit; se a transação falhar, os eventos
+        continuam pendentes e são gravados no próximo ciclo. Retorna o número de linhas gravadas.
+        """
+        with self._lock:
+            pendentes = list(self._pendentes.values())
+            alerta_ids = [self._alerta_ids.get(previsao.sensor_id) for previsao in pendentes]
+        novos, alterados, resolvidos = [], [], []
+        for previsao, alerta_id in zip(pendentes, alerta_ids):
+            if previsao.evento == RESOLVIDO:
+                if alerta_id is not None:
+                    resolvidos.append((alerta_id, previsao.timestamp))
+                continue
+            alerta = previsao.alerta()
+            dados = (alerta['Nível'], alerta['DescricaoCompleta'][:1000], alerta['Recomendação'], previsao.timestamp)
+            if alerta_id is None:
+                novos.append((previsao.sensor_id, alerta['Tipo'], alerta['Localização']) + dados)
+            else:
+                alterados.append((alerta_id,) + dados)
+
+        ids = gravar_alertas(novos, alterados, resolvidos) if (novos or alterados or resolvidos) else {}
+
+        with self._lock:
+            for previsao in pendentes:
+                if previsao.evento == RESOLVIDO:
+                    self._alerta_ids.pop(previsao.sensor_id, None)
+                elif previsao.sensor_id in ids:
+                    self._alerta_ids[previsao.sensor_id] = ids[previsao.sensor_id]
+                if self._pendentes.get(previsao.sensor_id) is previsao:
+                    del self._pendentes[previsao.sensor_id]
+        self.contadores['gravacoes'] += len(novos) + len(alterados) + len(resolvidos)
+        return len(novos) + len(alterados) + len(resolvidos)
+
+    # --- Consulta ---
+    def situacao(self):
+        """Taxa de subida e chuva na vizinhança de cada sensor de nível, como DataFrame."""
+        with self._lock:
+            n = self._n
+            niveis = np.nonzero(~self._chuva[:n])[0]
+            t = np.nanmax(self._ultimo_ts[:n]) if n else np.nan
+            chuva = self._chuva_vizinha(niveis, t) if len(niveis) and not np.isnan(t) else np.empty((0, len(HORAS_ACUMULADO)))
+            df = pd.DataFrame({
+                'SENSOR_ID': self._ids[niveis],
+                'Nível (m)': self._ultimo[niveis],
+                'Taxa (m/h)': self._taxa[niveis],
+                **{f'Chuva {h}h (mm)': chuva[:, k] for k, h in enumerate(HORAS_ACUMULADO)},
+                'Previsão': [NIVEIS_ALERTA[self._abertos[i][0]] if i in self._abertos else '' for i in self._ids[niveis].tolist()],
+            })
+        return df
+
+    def estatisticas(self):
+        with self._lock:
+            pluviometros = int(self._chuva[:self._n].sum())
+            return {**self.contadores, 'sensores_nivel': self._n - pluviometros, 'pluviometros': pluviometros,
+                    'previsoes_ativas': len(self._abertos), 'pendentes': len(self._pendentes)}
@@ -0,0 +1,161 @@
+"""
+Alocação automática de recursos para a fila de solicitações pendentes.
+
+Numa única transação: trava os recursos com estoque e as solicitações PENDENTE (por prioridade e
+idade) de tipos que esse estoque atende, com SELECT ... FOR UPDATE SKIP LOCKED, casa TIPO_AJUDA com
+TIPO_RECURSO, grava todas as alocações, baixa o estoque e marca as solicitações atendidas como
+EM_ANDAMENTO. Linhas já travadas por outra execução são puladas, então várias instâncias podem rodar
+em paralelo sem alocar o mesmo estoque duas vezes.
+
+Uso (a partir da raiz do projeto):
+    python -m src.alocacao_recursos --lote 500
+"""
+import argparse
+import logging
+
+from psycopg2.extras import execute_values
+
+from src.bd_conection import conexao_postgres
+from src.cache_referencia import invalidar_cache
+
+logger = logging.getLogger(__name__)
+
+# TIPO_AJUDA -> recursos aceitos, em ordem de preferência: (TIPO_RECURSO, padrão ILIKE no nome ou None)
+RECURSOS_POR_TIPO_AJUDA = {
+    'Água Potável': [('Alimento', '%água%')],
+    'Alimentos': [('Alimento', '%cesta%'), ('Alimento', None)],
+    'Cestas Básicas': [('Alimento', '%cesta%')],
+    'Atendimento Médico': [('Medicamento', '%socorro%'), ('Humano', None)],
+    'Medicamentos': [('Medicamento', None)],
+    'Resgate': [('Equipamento', '%resgate%'), ('Humano', '%resgate%')],
+    'Abrigo Temporário': [('Equipamento', None)],
+}
+
+# Quantidade alocada por solicitação (a tabela não registra a quantidade pedida)
+QUANTIDADE_POR_TIPO_AJUDA = {
+    'Água Potável': 100,
+    'Alimentos': 50,
+    'Cestas Básicas': 50,
+    'Medicamentos': 20,
+    'Atendimento Médico': 10,
+}
+QUANTIDADE_PADRAO = 1
+
+TIPOS_RECURSO = sorted({tipo for aceitos in RECURSOS_POR_TIPO_AJUDA.values() for tipo, _ in aceitos})
+
+ORDEM_PRIORIDADE = "CASE prioridade WHEN 'URGENTE' THEN 0 WHEN 'ALTA' THEN 1 WHEN 'MEDIA' THEN 2 ELSE 3 END"
+
+
+def _casa_nome(nome, padrao):
+    """Equivalente em Python do ILIKE '%trecho%' usado nos padrões de RECURSOS_POR_TIPO_AJUDA."""
+    return padrao is None or padrao.strip('%').lower() in (nome or '').lower()
+
+def planejar_alocacoes(solicitacoes, recursos):
+    """
+    Casa as solicitações (já na ordem de atendimento) com o estoque.
+    `solicitacoes`: [(solicitacao_id, tipo_ajuda)]; `recursos`: {recurso_id: [nome, tipo, disponivel]} (alterado no lugar).
+    Retorna a lista de (solicitacao_id, recurso_id, quantidade).
+    """
+    alocacoes = []
+    for solicitacao_id, tipo_ajuda in solicitacoes:
+        pedido = QUANTIDADE_POR_TIPO_AJUDA.get(tipo_ajuda, QUANTIDADE_PADRAO)
+        for tipo_recurso, padrao in RECURSOS_POR_TIPO_AJUDA.get(tipo_ajuda, ()):
+            candidatos = [
+                (recurso_id, dados) for recurso_id, dados in recursos.items()
+                if dados[1] == tipo_recurso and dados[2] > 0 and _casa_nome(dados[0], padrao)
+            ]
+            if not candidatos:
+                continue
+            recurso_id, dados = max(candidatos, key=lambda item: item[1][2])
+            quantidade = min(pedido, dados[2])
+            dados[2] -= quantidade
+            alocacoes.append((solicitacao_id, recurso_id, quantidade))
+            break
+    return alocacoes
+
+def alocar_solicitacoes_pendentes(limite=500):
+    """
+    Atende até `limite` solicitações pendentes numa única transação. Solicitações de tipos sem
+    mapeamento ou sem estoque ficam de fora do lote e não bloqueiam as seguintes.
+    Retorna um resumo com o número de solicitações analisadas, atendidas e as alocações feitas.
+    Erros de banco são propagados (a transação é desfeita por `conexao_postgres`).
+    """
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            # Estoque primeiro: só entram na fila os tipos de ajuda que algum recurso livre atende.
+            # Assim pedidos sem mapeamento ('Outros') ou sem estoque não ocupam o topo do lote.
+            cursor.execute("""
+                SELECT recurso_id, nome_recurso, tipo_recurso, quantidade_disponivel
+                FROM recursos
+                WHERE tipo_recurso = ANY(%s) AND quantidade_disponivel > 0
+                ORDER BY recurso_id
+                FOR UPDATE SKIP LOCKED
+            """, (TIPOS_RECURSO,))
+            recursos = {linha[0]: list(linha[1:]) for linha in cursor.fetchall()}
+            tipos_atendiveis = [
+                tipo_ajuda for tipo_ajuda, aceitos in RECURSOS_POR_TIPO_AJUDA.items()
+                if any(dados[1] == tipo_recurso and _casa_nome(dados[0], padrao)
+                       for tipo_recurso, padrao in aceitos for dados in recursos.values())
+            ]
+            if not tipos_atendiveis:
+                return {'analisadas': 0, 'atendidas': 0, 'alocacoes': []}
+
+            cursor.execute(f"""
+                SELECT solicitacao_id, tipo_ajuda
+                FROM solicitacoes_ajuda
+                WHERE status_solicitacao = 'PENDENTE' AND tipo_ajuda = ANY(%s)
+                ORDER BY {ORDEM_PRIORIDADE}, timestamp_solicitacao, solicitacao_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (tipos_atendiveis, limite))
+            solicitacoes = cursor.fetchall()
+            if not solicitacoes:
+                return {'analisadas': 0, 'atendidas': 0, 'alocacoes': []}
+
+            alocacoes = planejar_alocacoes(solicitacoes, recursos)
+            if not alocacoes:
+                return {'analisadas': len(solicitacoes), 'atendidas': 0, 'alocacoes': []}
+
+            execute_values(cursor, """
+                INSERT INTO alocacao_recursos (solicitacao_id, recurso_id, quantidade_alocada, timestamp_alocacao, status_alocacao)
+                VALUES %s
+            """, alocacoes, template="(%s, %s, %s, CURRENT_TIMESTAMP, 'PENDENTE')", page_size=len(alocacoes))
+
+            baixas = {}
+            for _, recurso_id, quantidade in alocacoes:
+                baixas[recurso_id] = baixas.get(recurso_id, 0) + quantidade
+            execute_values(cursor, """
+                UPDATE recursos r
+                SET quantidade_disponivel = r.quantidade_disponivel - v.quantidade
+                FROM (VALUES %s) AS v(recurso_id, quantidade)
+                WHERE r.recurso_id = v.recurso_id AND r.quantidade_disponivel >= v.quantidade
+            """, list(baixas.items()), page_size=len(baixas))
+            if cursor.rowcount != len(baixas):
+                raise RuntimeError("Estoque alterado durante a alocação; nenhuma alocação foi gravada.")
+
+            atendidas = sorted({solicitacao_id for solicitacao_id, _, _ in alocacoes})
+            cursor.execute("""
+                UPDATE solicitacoes_ajuda
+                SET status_solicitacao = 'EM_ANDAMENTO', timestamp_atualizacao = CURRENT_TIMESTAMP
+                WHERE solicitacao_id = ANY(%s)
+            """, (atendidas,))
+
+    invalidar_cache('RECURSOS', 'SOLICITACOES_AJUDA')
+    logger.info("%d solicitações analisadas, %d atendidas com %d alocações", len(solicitacoes), len(atendidas), len(alocacoes))
+    return {'analisadas': len(solicitacoes), 'atendidas': len(atendidas), 'alocacoes': alocacoes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aloca recursos para as solicitações de ajuda pendentes.")
+    parser.add_argument("--lote", type=int, default=500, help="máximo de solicitações por transação")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    while True:
+        resumo = alocar_solicitacoes_pendentes(args.lote)
+        if resumo['atendidas'] == 0 or resumo['analisadas'] < args.lote:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Armazém em memória das últimas leituras de cada sensor (buffers circulares NumPy).
+
+Cada sensor ocupa uma linha de duas matrizes de tamanho fixo (valores float64 e instantes em
+microssegundos), então a memória é previsível: sensores x capacidade x 16 bytes. Escritas e
+leituras são operações vetorizadas sobre as matrizes, sem consultar o banco:
+- `ultimas(sensor_id, n)`: as n leituras mais recentes de um sensor, em ordem cronológica;
+- `ultimos_valores()`: a leitura mais recente de todos os sensores;
+- `taxas_variacao(janela_s)`: inclinação (unidade por hora) de todos os sensores na janela;
+- `historico_recente(limite)`: as leituras mais recentes da rede inteira.
+
+O armazém é alimentado pelo caminho de ingestão: o serviço de monitoramento e o servidor de
+ingestão chamam `adicionar_lote` (o armazém também serve como consumidor de `ServidorIngestao`).
+Em processos que não ingerem leituras (o dashboard), `obter_armazem_sincronizado` mantém um
+armazém atualizado por uma thread que busca no banco só as leituras novas, a cada poucos segundos,
+em vez de uma consulta por rerun da página.
+"""
+import datetime
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.pool import PoolError
+
+from src.bd_conection import conexao_postgres
+
+logger = logging.getLogger(__name__)
+
+CAPACIDADE_PADRAO = 360           # leituras por sensor (1 h com leituras a cada 10 s)
+INTERVALO_SINCRONIZACAO = 5.0     # segundos entre buscas de leituras novas no banco
+HORAS_CARGA_INICIAL = 6
+MARGEM_SINCRONIZACAO = datetime.timedelta(seconds=30)
+
+
+def _microssegundos(timestamps):
+    return np.asarray(pd.to_datetime(np.asarray(timestamps)), dtype='datetime64[us]').astype(np.int64)
+
+
+class ArmazemLeituras:
+    """Últimas `capacidade` leituras de cada sensor em buffers circulares."""
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO, sensores_iniciais=256):
+        self.capacidade = capacidade
+        self._lock = threading.Lock()
+        self._posicoes = {}
+        self._n = 0
+        self._ids = np.zeros(sensores_iniciais, dtype=np.int64)
+        self._valores = np.full((sensores_iniciais, capacidade), np.nan)
+        self._tempos = np.zeros((sensores_iniciais, capacidade), dtype=np.int64)
+        self._pos = np.zeros(sensores_iniciais, dtype=np.int64)          # próxima posição de escrita
+        self._ultimo = np.full(sensores_iniciais, np.iinfo(np.int64).min, dtype=np.int64)
+        self.leituras_recebidas = 0
+        self.leituras_fora_de_ordem = 0
+
+    # --- Escrita ---
+    def _crescer(self):
+        novo = 2 * len(self._ids)
+        extra = novo - len(self._ids)
+        self._ids = np.concatenate([self._ids, np.zeros(extra, dtype=np.int64)])
+        self._valores = np.vstack([self._valores, np.full((extra, self.capacidade), np.nan)])
+        self._tempos = np.vstack([self._tempos, np.zeros((extra, self.capacidade), dtype=np.int64)])
+        self._pos = np.concatenate([self._pos, np.zeros(extra, dtype=np.int64)])
+        self._ultimo = np.concatenate([self._ultimo, np.full(extra, np.iinfo(np.int64).min, dtype=np.int64)])
+
+    def _slots(self, sensor_ids):
+        slots = np.empty(len(sensor_ids), dtype=np.int64)
+        for i, sensor_id in enumerate(sensor_ids):
+            slot = self._posicoes.get(sensor_id)
+            if slot is None:
+                if self._n == len(self._ids):
+                    self._crescer()
+                slot = self._posicoes[sensor_id] = self._n
+                self._ids[slot] = sensor_id
+                self._n += 1
+            slots[i] = slot
+        return slots
+
+    def adicionar_lote(self, sensor_ids, valores, timestamps):
+        """
+        Acrescenta um lote de leituras (arrays do mesmo tamanho). Leituras com instante anterior ou
+        igual à última já guardada do sensor são ignoradas: o buffer fica sempre em ordem cronológica.
+        """
+        sensor_ids = np.asarray(sensor_ids, dtype=np.int64)
+        valores = np.asarray(valores, dtype=np.float64)
+        tempos = _microssegundos(timestamps)
+        if len(sensor_ids) == 0:
+            return 0
+        ordem = np.argsort(tempos, kind='stable')
+        sensor_ids, valores, tempos = sensor_ids[ordem], valores[ordem], tempos[ordem]
+        gravadas = 0
+        with self._lock:
+            slots = self._slots(sensor_ids.tolist())
+            # Mais de uma leitura do mesmo sensor no lote: uma rodada por ocorrência
+            rodada = pd.Series(slots).groupby(slots).cumcount().to_numpy()
+            for r in range(int(rodada.max()) + 1):
+                indices = np.nonzero(rodada == r)[0]
+                s, t = slots[indices], tempos[indices]
+                novas = t > self._ultimo[s]
+                s, t, v = s[novas], t[novas], valores[indices][novas]
+                self._valores[s, self._pos[s]] = v
+                self._tempos[s, self._pos[s]] = t
+                self._pos[s] = (self._pos[s] + 1) % self.capacidade
+                self._ultimo[s] = t
+                gravadas += len(s)
+            self.leituras_recebidas += len(sensor_ids)
+            self.leituras_fora_de_ordem += len(sensor_ids) - gravadas
+        return gravadas
+
+    def __call__(self, lote):
+        """Consumidor de lotes (sensor_ids, valores, unidades, timestamps) do servidor de ingestão."""
+        self.adicionar_lote(lote[0], lote[1], lote[3])
+
+    # --- Leitura ---
+    def _cronologico(self, slots):
+        """Matrizes (instantes, valores) dos slots em ordem cronológica; posições vazias com NaN."""
+        indices = (self._pos[slots, None] + np.arange(self.capacidade)) % self.capacidade
+        return np.take_along_axis(self._tempos[slots], indices, axis=1), np.take_along_axis(self._valores[slots], indices, axis=1)
+
+    def ultimas(self, sensor_id, n=None):
+        """Últimas `n` leituras (todas, se None) de um sensor: DataFrame com 'Timestamp' e 'Valor Lido'."""
+        with self._lock:
+            slot = self._posicoes.get(int(sensor_id))
+            if slot is None:
+                return pd.DataFrame(columns=['Timestamp', 'Valor Lido'])
+            tempos, valores = self._cronologico(np.array([slot]))
+        validos = ~np.isnan(valores[0])
+        tempos, valores = tempos[0][validos], valores[0][validos]
+        if n is not None:
+            tempos, valores = tempos[-n:], valores[-n:]
+        return pd.DataFrame({'Timestamp': tempos.astype('datetime64[us]'), 'Valor Lido': valores})
+
+    def ultimos_valores(self):
+        """Leitura mais recente de cada sensor: 'ID Sensor', 'Timestamp', 'Valor Lido'."""
+        with self._lock:
+            slots = np.arange(self._n)
+            anterior = (self._pos[slots] - 1) % self.capacidade
+            return pd.DataFrame({
+                'ID Sensor': self._ids[slots],
+                'Timestamp': self._tempos[slots, anterior].astype('datetime64[us]'),
+                'Valor Lido': self._valores[slots, anterior],
+            })
+
+    def taxas_variacao(self, janela_s=3600):
+        """
+        Inclinação por mínimos quadrados (unidade por hora) das leituras de cada sensor na
+        última `janela_s` segundos. Sensores com menos de duas leituras na janela ficam NaN.
+        Retorna uma Series indexada pelo ID do sensor.
+        """
+        with self._lock:
+            slots = np.arange(self._n)
+            tempos, valores = self._cronologico(slots)
+            ids = self._ids[slots].copy()
+            ultimo = self._ultimo[slots].copy()
+        na_janela = ~np.isnan(valores) & (tempos >= (ultimo - int(janela_s * 1e6))[:, None])
+        horas = np.where(na_janela, (tempos - ultimo[:, None]) / 3.6e9, 0.0)
+        v = np.where(na_janela, valores, 0.0)
+        n = na_janela.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_h = horas.sum(axis=1) / n
+            media_v = v.sum(axis=1) / n
+            cov = (np.where(na_janela, (horas - media_h[:, None]) * (v - media_v[:, None]), 0.0)).sum(axis=1)
+            var = (np.where(na_janela, (horas - media_h[:, None]) ** 2, 0.0)).sum(axis=1)
+            taxa = np.where((n >= 2) & (var > 0), cov / var, np.nan)
+        return pd.Series(taxa, index=ids, name='Taxa por Hora')
+
+    def historico_recente(self, limite=100):
+        """As `limite` leituras mais recentes da rede inteira, da mais nova para a mais antiga."""
+        with self._lock:
+            slots = np.arange(self._n)
+            validos = ~np.isnan(self._valores[slots])
+            linhas, colunas = np.nonzero(validos)
+            tempos = self._tempos[slots][linhas, colunas]
+            valores = self._valores[slots][linhas, colunas]
+            ids = self._ids[slots][linhas]
+        if len(tempos) > limite:
+            recentes = np.argpartition(tempos, len(tempos) - limite)[-limite:]
+            tempos, valores, ids = tempos[recentes], valores[recentes], ids[recentes]
+        ordem = np.argsort(tempos)[::-1]
+        return pd.DataFrame({
+            'ID Sensor': ids[ordem],
+            'Timestamp': tempos[ordem].astype('datetime64[us]'),
+            'Valor Lido': valores[ordem],
+        })
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'sensores': self._n,
+                'capacidade_por_sensor': self.capacidade,
+                'leituras_recebidas': self.leituras_recebidas,
+                'leituras_fora_de_ordem': self.leituras_fora_de_ordem,
+                'memoria_bytes': self._valores.nbytes + self._tempos.nbytes + self._pos.nbytes + self._ultimo.nbytes + self._ids.nbytes,
+            }
+
+
+class SincronizadorArmazem:
+    """
+    Mantém um ArmazemLeituras atualizado a partir de LEITURAS_SENSORES. Cada busca traz as leituras
+    com LEITURA_ID acima do maior já visto e relê os últimos MARGEM_SINCRONIZACAO antes da marca
+    d'água de tempo (limitada ao instante atual), para as gravadas com atraso.
+    """
+
+    def __init__(self, armazem, intervalo=INTERVALO_SINCRONIZACAO, horas_iniciais=HORAS_CARGA_INICIAL):
+        self.armazem = armazem
+        self.intervalo = intervalo
+        self.horas_iniciais = horas_iniciais
+        self._watermark = None
+        self._ultimo_id = 0
+        self._parar = threading.Event()
+        self._thread = None
+        self.sincronizacoes = 0
+        self.falhas = 0
+
+    def sincronizar(self):
+        """Busca as leituras novas (na primeira vez, as últimas horas). Retorna quantas chegaram."""
+        agora = datetime.datetime.now()
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                if self._watermark is None:
+                    cursor.execute("SELECT COALESCE(MAX(LEITURA_ID), 0) FROM LEITURAS_SENSORES")
+                    ultimo_id = cursor.fetchone()[0]
+                    # Carga inicial limitada à capacidade de cada buffer
+                    cursor.execute("""
+                        SELECT SENSOR_ID, VALOR_LIDO::float8, TIMESTAMP_LEITURA, LEITURA_ID FROM (
+                            SELECT SENSOR_ID, VALOR_LIDO, TIMESTAMP_LEITURA, LEITURA_ID,
+                                   ROW_NUMBER() OVER (PARTITION BY SENSOR_ID ORDER BY TIMESTAMP_LEITURA DESC) AS ORDEM
+                            FROM LEITURAS_SENSORES
+                            WHERE TIMESTAMP_LEITURA > %s
+                        ) R
+                        WHERE ORDEM <= %s
+                    """, (agora - datetime.timedelta(hours=self.horas_iniciais), self.armazem.capacidade))
+                else:
+                    ultimo_id = self._ultimo_id
+                    # Margem para leituras gravadas com pequeno atraso; repetidas são ignoradas pelo armazém
+                    cursor.execute("""
+                        SELECT SENSOR_ID, VALOR_LIDO::float8, TIMESTAMP_LEITURA, LEITURA_ID
+                        FROM LEITURAS_SENSORES
+                        WHERE LEITURA_ID > %s OR TIMESTAMP_LEITURA > %s
+                    """, (self._ultimo_id, self._watermark - MARGEM_SINCRONIZACAO))
+                linhas = cursor.fetchall()
+        self.sincronizacoes += 1
+        self._ultimo_id = ultimo_id
+        if not linhas:
+            if self._watermark is None:
+                self._watermark = agora - datetime.timedelta(hours=self.horas_iniciais)
+            return 0
+        sensor_ids, valores, timestamps, leitura_ids = zip(*linhas)
+        self.armazem.adicionar_lote(sensor_ids, valores, timestamps)
+        self._ultimo_id = max(ultimo_id, max(leitura_ids))
+        # Leituras com timestamp no futuro (relógio do sensor adiantado) não empurram a marca d'água
+        self._watermark = min(max(max(timestamps), self._watermark or datetime.datetime.min), agora)
+        return len(linhas)
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.sincronizar()
+            except (psycopg2.Error, PoolError) as e:
+                self.falhas += 1
+                logger.warning("Falha ao sincronizar o armazém de leituras: %s", e)
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="sincronizador-armazem", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_armazem = None
+_sincronizador = None
+_lock_armazem = threading.Lock()
+
+def obter_armazem_sincronizado():
+    """
+    Armazém compartilhado pelo processo, sincronizado com o banco em segundo plano.
+    A primeira chamada faz a carga inicial antes de retornar; as seguintes não acessam o banco.
+    """
+    global _armazem, _sincronizador
+    with _lock_armazem:
+        if _armazem is None:
+            armazem = ArmazemLeituras()
+            sincronizador = SincronizadorArmazem(armazem)
+            try:
+                sincronizador.sincronizar()
+            except (psycopg2.Error, PoolError) as e:
+                sincronizador.falhas += 1
+                logger.warning("Carga inicial do armazém de leituras falhou: %s", e)
+            _armazem, _sincronizador = armazem, sincronizador.iniciar()
+        return _armazem
+
+def estatisticas_armazem():
+    """Contadores do armazém sincronizado do processo (vazio se ainda não foi criado)."""
+    if _armazem is None:
+        return {}
+    return {**_armazem.estatisticas(), 'sincronizacoes': _sincronizador.sincronizacoes, 'falhas_sincronizacao': _sincronizador.falhas}
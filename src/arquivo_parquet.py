@@ -0,0 +1,219 @@
+"""
+Arquivo colunar (Parquet) do histórico de leituras.
+
+Espelha LEITURAS_SENSORES, já unida aos metadados do sensor, em arquivos Parquet
+particionados por data (data=AAAA-MM-DD/). A sincronização é incremental pelo
+LEITURA_ID. IDs pulados são guardados como lacunas e procurados de novo nas sincronizações
+seguintes, porque uma transação ainda aberta pode gravá-los depois de IDs maiores.
+As leituras longas de análise e treinamento usam filtros por data e seleção de colunas
+aplicados direto nos arquivos, sem carregar o banco OLTP.
+
+Uso (a partir da raiz do projeto):
+    python -m src.arquivo_parquet            # sincroniza o arquivo com o banco
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.bd_conection import conexao_postgres
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_ARQUIVO = os.environ.get("ARQUIVO_LEITURAS_DIR", os.path.join("dados", "arquivo_leituras"))
+ARQUIVO_WATERMARK = "_watermark.json"
+# Lacunas de LEITURA_ID mais antigas que isso são de transações desfeitas e deixam de ser procuradas
+VALIDADE_LACUNAS = datetime.timedelta(hours=1)
+
+ESQUEMA_ARQUIVO = pa.schema([
+    ("leitura_id", pa.int64()),
+    ("sensor_id", pa.int32()),
+    ("timestamp_leitura", pa.timestamp("us")),
+    ("tipo_sensor", pa.string()),
+    ("localizacao_geo", pa.string()),
+    ("valor_lido", pa.float32()),
+    ("unidade_medida", pa.string()),
+    ("data", pa.date32()),
+])
+PARTICIONAMENTO = ds.partitioning(pa.schema([("data", pa.date32())]), flavor="hive")
+
+# Nomes das colunas do arquivo -> nomes usados nos DataFrames do painel
+COLUNAS_PAINEL = {
+    "timestamp_leitura": "Timestamp",
+    "tipo_sensor": "Tipo Sensor",
+    "localizacao_geo": "Localização",
+    "valor_lido": "Valor Lido",
+    "unidade_medida": "Unidade",
+}
+
+
+def _ler_estado(diretorio):
+    """(último LEITURA_ID exportado, lacunas [[início, fim, vista em (ISO)]]) do arquivo de watermark."""
+    caminho = os.path.join(diretorio, ARQUIVO_WATERMARK)
+    if not os.path.exists(caminho):
+        return 0, []
+    with open(caminho) as f:
+        estado = json.load(f)
+    return estado.get("ultimo_leitura_id", 0), estado.get("lacunas", [])
+
+def _ler_watermark(diretorio):
+    return _ler_estado(diretorio)[0]
+
+def _gravar_watermark(diretorio, ultimo_id, lacunas=()):
+    caminho = os.path.join(diretorio, ARQUIVO_WATERMARK)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w") as f:
+        json.dump({"ultimo_leitura_id": int(ultimo_id), "lacunas": [[int(inicio), int(fim), vista] for inicio, fim, vista in lacunas],
+                   "atualizado_em": datetime.datetime.now().isoformat()}, f)
+    os.replace(temporario, caminho)
+
+def _atualizar_lacunas(lacunas, ids, ultimo_id, agora):
+    """
+    Tira das lacunas os LEITURA_ID encontrados (`ids`, ordenados) e acrescenta os intervalos
+    pulados entre `ultimo_id` e os IDs novos. Retorna (lacunas, novo último ID).
+    """
+    restantes = []
+    for inicio, fim, vista in lacunas:
+        dentro = ids[(ids >= inicio) & (ids <= fim)]
+        for leitura_id in dentro.tolist():
+            if leitura_id > inicio:
+                restantes.append([inicio, leitura_id - 1, vista])
+            inicio = leitura_id + 1
+        if inicio <= fim:
+            restantes.append([inicio, fim, vista])
+    novos = ids[ids > ultimo_id]
+    if len(novos):
+        anteriores = np.concatenate([[ultimo_id], novos[:-1]])
+        pulados = novos - anteriores > 1
+        restantes += [[int(a) + 1, int(n) - 1, agora] for a, n in zip(anteriores[pulados], novos[pulados])]
+        ultimo_id = int(novos[-1])
+    return restantes, ultimo_id
+
+def arquivo_disponivel(diretorio=DIRETORIO_ARQUIVO):
+    """Indica se já existe um arquivo sincronizado no diretório."""
+    return _ler_watermark(diretorio) > 0
+
+def sincronizar_arquivo_parquet(diretorio=DIRETORIO_ARQUIVO, tamanho_bloco=200_000):
+    """
+    Exporta para o arquivo as leituras com LEITURA_ID maior que o último já exportado e as que
+    preencheram lacunas de sincronizações anteriores (gravadas depois de IDs maiores).
+    Lê o banco com cursor no servidor, em blocos de `tamanho_bloco` linhas, e grava
+    cada bloco como novos arquivos nas partições de data correspondentes.
+    Retorna o número de linhas exportadas.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    ultimo_id, lacunas = _ler_estado(diretorio)
+    agora = datetime.datetime.now()
+    lacunas = [lacuna for lacuna in lacunas if agora - datetime.datetime.fromisoformat(lacuna[2]) < VALIDADE_LACUNAS]
+    exportadas = 0
+
+    with conexao_postgres() as conn:
+        with conn.cursor(name="sincronizar_arquivo_parquet") as cursor:
+            cursor.itersize = tamanho_bloco
+            cursor.execute("""
+                SELECT
+                    l.leitura_id,
+                    l.sensor_id,
+                    l.timestamp_leitura,
+                    s.tipo_sensor,
+                    s.localizacao_geo,
+                    l.valor_lido::float8,
+                    l.unidade_medida
+                FROM leituras_sensores l
+                JOIN sensores_ambientais s ON l.sensor_id = s.sensor_id
+                WHERE l.leitura_id > %s
+                UNION ALL
+                SELECT
+                    l.leitura_id,
+                    l.sensor_id,
+                    l.timestamp_leitura,
+                    s.tipo_sensor,
+                    s.localizacao_geo,
+                    l.valor_lido::float8,
+                    l.unidade_medida
+                FROM unnest(%s::bigint[], %s::bigint[]) AS g(inicio, fim)
+                JOIN leituras_sensores l ON l.leitura_id BETWEEN g.inicio AND g.fim
+                JOIN sensores_ambientais s ON l.sensor_id = s.sensor_id
+                ORDER BY 1
+            """, (ultimo_id, [lacuna[0] for lacuna in lacunas], [lacuna[1] for lacuna in lacunas]))
+            while True:
+                linhas = cursor.fetchmany(tamanho_bloco)
+                if not linhas:
+                    break
+                df = pd.DataFrame(linhas, columns=[n for n in ESQUEMA_ARQUIVO.names if n != "data"])
+                df["data"] = df["timestamp_leitura"].dt.date
+                tabela = pa.Table.from_pandas(df, schema=ESQUEMA_ARQUIVO, preserve_index=False)
+                ds.write_dataset(
+                    tabela,
+                    diretorio,
+                    format="parquet",
+                    partitioning=PARTICIONAMENTO,
+                    basename_template=f"parte-{uuid.uuid4().hex}-{{i}}.parquet",
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+                lacunas, ultimo_id = _atualizar_lacunas(lacunas, df["leitura_id"].to_numpy(), ultimo_id, agora.isoformat())
+                _gravar_watermark(diretorio, ultimo_id, lacunas)
+                exportadas += len(df)
+                logger.info("%d leituras exportadas (até LEITURA_ID %d)", exportadas, ultimo_id)
+    # Sem leituras novas as lacunas vencidas também precisam sair do estado
+    _gravar_watermark(diretorio, ultimo_id, lacunas)
+    return exportadas
+
+def ler_arquivo_leituras(periodo_dias=30, tipos_sensor=None, colunas=None, diretorio=DIRETORIO_ARQUIVO):
+    """
+    Lê do arquivo Parquet as leituras dos últimos `periodo_dias`.
+    O filtro de data elimina partições inteiras; `tipos_sensor` e `colunas`
+    (nomes do arquivo, ex.: ['timestamp_leitura', 'valor_lido']) reduzem o que é lido dos arquivos.
+    Retorna as mesmas colunas de `obter_dados_leituras_sensores`, com textos como categorias e valores em float32.
+    """
+    if not arquivo_disponivel(diretorio):
+        return pd.DataFrame(columns=list(COLUNAS_PAINEL.values()))
+
+    inicio = datetime.datetime.now() - datetime.timedelta(days=periodo_dias)
+    filtro = (ds.field("data") >= pa.scalar(inicio.date(), pa.date32())) & \
+             (ds.field("timestamp_leitura") >= pa.scalar(inicio, pa.timestamp("us")))
+    if tipos_sensor:
+        filtro = filtro & ds.field("tipo_sensor").isin(list(tipos_sensor))
+
+    colunas = list(colunas or COLUNAS_PAINEL.keys())
+    dataset = ds.dataset(diretorio, format="parquet", partitioning=PARTICIONAMENTO, exclude_invalid_files=True)
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    df = tabela.to_pandas(strings_to_categorical=True)
+    df = df.rename(columns=COLUNAS_PAINEL)
+    if "Timestamp" in df.columns:
+        df = df.sort_values("Timestamp", ignore_index=True)
+    return df
+
+def ler_arquivo_agregado(periodo_dias=30, intervalo_horas=1, diretorio=DIRETORIO_ARQUIVO):
+    """Médias por sensor em intervalos de `intervalo_horas`, calculadas a partir do arquivo Parquet."""
+    df = ler_arquivo_leituras(periodo_dias, diretorio=diretorio)
+    if df.empty or not intervalo_horas:
+        return df
+    agregado = (
+        df.groupby(['Tipo Sensor', 'Localização', pd.Grouper(key='Timestamp', freq=f'{intervalo_horas}h')], observed=True)
+        .agg({'Valor Lido': 'mean', 'Unidade': 'first'})
+        .reset_index()
+    )
+    return agregado[['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']].sort_values('Timestamp', ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza o arquivo Parquet de leituras com o banco.")
+    parser.add_argument("--diretorio", default=DIRETORIO_ARQUIVO)
+    parser.add_argument("--tamanho-bloco", type=int, default=200_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    total = sincronizar_arquivo_parquet(args.diretorio, args.tamanho_bloco)
+    logger.info("Sincronização concluída: %d novas leituras no arquivo %s", total, args.diretorio)
+
+
+if __name__ == "__main__":
+    main()
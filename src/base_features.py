@@ -0,0 +1,265 @@
+"""
+Base de features persistida para a previsão de nível de água.
+
+Para cada `intervalo_horas` e fonte (agregados do banco ou arquivo Parquet) guarda em arquivos
+Parquet a matriz larga já pronta para os modelos: uma linha por intervalo, o valor médio de cada
+sensor (colunas Sensor_Key, "<tipo>_<localização>") e as features derivadas dele:
+- Nível de Água: _lag1, _lag3, _lag6 (valor 1, 3 e 6 intervalos antes);
+- Pluviômetro: _acc3h, _acc6h, _acc12h (soma dos 3, 6 e 12 intervalos anteriores);
+- Umidade do Solo: _lag1.
+
+`atualizar` lê só os intervalos fechados depois do último gravado e calcula as features deles a
+partir de uma cauda com os últimos JANELA_MAXIMA intervalos, guardada junto com o estado; o custo
+é proporcional aos intervalos novos, não à janela inteira. Cada atualização vira um arquivo
+"parte-<início>-<fim>-<id>.parquet"; a leitura descarta pelo nome os arquivos fora do período e,
+acima de LIMITE_PARTES arquivos, eles são compactados num só.
+
+Uso (a partir da raiz do projeto):
+    python -m src.base_features --intervalo 1 --fonte banco
+"""
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.arquivo_parquet import ler_arquivo_agregado
+from src.utils import obter_leituras_agregadas
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_BASE_FEATURES = os.environ.get("BASE_FEATURES_DIR", os.path.join("dados", "base_features"))
+ARQUIVO_ESTADO = "_estado.json"
+ARQUIVO_CAUDA = "_cauda.parquet"
+
+# Defasagens (nível, umidade) e somas móveis (chuva), em número de intervalos
+DEFASAGENS = {'Nível de Água': (1, 3, 6), 'Umidade do Solo': (1,)}
+ACUMULADOS = {'Pluviômetro': (3, 6, 12)}
+JANELA_MAXIMA = 12
+DIAS_INICIAIS = 365                        # histórico lido na primeira construção
+MARGEM_FECHAMENTO = datetime.timedelta(minutes=15)   # espera pelos agregados antes de dar o intervalo por fechado
+LIMITE_PARTES = 48
+RETENCAO_DIAS = 400
+COLUNA_ALVO = 'TARGET_Nivel_Agua_Futuro'
+
+# Sensor_Key: mesma chave de antes ("Tipo_Localização" sem ':' e com ' ', ',', '-', '/' trocados por '_')
+TRADUCAO_CHAVE = str.maketrans({' ': '_', ':': None, ',': '_', '-': '_', '/': '_'})
+
+
+def pivotar_por_sensor(df_raw):
+    """
+    Leituras longas (Timestamp, Tipo Sensor, Localização, Valor Lido) -> matriz larga com uma coluna
+    por Sensor_Key. A chave é montada uma vez por par (tipo, localização), não por linha.
+    Retorna (matriz, {Sensor_Key: tipo}).
+    """
+    pares = pd.MultiIndex.from_arrays([df_raw['Tipo Sensor'].astype(str), df_raw['Localização'].astype(str)])
+    codigos, unicos = pares.factorize()
+    chaves = np.array([f"{tipo}_{local.translate(TRADUCAO_CHAVE)}" for tipo, local in unicos], dtype=object)
+    longo = pd.DataFrame({'Timestamp': df_raw['Timestamp'].to_numpy(), 'chave': codigos,
+                          'valor': df_raw['Valor Lido'].to_numpy(dtype=np.float64)})
+    matriz = longo.pivot_table(index='Timestamp', columns='chave', values='valor')
+    matriz.columns = chaves[matriz.columns]
+    # Duas localizações que viram a mesma chave são tratadas como um sensor só (como no pivot anterior)
+    matriz = matriz.T.groupby(level=0).mean().T
+    tipos = {chave: tipo for chave, (tipo, _) in zip(chaves, unicos)}
+    return matriz.sort_index(), tipos
+
+def calcular_features(bruto, tipos):
+    """Features de cada coluna de `bruto` (matriz regular no tempo) segundo o tipo do sensor. Retorna (features, nomes)."""
+    partes = []
+    for tipo, defasagens in DEFASAGENS.items():
+        bloco = bruto[[coluna for coluna in bruto.columns if tipos.get(coluna) == tipo]]
+        partes += [bloco.shift(k).add_suffix(f'_lag{k}') for k in defasagens]
+    for tipo, janelas in ACUMULADOS.items():
+        bloco = bruto[[coluna for coluna in bruto.columns if tipos.get(coluna) == tipo]]
+        partes += [bloco.rolling(k, min_periods=1).sum().shift(1).add_suffix(f'_acc{k}h') for k in janelas]
+    features = pd.concat(partes, axis=1) if partes else pd.DataFrame(index=bruto.index)
+    # Ordem por sensor: <sensor>_lag1, <sensor>_lag3, ... como na preparação original
+    nomes = sorted(features.columns, key=lambda nome: (nome.rsplit('_', 1)[0], len(nome), nome))
+    return features[nomes], nomes
+
+
+class BaseFeatures:
+    """Matriz de features de um intervalo e fonte, gravada em Parquet e atualizada de forma incremental."""
+
+    def __init__(self, intervalo_horas=1, fonte='banco', diretorio=DIRETORIO_BASE_FEATURES):
+        self.intervalo_horas = int(intervalo_horas)
+        self.fonte = fonte
+        self.passo = pd.Timedelta(hours=self.intervalo_horas)
+        self.diretorio = os.path.join(diretorio, f"{fonte}_{self.intervalo_horas}h")
+        self._lock = threading.Lock()
+
+    # --- Estado ---
+    def _ler_estado(self):
+        caminho = os.path.join(self.diretorio, ARQUIVO_ESTADO)
+        if not os.path.exists(caminho):
+            return {'ultimo_intervalo': None, 'tipos': {}, 'features': []}
+        with open(caminho) as f:
+            estado = json.load(f)
+        estado['ultimo_intervalo'] = pd.Timestamp(estado['ultimo_intervalo']) if estado['ultimo_intervalo'] else None
+        return estado
+
+    def _gravar_estado(self, estado):
+        caminho = os.path.join(self.diretorio, ARQUIVO_ESTADO)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w") as f:
+            json.dump({**estado, 'ultimo_intervalo': estado['ultimo_intervalo'].isoformat(),
+                       'atualizado_em': datetime.datetime.now().isoformat()}, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    def _ler_cauda(self):
+        caminho = os.path.join(self.diretorio, ARQUIVO_CAUDA)
+        return pd.read_parquet(caminho) if os.path.exists(caminho) else pd.DataFrame()
+
+    def _gravar_parquet(self, df, caminho):
+        temporario = caminho + ".tmp"
+        df.to_parquet(temporario)
+        os.replace(temporario, caminho)
+
+    def disponivel(self):
+        return self._ler_estado()['ultimo_intervalo'] is not None
+
+    def precisa_atualizar(self, agora=None):
+        """Verdadeiro quando já fechou um intervalo depois do último gravado (sem consultar a fonte)."""
+        ultimo = self._ler_estado()['ultimo_intervalo']
+        agora = pd.Timestamp(agora or datetime.datetime.now())
+        return ultimo is None or ultimo + 2 * self.passo <= agora - MARGEM_FECHAMENTO
+
+    # --- Atualização incremental ---
+    def _ler_fonte(self, desde, agora):
+        periodo_dias = (agora - desde).total_seconds() / 86400 + 1 / 24
+        if self.fonte == 'parquet':
+            return ler_arquivo_agregado(periodo_dias, self.intervalo_horas)
+        return obter_leituras_agregadas(periodo_dias, self.intervalo_horas)
+
+    def atualizar(self, agora=None):
+        """
+        Acrescenta à base os intervalos fechados desde a última atualização (na primeira vez, os
+        últimos DIAS_INICIAIS dias). Retorna quantos intervalos foram gravados.
+        """
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            estado = self._ler_estado()
+            agora = pd.Timestamp(agora or datetime.datetime.now())
+            ultimo = estado['ultimo_intervalo']
+            desde = ultimo + self.passo if ultimo is not None else agora - pd.Timedelta(days=DIAS_INICIAIS)
+            # Só intervalos fechados: o seguinte já começou há mais de MARGEM_FECHAMENTO
+            limite = agora - MARGEM_FECHAMENTO - self.passo
+            if desde > limite:
+                return 0
+
+            df_raw = self._ler_fonte(desde, agora)
+            if df_raw.empty:
+                return 0
+            df_raw = df_raw[(df_raw['Timestamp'] >= desde) & (df_raw['Timestamp'] <= limite)]
+            if df_raw.empty:
+                return 0
+            novo, tipos_novos = pivotar_por_sensor(df_raw)
+            tipos = {**estado['tipos'], **tipos_novos}
+
+            # Cauda + intervalos novos numa grade regular; ffill carrega o último valor conhecido de cada sensor
+            cauda = self._ler_cauda()
+            bruto = pd.concat([cauda, novo]) if not cauda.empty else novo
+            bruto = bruto[~bruto.index.duplicated(keep='last')].sort_index()
+            bruto = bruto.resample(self.passo).mean().ffill()
+            features, nomes = calcular_features(bruto, tipos)
+            novas_linhas = bruto.index >= desde
+            saida = pd.concat([bruto, features], axis=1).loc[novas_linhas]
+            if saida.empty:
+                return 0
+
+            nome = f"parte-{saida.index[0]:%Y%m%d%H}-{saida.index[-1]:%Y%m%d%H}-{uuid.uuid4().hex[:8]}.parquet"
+            self._gravar_parquet(saida.rename_axis('Timestamp').reset_index(), os.path.join(self.diretorio, nome))
+            self._gravar_parquet(bruto.tail(JANELA_MAXIMA), os.path.join(self.diretorio, ARQUIVO_CAUDA))
+            self._gravar_estado({'ultimo_intervalo': saida.index[-1], 'tipos': tipos, 'features': nomes})
+            logger.info("Base de features %s: %d intervalos novos até %s", self.diretorio, len(saida), saida.index[-1])
+            if len(self._partes()) > LIMITE_PARTES:
+                self._compactar(agora)
+            return len(saida)
+
+    def _partes(self):
+        return sorted(glob.glob(os.path.join(self.diretorio, "parte-*.parquet")))
+
+    def _compactar(self, agora):
+        """Junta as partes num único arquivo, descartando o que passou de RETENCAO_DIAS."""
+        partes = self._partes()
+        df = self._ler_partes(partes, agora - pd.Timedelta(days=RETENCAO_DIAS))
+        if df.empty:
+            return
+        nome = f"parte-{df.index[0]:%Y%m%d%H}-{df.index[-1]:%Y%m%d%H}-{uuid.uuid4().hex[:8]}.parquet"
+        self._gravar_parquet(df.rename_axis('Timestamp').reset_index(), os.path.join(self.diretorio, nome))
+        for caminho in partes:
+            os.remove(caminho)
+
+    # --- Leitura ---
+    def _ler_partes(self, partes, inicio):
+        selecionadas = []
+        for caminho in partes:
+            # parte-<início>-<fim>-<id>.parquet: arquivos que terminam antes do período nem são abertos
+            fim = pd.Timestamp(datetime.datetime.strptime(os.path.basename(caminho).split('-')[2], "%Y%m%d%H"))
+            if fim >= inicio:
+                selecionadas.append(pd.read_parquet(caminho, filters=[('Timestamp', '>=', inicio)]))
+        if not selecionadas:
+            return pd.DataFrame()
+        df = pd.concat(selecionadas).set_index('Timestamp')
+        return df[~df.index.duplicated(keep='last')].sort_index()
+
+    def matriz(self, periodo_dias=90, agora=None):
+        """
+        Matriz dos últimos `periodo_dias`: colunas brutas por sensor, features e a coluna alvo
+        (nível de água do intervalo seguinte). Retorna (df, features, coluna do nível alvo).
+        """
+        estado = self._ler_estado()
+        agora = pd.Timestamp(agora or datetime.datetime.now())
+        df = self._ler_partes(self._partes(), agora - pd.Timedelta(days=periodo_dias))
+        niveis = sorted(chave for chave, tipo in estado['tipos'].items() if tipo == 'Nível de Água' and chave in df.columns)
+        if df.empty or not niveis:
+            return df, [], None
+        features = [nome for nome in estado['features'] if nome in df.columns]
+        # Sensores que começaram a reportar depois do início do período: preenchidos para trás (como o bfill anterior)
+        df[features] = df[features].bfill()
+        df[COLUNA_ALVO] = df[niveis[0]].shift(-1)
+        return df, features, niveis[0]
+
+    def ultima_linha(self, features):
+        """Features do intervalo fechado mais recente, para a previsão em tempo real. Retorna (Timestamp, dict)."""
+        partes = self._partes()
+        if not partes:
+            return None, {}
+        df = pd.read_parquet(partes[-1]).set_index('Timestamp').sort_index()
+        linha = df.iloc[-1]
+        return df.index[-1], {nome: linha.get(nome, np.nan) for nome in features}
+
+
+_bases = {}
+_lock_bases = threading.Lock()
+
+def obter_base_features(intervalo_horas=1, fonte='banco'):
+    """Instância compartilhada pelo processo para cada (intervalo, fonte)."""
+    with _lock_bases:
+        chave = (int(intervalo_horas), fonte)
+        if chave not in _bases:
+            _bases[chave] = BaseFeatures(intervalo_horas, fonte)
+        return _bases[chave]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza a base de features da previsão de nível de água.")
+    parser.add_argument("--intervalo", type=int, nargs="+", default=[1, 3, 6, 12], help="Intervalos em horas.")
+    parser.add_argument("--fonte", choices=["banco", "parquet"], default="banco")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    for intervalo in args.intervalo:
+        novos = obter_base_features(intervalo, args.fonte).atualizar()
+        logger.info("Intervalo de %dh: %d intervalos acrescentados", intervalo, novos)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,263 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool as pg_pool
 import pandas as pd
 import streamlit as st
 
+from src.instrumentacao_consultas import instrumentar_cursor
+
+
+# --- Configurações do Banco de Dados PostgreSQL (lidas do ambiente) ---
+def _config_postgres():
+    """Monta os parâmetros de conexão a partir das variáveis de ambiente."""
+    config = {
+        "user": os.environ.get("PG_USER", "postgres"),
+        "host": os.environ.get("PG_HOST", "localhost"),
+        "port": int(os.environ.get("PG_PORT", 5433)),
+        "database": os.environ.get("PG_DATABASE", "postgres"),
+        "connect_timeout": int(os.environ.get("PG_CONNECT_TIMEOUT", 5)),
+    }
+    senha = os.environ.get("PG_PASSWORD")
+    if senha:
+        config["password"] = senha
+    return config
+
+POOL_MAX_CONEXOES = int(os.environ.get("PG_POOL_MAX", 10))
+# No ThreadedConnectionPool, minconn também é o teto de conexões ociosas: ao devolver uma conexão
+# com minconn já livres, ela é fechada. Com minconn pequeno, cada pico de uso reabre conexões
+# (handshake e autenticação a cada consulta); por padrão todas as conexões ficam abertas.
+POOL_MIN_CONEXOES = min(int(os.environ.get("PG_POOL_MIN", POOL_MAX_CONEXOES)), POOL_MAX_CONEXOES)
+# Tempo máximo (s) que um operador espera por uma conexão livre
+POOL_TIMEOUT_ESPERA = float(os.environ.get("PG_POOL_TIMEOUT", 10))
+# Conexões ociosas há mais tempo que isso (s) são testadas com SELECT 1 antes do uso
+POOL_INTERVALO_HEALTHCHECK = float(os.environ.get("PG_POOL_HEALTHCHECK", 30))
+
+
+class MetricasPool:
+    """Acumula métricas de espera e de retenção das conexões do pool."""
+
+    def __init__(self, tamanho_amostra=1000):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.conexoes_descartadas = 0
+        self.em_uso = 0
+        self.pico_em_uso = 0
+        self._esperas = deque(maxlen=tamanho_amostra)
+        self._retencoes = deque(maxlen=tamanho_amostra)
+
+    def registrar_checkout(self, espera):
+        with self._lock:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.pico_em_uso = max(self.pico_em_uso, self.em_uso)
+            self._esperas.append(espera)
+
+    def registrar_devolucao(self, retencao):
+        with self._lock:
+            self.em_uso -= 1
+            self._retencoes.append(retencao)
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_descarte(self):
+        with self._lock:
+            self.conexoes_descartadas += 1
+
+    @staticmethod
+    def _percentis(amostras):
+        if not amostras:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordenadas = sorted(amostras)
+        n = len(ordenadas)
+        return {
+            "p50_ms": round(ordenadas[int(0.50 * (n - 1))] * 1000, 2),
+            "p95_ms": round(ordenadas[int(0.95 * (n - 1))] * 1000, 2),
+            "max_ms": round(ordenadas[-1] * 1000, 2),
+        }
+
+    def resumo(self):
+        with self._lock:
+            esperas = list(self._esperas)
+            retencoes = list(self._retencoes)
+            resumo = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "conexoes_descartadas": self.conexoes_descartadas,
+                "em_uso": self.em_uso,
+                "pico_em_uso": self.pico_em_uso,
+            }
+        resumo["espera"] = self._percentis(esperas)
+        resumo["retencao"] = self._percentis(retencoes)
+        return resumo
+
+
+class PoolConexoes:
+    """
+    Pool de conexões PostgreSQL compartilhado por todo o processo.
+    O ThreadedConnectionPool do psycopg2 falha imediatamente quando esgotado;
+    aqui um semáforo faz o chamador esperar (até POOL_TIMEOUT_ESPERA) por uma vaga,
+    o que permite medir o tempo de espera e dimensionar o pool.
+    """
+
+    def __init__(self, minconn, maxconn, timeout_espera, intervalo_healthcheck, **config):
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **config)
+        self._vagas = threading.BoundedSemaphore(maxconn)
+        self._ultimo_uso = {}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout_espera = timeout_espera
+        self.intervalo_healthcheck = intervalo_healthcheck
+        self.metricas = MetricasPool()
+
+    def _conexao_saudavel(self, conn):
+        if conn.closed:
+            return False
+        ultimo_uso = self._ultimo_uso.get(id(conn), 0)
+        if time.monotonic() - ultimo_uso < self.intervalo_healthcheck:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def obter(self):
+        """Retira uma conexão saudável do pool, aguardando se necessário."""
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(timeout=self.timeout_espera):
+            self.metricas.registrar_timeout()
+            raise pg_pool.PoolError(
+                f"Nenhuma conexão livre após {self.timeout_espera}s (máximo de {self.maxconn} conexões)."
+            )
+        try:
+            conn = self._pool.getconn()
+            while not self._conexao_saudavel(conn):
+                self.metricas.registrar_descarte()
+                self._ultimo_uso.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._vagas.release()
+            raise
+        self.metricas.registrar_checkout(time.perf_counter() - inicio)
+        return ConexaoPool(conn, self)
+
+    def devolver(self, conn, retencao):
+        """Devolve a conexão ao pool, desfazendo qualquer transação pendente."""
+        descartar = conn.closed != 0
+        if not descartar:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        if descartar:
+            self.metricas.registrar_descarte()
+            self._ultimo_uso.pop(id(conn), None)
+        else:
+            self._ultimo_uso[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=descartar)
+        self._vagas.release()
+        self.metricas.registrar_devolucao(retencao)
+
+    def fechar(self):
+        self._pool.closeall()
+
+
+class ConexaoPool:
+    """
+    Conexão emprestada do pool. Repassa tudo para a conexão psycopg2 original,
+    mas `close()` devolve a conexão ao pool em vez de encerrá-la, de modo que o
+    padrão `conn = get_postgres_connection() ... finally: conn.close()` continua válido.
+    """
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+        self._inicio_retencao = time.perf_counter()
+        self._devolvida = False
+
+    def cursor(self, *args, **kwargs):
+        return instrumentar_cursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if not self._devolvida:
+            self._devolvida = True
+            self._pool.devolver(self._conn, time.perf_counter() - self._inicio_retencao)
+
+    @property
+    def closed(self):
+        return 1 if self._devolvida else self._conn.closed
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        self.close()
+        return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(
+                    POOL_MIN_CONEXOES,
+                    POOL_MAX_CONEXOES,
+                    POOL_TIMEOUT_ESPERA,
+                    POOL_INTERVALO_HEALTHCHECK,
+                    **_config_postgres()
+                )
+    return _pool
+
+def obter_metricas_pool():
+    """Resumo das métricas do pool (checkouts, esperas e tempos de retenção)."""
+    if _pool is None:
+        return {}
+    resumo = _pool.metricas.resumo()
+    resumo["min_conexoes"] = _pool.minconn
+    resumo["max_conexoes"] = _pool.maxconn
+    return resumo
+
 
 # Conexão com o PostgreSQL
 def get_postgres_connection():
-    # --- Configurações do Banco de Dados PostgreSQL ---
-    POSTGRES_USER = "postgres"
-    POSTGRES_PASSWORD = "lcv123"
-    POSTGRES_HOST = "localhost"
-    POSTGRES_PORT = 5433
-    POSTGRES_DB = "postgres"  
+    """Empresta uma conexão do pool. `close()` a devolve ao pool."""
     try:
-        connection = psycopg2.connect(
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            database=POSTGRES_DB
-        )
-        return connection
-    except psycopg2.Error as e:
+        return obter_pool().obter()
+    except (psycopg2.Error, pg_pool.PoolError) as e:
         st.error(f"Erro ao conectar ao PostgreSQL: {e}")
-        return None
\ No newline at end of file
+        return None
+
+@contextmanager
+def conexao_postgres():
+    """
+    Empresta uma conexão do pool dentro de um bloco `with`.
+    Faz commit ao final do bloco, rollback em caso de exceção e sempre devolve a conexão.
+    Diferente de `get_postgres_connection`, propaga os erros de conexão ao chamador.
+    """
+    conn = obter_pool().obter()
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
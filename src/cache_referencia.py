@@ -0,0 +1,87 @@
+import copy
+import functools
+import threading
+import time
+
+import pandas as pd
+
+
+# Tempo de vida (segundos) das leituras em cache de cada tabela de referência
+TTL_TABELAS = {
+    'SENSORES_AMBIENTAIS': 300,
+    'COMUNIDADES': 600,
+    'ABRIGOS': 60,
+    'RECURSOS': 60,
+    'ROTAS_EVACUACAO': 120,
+    'SOLICITACOES_AJUDA': 15,
+    'LIMIARES_ALERTA': 300,
+}
+TTL_PADRAO = 60
+
+_entradas = {}
+_lock = threading.Lock()
+_estatisticas = {}
+
+
+def _copiar(valor):
+    """Evita que quem recebe o resultado altere o valor guardado no cache."""
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy()
+    return copy.deepcopy(valor)
+
+def _vazio(valor):
+    """DataFrame vazio, coleção vazia ou, em tuplas (ex.: página + chave da próxima), o primeiro elemento vazio."""
+    if isinstance(valor, tuple) and valor:
+        return _vazio(valor[0])
+    return valor.empty if isinstance(valor, pd.DataFrame) else not valor
+
+def _registrar(tabela, evento):
+    contadores = _estatisticas.setdefault(tabela, {'hits': 0, 'misses': 0, 'invalidacoes': 0})
+    contadores[evento] += 1
+
+def cache_referencia(tabela, ttl=None):
+    """
+    Decorador para funções que leem uma tabela de referência.
+    O resultado fica em memória, por combinação de argumentos, até expirar o TTL da tabela
+    ou até `invalidar_cache(tabela)` ser chamado por uma função de escrita.
+    Resultados vazios não são guardados, pois também são o retorno em caso de erro de banco.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            chave = (tabela, funcao.__qualname__, args, tuple(sorted(kwargs.items())))
+            agora = time.monotonic()
+            with _lock:
+                entrada = _entradas.get(chave)
+                if entrada is not None and entrada[0] > agora:
+                    _registrar(tabela, 'hits')
+                    return _copiar(entrada[1])
+                _registrar(tabela, 'misses')
+
+            resultado = funcao(*args, **kwargs)
+            if not _vazio(resultado):
+                validade = agora + (ttl if ttl is not None else TTL_TABELAS.get(tabela, TTL_PADRAO))
+                with _lock:
+                    _entradas[chave] = (validade, _copiar(resultado))
+            return resultado
+        envoltorio.tabela_cache = tabela
+        return envoltorio
+    return decorador
+
+def invalidar_cache(*tabelas):
+    """Remove do cache todas as entradas das tabelas informadas (sem argumentos, limpa tudo)."""
+    with _lock:
+        for chave in list(_entradas):
+            if not tabelas or chave[0] in tabelas:
+                del _entradas[chave]
+        for tabela in (tabelas or list(_estatisticas)):
+            _registrar(tabela, 'invalidacoes')
+
+def obter_estatisticas_cache():
+    """Hits, misses e invalidações por tabela, mais o número de entradas vivas."""
+    with _lock:
+        resumo = {tabela: dict(contadores) for tabela, contadores in _estatisticas.items()}
+        for chave in _entradas:
+            resumo.setdefault(chave[0], {'hits': 0, 'misses': 0, 'invalidacoes': 0})
+            resumo[chave[0]]['entradas'] = resumo[chave[0]].get('entradas', 0) + 1
+    return resumo
@@ -0,0 +1,168 @@
+"""
+Classificação de leituras em níveis de alerta a partir da tabela LIMIARES_ALERTA.
+
+Cada tipo de sensor tem limiares padrão (linha com SENSOR_ID nulo) e cada sensor pode ter os
+seus próprios (ex.: um trecho de rio com margem mais baixa). Os limiares distintos formam grupos;
+cada leitura é associada ao seu grupo e o nível sai de um `np.searchsorted` por grupo, para o
+lote inteiro de uma vez.
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from src.bd_conection import conexao_postgres
+from src.cache_referencia import cache_referencia
+
+logger = logging.getLogger(__name__)
+
+NIVEIS_ALERTA = np.array(['SEGURO', 'BAIXO', 'MEDIO', 'ALTO', 'CRITICO'], dtype=object)
+CODIGO_NIVEL = {nivel: codigo for codigo, nivel in enumerate(NIVEIS_ALERTA)}
+
+# Limiares de alerta para nível de água (em metros)
+LIMIARES_NIVEL_AGUA = {
+    'BAIXO': 2.0,
+    'MEDIO': 3.5,
+    'ALTO': 5.0,
+    'CRITICO': 6.5
+}
+
+# Limiares de alerta para volume de chuva (em mm/h)
+LIMIARES_CHUVA = {
+    'BAIXO': 5,
+    'MEDIO': 20,
+    'ALTO': 40,
+    'CRITICO': 60
+}
+
+# Usados quando LIMIARES_ALERTA está vazia ou inacessível
+LIMIARES_PADRAO = {
+    'Nível de Água': LIMIARES_NIVEL_AGUA,
+    'Pluviômetro': LIMIARES_CHUVA,
+}
+
+
+def _vetor(limiares):
+    return tuple(float(limiares[nivel]) for nivel in NIVEIS_ALERTA[1:])
+
+
+class ClassificadorAlertas:
+    """Classifica lotes de leituras (arrays) segundo os limiares por tipo de sensor e por sensor."""
+
+    def __init__(self, limiares_tipo=None, limiares_sensor=None, tipos_sensor=None):
+        """
+        limiares_tipo: {tipo_sensor: {'BAIXO':..., 'MEDIO':..., 'ALTO':..., 'CRITICO':...}}
+        limiares_sensor: {sensor_id: {...}} (sobrepõe o padrão do tipo)
+        tipos_sensor: {sensor_id: tipo_sensor}, para achar o padrão do tipo a partir do ID
+        """
+        limiares_tipo = limiares_tipo if limiares_tipo is not None else LIMIARES_PADRAO
+        limiares_sensor = limiares_sensor or {}
+        self.tipos_sensor = dict(tipos_sensor or {})
+
+        grupos = {}
+        def grupo(limiares):
+            return grupos.setdefault(_vetor(limiares), len(grupos))
+        self._grupo_tipo = {tipo: grupo(l) for tipo, l in limiares_tipo.items()}
+        self._grupo_sensor = {int(s): grupo(l) for s, l in limiares_sensor.items()}
+        for sensor_id, tipo in self.tipos_sensor.items():
+            if int(sensor_id) not in self._grupo_sensor and tipo in self._grupo_tipo:
+                self._grupo_sensor[int(sensor_id)] = self._grupo_tipo[tipo]
+        self.limiares = np.array(list(grupos), dtype=np.float64).reshape(-1, 4)
+
+    def _grupos(self, n, sensor_ids=None, tipos=None):
+        """Grupo de limiares de cada leitura (-1 = sem limiar, sempre SEGURO): sensor primeiro, tipo depois."""
+        grupos = np.full(n, -1, dtype=np.int64)
+        if tipos is not None:
+            tipos = pd.Series(np.asarray(tipos, dtype=object))
+            grupos = tipos.map(self._grupo_tipo).fillna(-1).to_numpy(dtype=np.int64)
+        if sensor_ids is not None:
+            por_sensor = pd.Series(np.asarray(sensor_ids)).map(self._grupo_sensor).to_numpy(dtype=np.float64)
+            definidos = ~np.isnan(por_sensor)
+            grupos[definidos] = por_sensor[definidos].astype(np.int64)
+        return grupos
+
+    def classificar(self, valores, sensor_ids=None, tipos=None):
+        """
+        Códigos de nível (0=SEGURO ... 4=CRITICO) para um lote de leituras.
+        Informe `sensor_ids`, `tipos` ou ambos (mesmo tamanho de `valores`).
+        Leituras ausentes (NaN) ou de tipos sem limiar ficam SEGURO.
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        codigos = np.zeros(len(valores), dtype=np.int8)
+        grupos = self._grupos(len(valores), sensor_ids, tipos)
+        grupos[np.isnan(valores)] = -1
+        for g in np.unique(grupos[grupos >= 0]):
+            mascara = grupos == g
+            # side='right': leitura igual ao limiar já entra no nível
+            codigos[mascara] = np.searchsorted(self.limiares[g], valores[mascara], side='right')
+        return codigos
+
+    def limiares_de(self, sensor_ids=None, tipos=None, n=None):
+        """Limiares (BAIXO, MEDIO, ALTO, CRITICO) de cada leitura, array (n, 4); +inf quando não há limiar."""
+        n = n if n is not None else len(sensor_ids if sensor_ids is not None else tipos)
+        grupos = self._grupos(n, sensor_ids, tipos)
+        limiares = np.full((n, 4), np.inf)
+        limiares[grupos >= 0] = self.limiares[grupos[grupos >= 0]]
+        return limiares
+
+    def classificar_rotulos(self, valores, sensor_ids=None, tipos=None):
+        """Como `classificar`, mas devolve os nomes dos níveis ('SEGURO', 'BAIXO', ...)."""
+        return NIVEIS_ALERTA[self.classificar(valores, sensor_ids, tipos)]
+
+    def nivel(self, tipo_sensor, valor, sensor_id=None):
+        """Nível de uma única leitura."""
+        return self.classificar_rotulos([valor], None if sensor_id is None else [sensor_id], [tipo_sensor])[0]
+
+
+@cache_referencia('LIMIARES_ALERTA')
+def carregar_limiares():
+    """Lê LIMIARES_ALERTA e o tipo de cada sensor. Retorna (df_limiares, df_sensores)."""
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT TIPO_SENSOR, SENSOR_ID, LIMIAR_BAIXO, LIMIAR_MEDIO, LIMIAR_ALTO, LIMIAR_CRITICO
+                FROM LIMIARES_ALERTA
+            """)
+            df_limiares = pd.DataFrame(cursor.fetchall(), columns=['TIPO_SENSOR', 'SENSOR_ID', 'BAIXO', 'MEDIO', 'ALTO', 'CRITICO'])
+            cursor.execute("SELECT SENSOR_ID, TIPO_SENSOR FROM SENSORES_AMBIENTAIS")
+            df_sensores = pd.DataFrame(cursor.fetchall(), columns=['SENSOR_ID', 'TIPO_SENSOR'])
+    return df_limiares, df_sensores
+
+def montar_classificador(df_limiares, df_sensores):
+    """Classificador a partir das linhas de LIMIARES_ALERTA (sem linhas, usa LIMIARES_PADRAO)."""
+    tipos_sensor = dict(zip(df_sensores['SENSOR_ID'], df_sensores['TIPO_SENSOR']))
+    if df_limiares.empty:
+        return ClassificadorAlertas(LIMIARES_PADRAO, None, tipos_sensor)
+    colunas = ['BAIXO', 'MEDIO', 'ALTO', 'CRITICO']
+    padrao = df_limiares[df_limiares['SENSOR_ID'].isna()]
+    por_sensor = df_limiares[df_limiares['SENSOR_ID'].notna()]
+    limiares_tipo = {**LIMIARES_PADRAO, **{linha.TIPO_SENSOR: dict(zip(colunas, linha[2:])) for linha in padrao.itertuples(index=False)}}
+    limiares_sensor = {int(linha.SENSOR_ID): dict(zip(colunas, linha[2:])) for linha in por_sensor.itertuples(index=False)}
+    return ClassificadorAlertas(limiares_tipo, limiares_sensor, tipos_sensor)
+
+
+_classificador = None
+_origem_classificador = None
+_lock = threading.Lock()
+
+def obter_classificador():
+    """
+    Classificador compartilhado pelo processo, refeito só quando os limiares lidos do banco mudam
+    (a leitura passa pelo cache de tabelas de referência). Sem banco, usa LIMIARES_PADRAO.
+    """
+    global _classificador, _origem_classificador
+    try:
+        origem = carregar_limiares()
+    except (psycopg2.Error, RuntimeError) as e:
+        logger.warning("Limiares de alerta indisponíveis no banco, usando os padrões: %s", e)
+        origem = None
+    with _lock:
+        mudou = (origem is None) != (_origem_classificador is None) or (
+            origem is not None and not all(a.equals(b) for a, b in zip(origem, _origem_classificador))
+        )
+        if _classificador is None or mudou:
+            _classificador = montar_classificador(*origem) if origem is not None else ClassificadorAlertas()
+            _origem_classificador = origem
+        return _classificador
@@ -2,8 +2,12 @@ import streamlit as st
 import pandas as pd
 import psycopg2
 from src.bd_conection import get_postgres_connection
+from src.cache_referencia import cache_referencia, invalidar_cache
+from src.geo import completar_coordenadas
+from src.alocacao_recursos import alocar_solicitacoes_pendentes
 
 # --- Funções para obter dados do BD ---
+@cache_referencia('COMUNIDADES')
 def obter_comunidades():
     """Obtém todas as comunidades do banco de dados."""
     conn = get_postgres_connection()
@@ -15,13 +19,16 @@ def obter_comunidades():
                 comunidade_id,
                 nome_comunidade,
                 localizacao_geo,
+                latitude,
+                longitude,
                 populacao_estimada,
                 contato_principal
             FROM comunidades
             ORDER BY nome_comunidade;
             """
             df_comunidades = pd.read_sql(query, conn)
-            df_comunidades.columns = ['ID', 'Nome da Comunidade', 'Localização Geo', 'População Estimada', 'Contato Principal']
+            df_comunidades.columns = ['ID', 'Nome da Comunidade', 'Localização Geo', 'Latitude', 'Longitude', 'População Estimada', 'Contato Principal']
+            df_comunidades = completar_coordenadas(df_comunidades)
         except psycopg2.Error as e:
             st.error(f"Erro ao obter comunidades: {e}")
         finally:
@@ -33,13 +40,40 @@ def obter_tipos_ajuda_disponiveis():
     # Em um sistema real, isso poderia vir de uma tabela de lookup no BD
     return ["Alimentos", "Água Potável", "Atendimento Médico", "Resgate", "Abrigo Temporário", "Medicamentos", "Outros"]
 
-def obter_solicitacoes_ajuda(status_filtro=None):
-    """Obtém as solicitações de ajuda do banco de dados, com filtro de status opcional."""
+TAMANHO_PAGINA_SOLICITACOES = 50
+
+@cache_referencia('SOLICITACOES_AJUDA')
+def obter_pagina_solicitacoes(status_filtro=None, comunidade_id=None, tipo_ajuda=None, prioridade=None,
+                              apos=None, tamanho_pagina=TAMANHO_PAGINA_SOLICITACOES):
+    """
+    Obtém uma página de solicitações de ajuda, da mais recente para a mais antiga, com filtros opcionais.
+    Paginação por chave: `apos` é o (timestamp_solicitacao, solicitacao_id) da última linha da página anterior,
+    então cada página custa o mesmo, seja a primeira ou a milésima.
+    Retorna (DataFrame, chave da próxima página ou None se esta for a última).
+    """
     conn = get_postgres_connection()
     df_solicitacoes = pd.DataFrame()
+    proxima = None
     if conn:
         try:
-            query = """
+            condicoes, params = [], []
+            if status_filtro and status_filtro != "Todos":
+                condicoes.append("sa.status_solicitacao = %s")
+                params.append(status_filtro)
+            if comunidade_id is not None:
+                condicoes.append("sa.comunidade_id = %s")
+                params.append(int(comunidade_id))
+            if tipo_ajuda and tipo_ajuda != "Todos":
+                condicoes.append("sa.tipo_ajuda = %s")
+                params.append(tipo_ajuda)
+            if prioridade and prioridade != "Todas":
+                condicoes.append("sa.prioridade = %s")
+                params.append(prioridade)
+            if apos is not None:
+                condicoes.append("(sa.timestamp_solicitacao, sa.solicitacao_id) < (%s, %s)")
+                params.extend(apos)
+
+            query = f"""
             SELECT
                 sa.solicitacao_id,
                 c.nome_comunidade,
@@ -51,24 +85,27 @@ def obter_solicitacoes_ajuda(status_filtro=None):
                 sa.timestamp_atualizacao
             FROM solicitacoes_ajuda sa
             JOIN comunidades c ON sa.comunidade_id = c.comunidade_id
+            {"WHERE " + " AND ".join(condicoes) if condicoes else ""}
+            ORDER BY sa.timestamp_solicitacao DESC, sa.solicitacao_id DESC
+            LIMIT %s;
             """
-            params = []
-            if status_filtro and status_filtro != "Todos":
-                query += " WHERE sa.status_solicitacao = %s"
-                params.append(status_filtro)
-            query += " ORDER BY sa.timestamp_solicitacao DESC;"
-
-            df_solicitacoes = pd.read_sql(query, conn, params=params)
+            # Uma linha a mais indica se existe próxima página
+            df_solicitacoes = pd.read_sql(query, conn, params=params + [tamanho_pagina + 1])
             df_solicitacoes.columns = [
                 'ID Solicitação', 'Comunidade', 'Tipo de Ajuda', 'Descrição',
                 'Status', 'Prioridade', 'Data Solicitação', 'Última Atualização'
             ]
+            if len(df_solicitacoes) > tamanho_pagina:
+                df_solicitacoes = df_solicitacoes.iloc[:tamanho_pagina]
+                ultima = df_solicitacoes.iloc[-1]
+                proxima = (ultima['Data Solicitação'].to_pydatetime(), int(ultima['ID Solicitação']))
         except psycopg2.Error as e:
             st.error(f"Erro ao obter solicitações de ajuda: {e}")
         finally:
             conn.close()
-    return df_solicitacoes
+    return df_solicitacoes, proxima
 
+@cache_referencia('RECURSOS')
 def obter_recursos_disponiveis():
     """Obtém todos os recursos disponíveis no banco de dados."""
     conn = get_postgres_connection()
@@ -134,6 +171,7 @@ def registrar_solicitacao(comunidade_id, tipo_ajuda, descricao, prioridade):
             """
             cursor.execute(query, (comunidade_id, tipo_ajuda, descricao, prioridade))
             conn.commit()
+            invalidar_cache('SOLICITACOES_AJUDA')
             st.success("Solicitação de ajuda registrada com sucesso!")
             return True
         except psycopg2.Error as e:
@@ -157,6 +195,7 @@ def atualizar_status_solicitacao(solicitacao_id, novo_status):
             """
             cursor.execute(query, (novo_status, solicitacao_id))
             conn.commit()
+            invalidar_cache('SOLICITACOES_AJUDA')
             st.success(f"Status da solicitação {solicitacao_id} atualizado para '{novo_status}'!")
             return True
         except psycopg2.Error as e:
@@ -173,25 +212,32 @@ def alocar_recurso(solicitacao_id, recurso_id, quantidade_alocada):
     if conn:
         try:
             cursor = conn.cursor()
-            # 1. Inserir na tabela de alocação
+            # 1. Baixar o estoque, só se ainda houver a quantidade (a linha fica travada até o commit)
+            query_update_recurso = """
+            UPDATE recursos
+            SET quantidade_disponivel = quantidade_disponivel - %s
+            WHERE recurso_id = %s AND quantidade_disponivel >= %s;
+            """
+            cursor.execute(query_update_recurso, (quantidade_alocada, recurso_id, quantidade_alocada))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                invalidar_cache('RECURSOS')
+                st.warning("Quantidade indisponível: o estoque deste recurso foi alterado. Atualize a lista e tente novamente.")
+                return False
+
+            # 2. Inserir na tabela de alocação
             query_alocacao = """
             INSERT INTO alocacao_recursos (solicitacao_id, recurso_id, quantidade_alocada, timestamp_alocacao, status_alocacao)
             VALUES (%s, %s, %s, CURRENT_TIMESTAMP, 'PENDENTE');
             """
             cursor.execute(query_alocacao, (solicitacao_id, recurso_id, quantidade_alocada))
 
-            # 2. Atualizar a quantidade disponível do recurso
-            query_update_recurso = """
-            UPDATE recursos
-            SET quantidade_disponivel = quantidade_disponivel - %s
-            WHERE recurso_id = %s;
-            """
-            cursor.execute(query_update_recurso, (quantidade_alocada, recurso_id))
-
             conn.commit()
+            invalidar_cache('RECURSOS')
             st.success(f"Recurso alocado: {quantidade_alocada} unidades ao ID da solicitação {solicitacao_id}.")
             return True
         except psycopg2.Error as e:
+            conn.rollback()
             st.error(f"Erro ao alocar recurso: {e}")
             return False
         finally:
@@ -236,18 +282,55 @@ def community_aid_platform():
     st.subheader("✅ Gerenciar Solicitações de Ajuda (para Autoridades)")
     st.markdown("Visualize, filtre e gerencie o status das solicitações, e aloque recursos.")
 
-    col1, col2 = st.columns([0.7, 0.3])
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         status_filtro = st.selectbox(
             "Filtrar Solicitações por Status:",
             ['Todos', 'PENDENTE', 'EM_ANDAMENTO', 'CONCLUIDO', 'CANCELADO']
         )
     with col2:
-        st.write("") # Espaço para alinhar o botão
+        opcoes_comunidades = {None: "Todas", **lista_comunidades}
+        comunidade_filtro = st.selectbox("Comunidade:", list(opcoes_comunidades), format_func=lambda x: opcoes_comunidades[x])
+    with col3:
+        tipo_filtro = st.selectbox("Tipo de Ajuda:", ["Todos"] + obter_tipos_ajuda_disponiveis())
+    with col4:
+        prioridade_filtro = st.selectbox("Prioridade:", ['Todas', 'URGENTE', 'ALTA', 'MEDIA', 'BAIXA'], key="prioridade_filtro")
+
+    with st.expander("Alocação automática da fila de pendentes"):
+        st.write("Atende as solicitações PENDENTE por prioridade e antiguidade, casando o tipo de ajuda com o tipo de recurso em estoque.")
+        limite_lote = st.number_input("Máximo de solicitações por execução:", min_value=1, max_value=5000, value=500, step=50)
+        if st.button("Alocar recursos para pendentes"):
+            try:
+                resumo = alocar_solicitacoes_pendentes(int(limite_lote))
+                st.success(f"{resumo['atendidas']} de {resumo['analisadas']} solicitações atendidas ({len(resumo['alocacoes'])} alocações).")
+            except (psycopg2.Error, RuntimeError) as e:
+                st.error(f"Erro na alocação automática: {e}")
+
+    # Pilha com a chave de início de cada página visitada; volta à primeira página quando um filtro muda
+    filtros = (status_filtro, comunidade_filtro, tipo_filtro, prioridade_filtro)
+    if st.session_state.get('filtros_solicitacoes') != filtros:
+        st.session_state['filtros_solicitacoes'] = filtros
+        st.session_state['paginas_solicitacoes'] = [None]
+    paginas = st.session_state['paginas_solicitacoes']
+
+    df_solicitacoes, proxima_pagina = obter_pagina_solicitacoes(status_filtro, comunidade_filtro, tipo_filtro, prioridade_filtro, apos=paginas[-1])
+
+    col1, col2, col3, col4 = st.columns([0.2, 0.2, 0.3, 0.3])
+    with col1:
+        if st.button("◀ Anterior", disabled=len(paginas) == 1):
+            paginas.pop()
+            st.rerun()
+    with col2:
+        if st.button("Próxima ▶", disabled=proxima_pagina is None):
+            paginas.append(proxima_pagina)
+            st.rerun()
+    with col3:
+        st.write(f"Página {len(paginas)}")
+    with col4:
         if st.button("Atualizar Lista de Solicitações"):
             st.session_state['refresh_requests'] = True # Força a atualização
-
-    df_solicitacoes = obter_solicitacoes_ajuda(status_filtro)
+            invalidar_cache('SOLICITACOES_AJUDA')
+            st.rerun()
 
     if not df_solicitacoes.empty:
         st.dataframe(df_solicitacoes, use_container_width=True)
@@ -274,16 +357,21 @@ def community_aid_platform():
             if not recursos_disponiveis.empty:
                 st.dataframe(recursos_disponiveis[['Nome', 'Qtd. Disponível', 'Unidade', 'Local']], use_container_width=True)
 
-                recurso_map = recursos_disponiveis[['ID Recurso', 'Nome', 'Unidade']].set_index('ID Recurso')['Nome'].to_dict()
+                # Consulta por ID em O(1) no formulário, sem filtrar o DataFrame a cada opção
+                recurso_map = (
+                    recursos_disponiveis[recursos_disponiveis['Qtd. Disponível'] > 0]
+                    .set_index('ID Recurso')[['Nome', 'Qtd. Disponível', 'Unidade']]
+                    .to_dict('index')
+                )
                 if recurso_map:
                     recurso_selecionado_id = st.selectbox(
                         "Selecione o Recurso para Alocar:",
                         options=list(recurso_map.keys()),
-                        format_func=lambda x: f"{recurso_map[x]} ({recursos_disponiveis[recursos_disponiveis['ID Recurso'] == x]['Qtd. Disponível'].iloc[0]} {recursos_disponiveis[recursos_disponiveis['ID Recurso'] == x]['Unidade'].iloc[0]} disponíveis)"
+                        format_func=lambda x: f"{recurso_map[x]['Nome']} ({recurso_map[x]['Qtd. Disponível']} {recurso_map[x]['Unidade']} disponíveis)"
                     )
                     
                     if recurso_selecionado_id:
-                        max_qty = recursos_disponiveis[recursos_disponiveis['ID Recurso'] == recurso_selecionado_id]['Qtd. Disponível'].iloc[0]
+                        max_qty = recurso_map[recurso_selecionado_id]['Qtd. Disponível']
                         quantidade_alocada = st.number_input(f"Quantidade a Alocar (Max: {max_qty}):", min_value=1, max_value=int(max_qty), value=1)
                         if st.button(f"Alocar Recurso ao ID {selected_solicitacao_id}"):
                             if alocar_recurso(selected_solicitacao_id, recurso_selecionado_id, quantidade_alocada):
@@ -4,39 +4,20 @@ import psycopg2
 import plotly.express as px # Para gráficos mais interativos e sofisticados
 import datetime
 from src.bd_conection import get_postgres_connection
+from src.utils import obter_dados_leituras_sensores, obter_leituras_agregadas
+from src.arquivo_parquet import arquivo_disponivel, ler_arquivo_agregado
+from src.classificacao_alertas import NIVEIS_ALERTA, obter_classificador
 
 
 # --- Funções para obter dados específicos para análise ---
 
-def obter_dados_leituras_sensores(periodo_dias=30):
-    """Obtém leituras de sensores para um período específico."""
-    conn = get_postgres_connection()
-    df_leituras = pd.DataFrame()
-    if conn:
-        try:
-            end_date = datetime.datetime.now()
-            start_date = end_date - datetime.timedelta(days=periodo_dias)
-
-            query = f"""
-            SELECT
-                l.timestamp_leitura,
-                s.tipo_sensor,
-                s.localizacao_geo,
-                l.valor_lido,
-                l.unidade_medida
-            FROM leituras_sensores l
-            JOIN sensores_ambientais s ON l.sensor_id = s.sensor_id
-            WHERE l.timestamp_leitura BETWEEN %s AND %s
-            ORDER BY l.timestamp_leitura ASC;
-            """
-            df_leituras = pd.read_sql(query, conn, params=(start_date, end_date))
-            df_leituras.columns = ['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']
-            df_leituras['Timestamp'] = pd.to_datetime(df_leituras['Timestamp'])
-        except psycopg2.Error as e:
-            st.error(f"Erro ao obter dados de leituras de sensores: {e}")
-        finally:
-            conn.close()
-    return df_leituras
+def intervalo_para_periodo(periodo_dias):
+    """Resolução (em horas) usada nos gráficos de tendência: leituras brutas só em períodos curtos."""
+    if periodo_dias <= 2:
+        return 0
+    elif periodo_dias <= 90:
+        return 1
+    return 24
 
 def obter_dados_alertas(periodo_dias=30):
     """Obtém dados de alertas para um período específico."""
@@ -117,7 +98,16 @@ def disaster_data_analysis():
 
     # --- Análise de Leituras de Sensores ---
     st.subheader("Sensor Data Trends")
-    df_leituras = obter_dados_leituras_sensores(periodo_dias)
+    intervalo_horas = intervalo_para_periodo(periodo_dias)
+    usar_arquivo = arquivo_disponivel() and st.checkbox("Ler leituras do arquivo Parquet (não consulta o banco)", value=periodo_dias > 90)
+    if usar_arquivo:
+        df_leituras = ler_arquivo_agregado(periodo_dias, intervalo_horas)
+        st.caption("Leituras lidas do arquivo Parquet sincronizado com o banco.")
+    elif intervalo_horas:
+        df_leituras = obter_leituras_agregadas(periodo_dias, intervalo_horas)
+        st.caption(f"Médias {'diárias' if intervalo_horas == 24 else 'horárias'} calculadas a partir dos agregados do banco.")
+    else:
+        df_leituras = obter_dados_leituras_sensores(periodo_dias)
 
     if not df_leituras.empty:
         st.write("#### Nível de Água (Leituras ao Longo do Tempo)")
@@ -139,6 +129,17 @@ def disaster_data_analysis():
             st.plotly_chart(fig_chuva, use_container_width=True)
         else:
             st.info("Nenhum dado de pluviômetro disponível para o período selecionado.")
+
+        st.write("#### Leituras por Nível de Alerta")
+        # As séries históricas não trazem o ID do sensor: aplica os limiares padrão de cada tipo
+        df_leituras['Nível de Alerta'] = obter_classificador().classificar_rotulos(df_leituras['Valor Lido'], tipos=df_leituras['Tipo Sensor'])
+        df_niveis = df_leituras[df_leituras['Tipo Sensor'].isin(['Nível de Água', 'Pluviômetro'])]
+        if not df_niveis.empty:
+            niveis_por_tipo = df_niveis.groupby(['Tipo Sensor', 'Nível de Alerta'], observed=True).size().reset_index(name='Contagem')
+            fig_niveis = px.bar(niveis_por_tipo, x='Tipo Sensor', y='Contagem', color='Nível de Alerta', barmode='group',
+                                title='Leituras em Cada Nível de Alerta',
+                                category_orders={'Nível de Alerta': list(NIVEIS_ALERTA)})
+            st.plotly_chart(fig_niveis, use_container_width=True)
     else:
         st.info("Nenhuma leitura de sensor disponível para o período selecionado.")
 
@@ -156,7 +157,7 @@ def disaster_data_analysis():
         fig_alert_level = px.bar(alert_level_counts, x='Nível de Alerta', y='Contagem',
                                  title='Número de Alertas por Nível',
                                  color='Nível de Alerta',
-                                 category_orders={"Nível de Alerta": ["SEGURO", "BAIXO", "MEDIO", "ALTO", "CRITICO"]})
+                                 category_orders={"Nível de Alerta": list(NIVEIS_ALERTA)})
         st.plotly_chart(fig_alert_level, use_container_width=True)
 
         st.write("#### Alertas ao Longo do Tempo")
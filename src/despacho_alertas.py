@@ -0,0 +1,381 @@
+"""
+Despacho assíncrono de alertas para destinos externos (e-mail, webhook, gateway de SMS, arquivo/fila).
+
+`DespachanteAlertas.enviar` só deduplica o alerta e o coloca nas filas dos destinos; a entrega
+acontece num loop asyncio em thread própria, então quem gera os alertas (serviço de monitoramento,
+motor de alertas) nunca espera por um destino lento ou fora do ar. Para cada destino:
+- os alertas são agrupados em lotes (até `tamanho_lote` ou `espera_lote` segundos);
+- no máximo `concorrencia` lotes em entrega ao mesmo tempo (semáforo por destino);
+- falhas são repetidas com espera exponencial com jitter, até `tentativas` vezes;
+- com a fila do destino cheia, o alerta é descartado para aquele destino e contado.
+
+Repetições idênticas da mesma transição (mesmo sensor ou local, nível anterior, nível e evento)
+dentro de `janela_deduplicacao` segundos são enviadas uma única vez; qualquer mudança de estado
+do alerta é enviada e recomeça a janela, então uma nova escalada nunca é suprimida. As
+estatísticas incluem a latência entre `enviar` e a entrega.
+
+Os destinos podem ser configurados por variáveis de ambiente (ver `destinos_do_ambiente`).
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+import urllib.parse
+from collections import deque
+from email.message import EmailMessage
+
+import numpy as np
+
+from src.classificacao_alertas import CODIGO_NIVEL
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_FILA_PADRAO = 10000             # alertas por destino
+JANELA_DEDUPLICACAO_PADRAO = 600.0      # segundos
+TENTATIVAS_PADRAO = 5
+ESPERA_BASE_S = 1.0
+ESPERA_MAXIMA_S = 60.0
+AMOSTRAS_LATENCIA = 2000
+
+
+class ErroEntrega(Exception):
+    pass
+
+
+def texto_alerta(alerta):
+    """Linha curta de um alerta no formato de `gerar_alerta` (usada em SMS, e-mail e logs)."""
+    evento = f"{alerta['Evento']} " if alerta.get('Evento') else ""
+    return (f"[{evento}{alerta['Nível']}] {alerta['Tipo']} - {alerta['Localização']}: "
+            f"{alerta['Valor Lido']}. {alerta['Recomendação']}").strip()
+
+def _nivel_maximo(alertas):
+    return max((alerta['Nível'] for alerta in alertas), key=lambda nivel: CODIGO_NIVEL.get(nivel, -1))
+
+async def _post_json(url, dados, timeout, cabecalhos=None):
+    """POST de um corpo JSON com asyncio puro; levanta ErroEntrega se a resposta não for 2xx."""
+    partes = urllib.parse.urlsplit(url)
+    seguro = partes.scheme == 'https'
+    porta = partes.port or (443 if seguro else 80)
+    caminho = (partes.path or '/') + (f"?{partes.query}" if partes.query else '')
+    corpo = json.dumps(dados, ensure_ascii=False, default=str).encode()
+    extras = "".join(f"{nome}: {valor}\r\n" for nome, valor in (cabecalhos or {}).items())
+
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(partes.hostname, porta, ssl=seguro or None), timeout)
+    try:
+        writer.write(f"POST {caminho} HTTP/1.1\r\nHost: {partes.netloc}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(corpo)}\r\n{extras}Connection: close\r\n\r\n".encode() + corpo)
+        await writer.drain()
+        linha = await asyncio.wait_for(reader.readline(), timeout)
+    finally:
+        writer.close()
+    try:
+        status = int(linha.split()[1])
+    except (IndexError, ValueError):
+        raise ErroEntrega(f"resposta inválida de {partes.netloc}: {linha[:80]!r}") from None
+    if not 200 <= status < 300:
+        raise ErroEntrega(f"{partes.netloc} respondeu {status}")
+
+
+# --- Destinos ---
+class Destino:
+    """Base dos destinos: `enviar_lote` recebe uma lista de alertas e levanta exceção se falhar."""
+    nome = 'destino'
+
+    def __init__(self, tamanho_lote=50, espera_lote=1.0, concorrencia=2, timeout=10.0):
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote
+        self.concorrencia = concorrencia
+        self.timeout = timeout
+
+    async def enviar_lote(self, alertas):
+        raise NotImplementedError
+
+
+class DestinoSMTP(Destino):
+    """Um e-mail por lote (smtplib, executado fora do loop com asyncio.to_thread)."""
+    nome = 'smtp'
+
+    def __init__(self, host, porta, remetente, destinatarios, usuario=None, senha=None, starttls=False, **kwargs):
+        super().__init__(**kwargs)
+        self.host, self.porta = host, porta
+        self.remetente, self.destinatarios = remetente, list(destinatarios)
+        self.usuario, self.senha, self.starttls = usuario, senha, starttls
+
+    def _enviar(self, alertas):
+        mensagem = EmailMessage()
+        mensagem['Subject'] = f"[Alerta {_nivel_maximo(alertas)}] {len(alertas)} alerta(s) de desastre"
+        mensagem['From'] = self.remetente
+        mensagem['To'] = ", ".join(self.destinatarios)
+        mensagem.set_content("\n\n".join(alerta['DescricaoCompleta'] for alerta in alertas))
+        with smtplib.SMTP(self.host, self.porta, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+            smtp.send_message(mensagem)
+
+    async def enviar_lote(self, alertas):
+        await asyncio.to_thread(self._enviar, alertas)
+
+
+class DestinoWebhook(Destino):
+    """POST JSON {"alertas": [...]} com o lote inteiro."""
+    nome = 'webhook'
+
+    def __init__(self, url, token=None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.cabecalhos = {'Authorization': f"Bearer {token}"} if token else {}
+
+    async def enviar_lote(self, alertas):
+        await _post_json(self.url, {'alertas': alertas}, self.timeout, self.cabecalhos)
+
+
+class DestinoSMS(Destino):
+    """Gateway de SMS por HTTP: POST JSON {"destinatarios": [...], "mensagens": [...]} (160 caracteres cada)."""
+    nome = 'sms'
+
+    def __init__(self, url, destinatarios, token=None, **kwargs):
+        kwargs.setdefault('tamanho_lote', 20)
+        super().__init__(**kwargs)
+        self.url = url
+        self.destinatarios = list(destinatarios)
+        self.cabecalhos = {'Authorization': f"Bearer {token}"} if token else {}
+
+    async def enviar_lote(self, alertas):
+        mensagens = [texto_alerta(alerta)[:160] for alerta in alertas]
+        await _post_json(self.url, {'destinatarios': self.destinatarios, 'mensagens': mensagens}, self.timeout, self.cabecalhos)
+
+
+class DestinoArquivo(Destino):
+    """Acrescenta um alerta por linha (JSON) num arquivo, que pode ser consumido como fila por outro processo."""
+    nome = 'arquivo'
+
+    def __init__(self, caminho, **kwargs):
+        kwargs.setdefault('concorrencia', 1)       # escritas em ordem, sem intercalar linhas
+        super().__init__(**kwargs)
+        self.caminho = caminho
+
+    def _enviar(self, alertas):
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.writelines(json.dumps(alerta, ensure_ascii=False, default=str) + "\n" for alerta in alertas)
+
+    async def enviar_lote(self, alertas):
+        await asyncio.to_thread(self._enviar, alertas)
+
+
+class DestinoFila(Destino):
+    """Entrega os alertas numa queue.Queue, para consumidores no mesmo processo."""
+    nome = 'fila'
+
+    def __init__(self, fila=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fila = fila if fila is not None else queue.Queue()
+
+    async def enviar_lote(self, alertas):
+        for alerta in alertas:
+            self.fila.put_nowait(alerta)
+
+
+def destinos_do_ambiente():
+    """
+    Destinos configurados por variáveis de ambiente:
+    ALERTAS_SMTP_HOST/PORTA/USUARIO/SENHA/REMETENTE/STARTTLS e ALERTAS_EMAIL_PARA (lista separada por vírgulas),
+    ALERTAS_WEBHOOK_URL/TOKEN, ALERTAS_SMS_URL/TOKEN e ALERTAS_SMS_PARA, ALERTAS_ARQUIVO.
+    """
+    ambiente = os.environ
+    lista = lambda nome: [item.strip() for item in ambiente.get(nome, "").split(",") if item.strip()]
+    destinos = []
+    if ambiente.get("ALERTAS_SMTP_HOST") and lista("ALERTAS_EMAIL_PARA"):
+        destinos.append(DestinoSMTP(
+            ambiente["ALERTAS_SMTP_HOST"], int(ambiente.get("ALERTAS_SMTP_PORTA", 25)),
+            ambiente.get("ALERTAS_SMTP_REMETENTE", "alertas@localhost"), lista("ALERTAS_EMAIL_PARA"),
+            ambiente.get("ALERTAS_SMTP_USUARIO"), ambiente.get("ALERTAS_SMTP_SENHA"),
+            ambiente.get("ALERTAS_SMTP_STARTTLS", "0") == "1",
+        ))
+    if ambiente.get("ALERTAS_WEBHOOK_URL"):
+        destinos.append(DestinoWebhook(ambiente["ALERTAS_WEBHOOK_URL"], ambiente.get("ALERTAS_WEBHOOK_TOKEN")))
+    if ambiente.get("ALERTAS_SMS_URL") and lista("ALERTAS_SMS_PARA"):
+        destinos.append(DestinoSMS(ambiente["ALERTAS_SMS_URL"], lista("ALERTAS_SMS_PARA"), ambiente.get("ALERTAS_SMS_TOKEN")))
+    if ambiente.get("ALERTAS_ARQUIVO"):
+        destinos.append(DestinoArquivo(ambiente["ALERTAS_ARQUIVO"]))
+    return destinos
+
+
+# --- Despachante ---
+class DespachanteAlertas:
+    """Fila por destino num loop asyncio próprio; `enviar` nunca bloqueia quem gera o alerta."""
+
+    def __init__(self, destinos, janela_deduplicacao=JANELA_DEDUPLICACAO_PADRAO, tentativas=TENTATIVAS_PADRAO,
+                 espera_base=ESPERA_BASE_S, tamanho_fila=TAMANHO_FILA_PADRAO):
+        self.destinos = list(destinos)
+        vistos = {}
+        for destino in self.destinos:
+            # Dois destinos do mesmo tipo (ex.: dois webhooks) ganham nomes distintos nas métricas
+            vistos[destino.nome] = vistos.get(destino.nome, 0) + 1
+            if vistos[destino.nome] > 1:
+                destino.nome = f"{destino.nome}-{vistos[destino.nome]}"
+        self.janela_deduplicacao = janela_deduplicacao
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.tamanho_fila = tamanho_fila
+        self._recentes = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._filas = {}
+        self._em_entrega = set()
+        self._montando = 0              # lotes já retirados da fila e ainda sem tarefa de entrega
+        self._latencias = {destino.nome: deque(maxlen=AMOSTRAS_LATENCIA) for destino in self.destinos}
+        self.contadores = {'recebidos': 0, 'duplicados': 0}
+        self.por_destino = {destino.nome: {'entregues': 0, 'lotes': 0, 'repeticoes': 0, 'falhas': 0, 'descartados': 0}
+                            for destino in self.destinos}
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        """Sobe o loop asyncio numa thread de fundo com um consumidor por destino."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="despacho-alertas", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._iniciar_consumidores(), self._loop).result()
+        return self
+
+    async def _iniciar_consumidores(self):
+        for destino in self.destinos:
+            fila = self._filas[destino.nome] = asyncio.Queue(self.tamanho_fila)
+            semaforo = asyncio.Semaphore(destino.concorrencia)
+            self._em_entrega.add(asyncio.create_task(self._consumir(destino, fila, semaforo)))
+
+    def parar(self, timeout=10.0):
+        """Espera até `timeout` segundos pelas entregas pendentes e encerra o loop."""
+        if self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._esvaziar(timeout), self._loop).result(timeout + 5)
+        except Exception:
+            logger.exception("Falha ao encerrar o despacho de alertas")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+    async def _esvaziar(self, timeout):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            pendentes = [tarefa for tarefa in self._em_entrega if tarefa.get_name().startswith('entrega')]
+            if all(fila.empty() for fila in self._filas.values()) and not pendentes and not self._montando:
+                break
+            await asyncio.sleep(0.05)
+        for tarefa in list(self._em_entrega):
+            tarefa.cancel()
+
+    # --- Envio ---
+    @staticmethod
+    def _chave(alerta):
+        """(alerta a que se refere, transição): o alerta é o do sensor quando há 'ID Sensor', senão o do local."""
+        identidade = (alerta.get('Tipo'), alerta.get('ID Sensor'), alerta.get('Localização'))
+        return identidade, (alerta.get('Nível Anterior'), alerta.get('Nível'), alerta.get('Evento'))
+
+    def enviar(self, alerta):
+        """
+        Enfileira um alerta (dicionário de `gerar_alerta`, opcionalmente com 'Evento', 'Nível Anterior'
+        e 'ID Sensor') para todos os destinos e retorna imediatamente. Retorna False se for repetição
+        idêntica da última transição do mesmo alerta dentro da janela.
+        """
+        if self._loop is None or not self._loop.is_running():
+            raise RuntimeError("Despachante de alertas não iniciado; chame iniciar().")
+        agora = time.monotonic()
+        identidade, transicao = self._chave(alerta)
+        with self._lock:
+            self.contadores['recebidos'] += 1
+            ultima, instante = self._recentes.get(identidade, (None, -np.inf))
+            if ultima == transicao and agora - instante < self.janela_deduplicacao:
+                self.contadores['duplicados'] += 1
+                return False
+            # Transição diferente da última (ex.: escalada depois de uma redução): envia e recomeça a janela
+            self._recentes[identidade] = (transicao, agora)
+            if len(self._recentes) > 10 * self.tamanho_fila:
+                self._recentes = {c: (u, t) for c, (u, t) in self._recentes.items() if agora - t < self.janela_deduplicacao}
+        self._loop.call_soon_threadsafe(self._enfileirar, alerta, agora)
+        return True
+
+    def _enfileirar(self, alerta, enfileirado_em):
+        for destino in self.destinos:
+            try:
+                self._filas[destino.nome].put_nowait((alerta, enfileirado_em))
+            except asyncio.QueueFull:
+                self.por_destino[destino.nome]['descartados'] += 1
+
+    async def _consumir(self, destino, fila, semaforo):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await fila.get()]
+            self._montando += 1
+            limite = loop.time() + destino.espera_lote
+            while len(lote) < destino.tamanho_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            # Com `concorrencia` lotes em entrega, o consumidor espera aqui e os alertas seguintes se acumulam na fila
+            await semaforo.acquire()
+            tarefa = asyncio.create_task(self._entregar(destino, lote, semaforo), name=f"entrega-{destino.nome}")
+            self._em_entrega.add(tarefa)
+            tarefa.add_done_callback(self._em_entrega.discard)
+            self._montando -= 1
+
+    async def _entregar(self, destino, lote, semaforo):
+        contadores = self.por_destino[destino.nome]
+        alertas = [alerta for alerta, _ in lote]
+        try:
+            for tentativa in range(self.tentativas):
+                try:
+                    await asyncio.wait_for(destino.enviar_lote(alertas), destino.timeout * 2)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if tentativa == self.tentativas - 1:
+                        contadores['falhas'] += len(lote)
+                        logger.error("Destino %s: %d alertas não entregues após %d tentativas: %s",
+                                     destino.nome, len(lote), self.tentativas, e)
+                        return
+                    contadores['repeticoes'] += 1
+                    espera = min(ESPERA_MAXIMA_S, self.espera_base * 2 ** tentativa) * random.uniform(0.5, 1.5)
+                    logger.warning("Destino %s falhou (%s); nova tentativa em %.1fs", destino.nome, e, espera)
+                    await asyncio.sleep(espera)
+            agora = time.monotonic()
+            with self._lock:
+                self._latencias[destino.nome].extend(agora - enfileirado_em for _, enfileirado_em in lote)
+            contadores['entregues'] += len(lote)
+            contadores['lotes'] += 1
+        finally:
+            semaforo.release()
+
+    # --- Métricas ---
+    def estatisticas(self):
+        destinos = {}
+        for destino in self.destinos:
+            nome = destino.nome
+            # Cópia sob a trava: o loop de entrega acrescenta latências em outra thread
+            with self._lock:
+                latencias = np.array(self._latencias[nome]) * 1000
+            fila = self._filas.get(nome)
+            destinos[nome] = {
+                **self.por_destino[nome],
+                'na_fila': fila.qsize() if fila is not None else 0,
+                'latencia_p50_ms': round(float(np.percentile(latencias, 50)), 1) if len(latencias) else None,
+                'latencia_p95_ms': round(float(np.percentile(latencias, 95)), 1) if len(latencias) else None,
+                'latencia_max_ms': round(float(latencias.max()), 1) if len(latencias) else None,
+            }
+        return {**self.contadores, 'destinos': destinos}
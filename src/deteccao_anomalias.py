@@ -0,0 +1,318 @@
+"""
+Detecção online de falhas e anomalias de sensores, antes da classificação de alertas.
+
+O estado de cada sensor ocupa uma posição fixa em arrays NumPy e cada leitura custa O(1)
+(a janela robusta tem tamanho fixo), processando o lote inteiro de uma vez:
+- faixa física por tipo de sensor (ex.: umidade fora de 0-100 %);
+- taxa de variação máxima desde a última leitura aceita (m/h, %/h);
+- pico robusto: distância à mediana da janela em unidades de MAD (exceto chuva);
+- valor travado: mesma leitura repetida `limite_travado` vezes (pluviômetro zerado não conta);
+- média e variância de longo prazo (Welford), para o relatório de saúde.
+
+Leituras suspeitas ficam em quarentena: não alimentam o estado nem os alertas. Se a "anomalia"
+de taxa/pico persistir por `limite_regime` leituras seguidas, é tratada como mudança real de
+patamar e aceita. A fração recente de leituras suspeitas define a saúde do sensor (OK, SUSPEITO,
+FALHA); sensores em FALHA passam a MANUTENCAO em SENSORES_AMBIENTAIS e voltam a ATIVO quando
+se recuperam. A saúde fica registrada em SAUDE_SENSORES.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from src.bd_conection import conexao_postgres
+from src.cache_referencia import invalidar_cache
+
+logger = logging.getLogger(__name__)
+
+# (mínimo, máximo) fisicamente possíveis e variação máxima por hora, por tipo de sensor
+LIMITES_FISICOS = {
+    'Nível de Água': (-1.0, 30.0),
+    'Pluviômetro': (0.0, 300.0),
+    'Umidade do Solo': (0.0, 100.0),
+    'Temperatura': (-20.0, 60.0),
+    'Vento': (0.0, 250.0),
+}
+TAXA_MAXIMA_POR_HORA = {
+    'Nível de Água': 3.0,
+    'Umidade do Solo': 60.0,
+    'Temperatura': 15.0,
+}
+# Ruído de medição tolerado entre duas leituras seguidas: em ciclos curtos (10 s) a variação
+# física permitida é menor que a resolução do próprio sensor
+RUIDO_LEITURA = {
+    'Nível de Água': 0.05,
+    'Umidade do Solo': 3.0,
+    'Temperatura': 0.5,
+}
+
+# Chuva é intermitente por natureza (0 -> 40 mm/h no início de uma tempestade): só faixa e travamento
+TIPOS_SEM_PICO = ['Pluviômetro']
+
+OK, SUSPEITO, FALHA = 'OK', 'SUSPEITO', 'FALHA'
+MOTIVOS = ('FORA_DA_FAIXA', 'TRAVADO', 'TAXA', 'PICO')
+
+
+class DetectorAnomalias:
+    """Estado de detecção por sensor, atualizado em lote com custo constante por leitura."""
+
+    def __init__(self, janela=31, limiar_robusto=6.0, limite_travado=30, min_amostras=10, limite_regime=5,
+                 alfa_saude=0.05, limiar_suspeito=0.1, limiar_falha=0.3, capacidade=1024):
+        self.janela = janela
+        self.limiar_robusto = limiar_robusto
+        self.limite_travado = limite_travado
+        self.min_amostras = min_amostras
+        self.limite_regime = limite_regime
+        self.alfa_saude = alfa_saude
+        self.limiar_suspeito = limiar_suspeito
+        self.limiar_falha = limiar_falha
+        self._lock = threading.Lock()
+        self._posicoes = {}
+        self._alocar(capacidade)
+        self._n = 0
+        self._alterados = set()
+        self._em_manutencao = set()
+        # Saúde recuperada do banco para sensores em manutenção que ainda não têm slot: {sensor_id: (taxa, motivo)}
+        self._saude_inicial = {}
+        self._ultima_persistencia = 0.0
+        self.contadores = {'avaliadas': 0, 'quarentena': 0, 'mudancas_regime': 0, **{m: 0 for m in MOTIVOS}}
+
+    # --- Estado ---
+    def _alocar(self, capacidade, anterior=None):
+        campos = {
+            'ids': (np.int64, 0), 'tipos': (object, ''), 'contagem': (np.int64, 0), 'media': (np.float64, 0.0),
+            'm2': (np.float64, 0.0), 'ultimo': (np.float64, np.nan), 'ultimo_ts': (np.float64, np.nan),
+            'repeticoes': (np.int64, 0), 'quarentena_seguida': (np.int64, 0), 'taxa_anomalias': (np.float64, 0.0),
+            'pos': (np.int64, 0), 'preenchidos': (np.int64, 0), 'status': (object, OK), 'motivo': (object, ''),
+        }
+        for nome, (dtype, inicial) in campos.items():
+            novo = np.full(capacidade, inicial, dtype=dtype)
+            if anterior:
+                novo[:len(anterior[nome])] = anterior[nome]
+            setattr(self, '_' + nome, novo)
+        janela = np.full((capacidade, self.janela), np.nan)
+        if anterior:
+            janela[:len(anterior['janela'])] = anterior['janela']
+        self._janela = janela
+
+    def _slots(self, sensor_ids, tipos):
+        slots = np.empty(len(sensor_ids), dtype=np.int64)
+        for i, (sensor_id, tipo) in enumerate(zip(sensor_ids, tipos)):
+            slot = self._posicoes.get(sensor_id)
+            if slot is None:
+                if self._n == len(self._ids):
+                    nomes = ['ids', 'tipos', 'contagem', 'media', 'm2', 'ultimo', 'ultimo_ts', 'repeticoes', 'quarentena_seguida',
+                             'taxa_anomalias', 'pos', 'preenchidos', 'status', 'motivo', 'janela']
+                    self._alocar(2 * len(self._ids), {nome: getattr(self, '_' + nome) for nome in nomes})
+                slot = self._posicoes[sensor_id] = self._n
+                self._ids[slot], self._tipos[slot] = sensor_id, tipo
+                if sensor_id in self._saude_inicial:
+                    # Em manutenção antes de reiniciar: começa em FALHA e só volta a ATIVO ao se recuperar
+                    taxa, motivo = self._saude_inicial.pop(sensor_id)
+                    self._status[slot], self._motivo[slot] = FALHA, motivo
+                    self._taxa_anomalias[slot] = max(taxa, self.limiar_falha)
+                self._n += 1
+            slots[i] = slot
+        return slots
+
+    def carregar_manutencao(self):
+        """
+        Recupera do banco os sensores que o detector moveu para MANUTENCAO (SAUDE_SENSORES em FALHA
+        e STATUS_OPERACIONAL = 'MANUTENCAO'), para que voltem a ATIVO quando se recuperarem mesmo
+        depois de o serviço reiniciar. Retorna o número de sensores recuperados.
+        """
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT ss.SENSOR_ID, ss.TAXA_ANOMALIAS, COALESCE(ss.ULTIMO_MOTIVO, '')
+                    FROM SAUDE_SENSORES ss
+                    JOIN SENSORES_AMBIENTAIS sa ON sa.SENSOR_ID = ss.SENSOR_ID
+                    WHERE ss.STATUS_SAUDE = %s AND sa.STATUS_OPERACIONAL = 'MANUTENCAO'
+                """, (FALHA,))
+                linhas = cursor.fetchall()
+        with self._lock:
+            for sensor_id, taxa, motivo in linhas:
+                self._em_manutencao.add(sensor_id)
+                slot = self._posicoes.get(sensor_id)
+                if slot is None:
+                    self._saude_inicial[sensor_id] = (float(taxa or 0.0), motivo)
+                elif self._status[slot] == OK:
+                    self._status[slot] = FALHA
+                    self._taxa_anomalias[slot] = max(self._taxa_anomalias[slot], self.limiar_falha)
+        return len(linhas)
+
+    # --- Avaliação ---
+    def avaliar(self, sensor_ids, tipos, valores, timestamps):
+        """
+        Avalia um lote de leituras (arrays do mesmo tamanho; timestamps datetime64 ou datetime).
+        Retorna (aceitas, motivos): máscara das leituras liberadas para os alertas e o motivo
+        da quarentena das demais ('' quando aceita).
+        """
+        sensor_ids = np.asarray(sensor_ids, dtype=np.int64)
+        valores = np.asarray(valores, dtype=np.float64)
+        segundos = np.asarray(pd.to_datetime(np.asarray(timestamps)), dtype='datetime64[us]').astype(np.int64) / 1e6
+        aceitas = np.ones(len(valores), dtype=bool)
+        motivos = np.full(len(valores), '', dtype=object)
+        if len(valores) == 0:
+            return aceitas, motivos
+
+        with self._lock:
+            slots = self._slots(sensor_ids.tolist(), list(tipos))
+            # Um sensor pode aparecer mais de uma vez no lote: processa em rodadas, em ordem de chegada
+            rodada = pd.Series(slots).groupby(slots).cumcount().to_numpy()
+            for r in range(int(rodada.max()) + 1):
+                indices = np.nonzero(rodada == r)[0]
+                aceitas[indices], motivos[indices] = self._avaliar_rodada(slots[indices], valores[indices], segundos[indices])
+            self.contadores['avaliadas'] += len(valores)
+            self.contadores['quarentena'] += int((~aceitas).sum())
+        return aceitas, motivos
+
+    def _avaliar_rodada(self, s, v, t):
+        tipos = pd.Series(self._tipos[s])
+        minimo = tipos.map(lambda tipo: LIMITES_FISICOS.get(tipo, (-np.inf, np.inf))[0]).to_numpy(np.float64)
+        maximo = tipos.map(lambda tipo: LIMITES_FISICOS.get(tipo, (-np.inf, np.inf))[1]).to_numpy(np.float64)
+        taxa_maxima = tipos.map(lambda tipo: TAXA_MAXIMA_POR_HORA.get(tipo, np.inf)).to_numpy(np.float64)
+        ruido = tipos.map(lambda tipo: RUIDO_LEITURA.get(tipo, 0.0)).to_numpy(np.float64)
+
+        ultimo = self._ultimo[s]
+        tem_anterior = ~np.isnan(ultimo)
+        fora_da_faixa = (v < minimo) | (v > maximo) | ~np.isfinite(v)
+
+        horas = (t - self._ultimo_ts[s]) / 3600
+        with np.errstate(divide='ignore', invalid='ignore'):
+            taxa = tem_anterior & (horas > 0) & (np.abs(v - ultimo) > taxa_maxima * horas + ruido)
+
+        janela = self._janela[s]
+        cheia = self._preenchidos[s] >= self.min_amostras
+        with np.errstate(all='ignore'):
+            janela = np.where(cheia[:, None], janela, 0.0)
+            mediana = np.nanmedian(janela, axis=1)
+            mad = np.nanmedian(np.abs(janela - mediana[:, None]), axis=1)
+        # Piso da escala: séries quase constantes (MAD ~ 0) não transformam ruído de resolução em pico
+        escala = 1.4826 * mad + 0.01 + 0.01 * np.abs(mediana)
+        pico = cheia & ~np.isin(self._tipos[s], TIPOS_SEM_PICO) & (np.abs(v - mediana) / escala > self.limiar_robusto)
+
+        repetido = tem_anterior & (v == ultimo)
+        self._repeticoes[s] = np.where(repetido, self._repeticoes[s] + 1, 0)
+        isento = (self._tipos[s] == 'Pluviômetro') & (v == 0)
+        travado = (self._repeticoes[s] >= self.limite_travado) & ~isento
+
+        desvio = (taxa | pico) & ~fora_da_faixa & ~travado
+        self._quarentena_seguida[s] = np.where(desvio, self._quarentena_seguida[s] + 1, 0)
+        mudanca_regime = desvio & (self._quarentena_seguida[s] >= self.limite_regime)
+        if mudanca_regime.any():
+            # Novo patamar confirmado: a janela antiga deixa de representar o sensor
+            reinicio = s[mudanca_regime]
+            self._janela[reinicio] = np.nan
+            self._preenchidos[reinicio] = 0
+            self._pos[reinicio] = 0
+            self._quarentena_seguida[reinicio] = 0
+            self.contadores['mudancas_regime'] += int(mudanca_regime.sum())
+
+        suspeita = fora_da_faixa | travado | (desvio & ~mudanca_regime)
+        motivos = np.select([fora_da_faixa, travado, taxa & suspeita, pico & suspeita], MOTIVOS, default='')
+        for motivo in MOTIVOS:
+            self.contadores[motivo] += int((motivos == motivo).sum())
+
+        aceitas = ~suspeita
+        a = s[aceitas]
+        va = v[aceitas]
+        self._janela[a, self._pos[a]] = va
+        self._pos[a] = (self._pos[a] + 1) % self.janela
+        self._preenchidos[a] += 1
+        self._contagem[a] += 1
+        delta = va - self._media[a]
+        self._media[a] += delta / self._contagem[a]
+        self._m2[a] += delta * (va - self._media[a])
+        self._ultimo[a] = va
+        self._ultimo_ts[a] = t[aceitas]
+
+        self._taxa_anomalias[s] = (1 - self.alfa_saude) * self._taxa_anomalias[s] + self.alfa_saude * suspeita
+        self._atualizar_status(s, travado, motivos)
+        return aceitas, motivos
+
+    def _atualizar_status(self, s, travado, motivos):
+        taxa = self._taxa_anomalias[s]
+        status = np.where(travado | (taxa >= self.limiar_falha), FALHA, np.where(taxa >= self.limiar_suspeito, SUSPEITO, OK))
+        mudou = status != self._status[s]
+        self._status[s] = status
+        self._motivo[s] = np.where(motivos != '', motivos, self._motivo[s])
+        self._alterados.update(s[mudou].tolist())
+
+    # --- Saúde ---
+    def saude(self):
+        """Relatório por sensor: status, fração recente de anomalias, último motivo e média/desvio de longo prazo."""
+        with self._lock:
+            n = self._n
+            contagem = self._contagem[:n]
+            desvio = np.sqrt(np.where(contagem > 1, self._m2[:n] / np.maximum(contagem - 1, 1), np.nan))
+            return pd.DataFrame({
+                'ID Sensor': self._ids[:n],
+                'Tipo Sensor': self._tipos[:n],
+                'Saúde': self._status[:n],
+                'Taxa de Anomalias': np.round(self._taxa_anomalias[:n], 3),
+                'Último Motivo': self._motivo[:n],
+                'Leituras Aceitas': contagem,
+                'Média': np.round(self._media[:n], 3),
+                'Desvio Padrão': np.round(desvio, 3),
+            })
+
+    def persistir(self, intervalo_completo=60.0):
+        """
+        Grava em SAUDE_SENSORES os sensores que mudaram de status (e todos a cada `intervalo_completo`
+        segundos) e move para MANUTENCAO os sensores em FALHA, devolvendo a ATIVO os que se recuperaram.
+        Retorna o número de linhas de saúde gravadas.
+        """
+        with self._lock:
+            completo = time.monotonic() - self._ultima_persistencia >= intervalo_completo
+            slots = np.arange(self._n) if completo else np.array(sorted(self._alterados), dtype=np.int64)
+            if len(slots) == 0:
+                return 0
+            linhas = list(zip(self._ids[slots].tolist(), self._status[slots].tolist(),
+                              np.round(self._taxa_anomalias[slots], 4).tolist(), self._motivo[slots].tolist()))
+            falhas = set(self._ids[slots][self._status[slots] == FALHA].tolist())
+            recuperados = {sensor_id for sensor_id, status in zip(self._ids[slots].tolist(), self._status[slots].tolist())
+                           if status == OK and sensor_id in self._em_manutencao}
+            self._alterados.clear()
+
+        para_manutencao = sorted(falhas - self._em_manutencao)
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO SAUDE_SENSORES (SENSOR_ID, STATUS_SAUDE, TAXA_ANOMALIAS, ULTIMO_MOTIVO, TIMESTAMP_ATUALIZACAO)
+                    VALUES %s
+                    ON CONFLICT (SENSOR_ID) DO UPDATE SET
+                        STATUS_SAUDE = EXCLUDED.STATUS_SAUDE, TAXA_ANOMALIAS = EXCLUDED.TAXA_ANOMALIAS,
+                        ULTIMO_MOTIVO = EXCLUDED.ULTIMO_MOTIVO, TIMESTAMP_ATUALIZACAO = EXCLUDED.TIMESTAMP_ATUALIZACAO
+                """, linhas, template="(%s, %s, %s, NULLIF(%s, ''), CURRENT_TIMESTAMP)", page_size=len(linhas))
+                if para_manutencao:
+                    # Só sensores ATIVO: INATIVO/MANUTENCAO definidos pela equipe não são alterados
+                    cursor.execute("""
+                        UPDATE SENSORES_AMBIENTAIS SET STATUS_OPERACIONAL = 'MANUTENCAO'
+                        WHERE SENSOR_ID = ANY(%s) AND STATUS_OPERACIONAL = 'ATIVO'
+                        RETURNING SENSOR_ID
+                    """, (para_manutencao,))
+                    movidos = {linha[0] for linha in cursor.fetchall()}
+                else:
+                    movidos = set()
+                if recuperados:
+                    cursor.execute("""
+                        UPDATE SENSORES_AMBIENTAIS SET STATUS_OPERACIONAL = 'ATIVO'
+                        WHERE SENSOR_ID = ANY(%s) AND STATUS_OPERACIONAL = 'MANUTENCAO'
+                    """, (sorted(recuperados),))
+
+        self._em_manutencao = (self._em_manutencao | movidos) - recuperados
+        if completo:
+            self._ultima_persistencia = time.monotonic()
+        if movidos or recuperados:
+            invalidar_cache('SENSORES_AMBIENTAIS')
+            logger.warning("Sensores em manutenção por falha: %s; recuperados: %s", sorted(movidos), sorted(recuperados))
+        return len(linhas)
+
+    def estatisticas(self):
+        with self._lock:
+            status = pd.Series(self._status[:self._n]).value_counts().to_dict()
+        return {**self.contadores, 'sensores': self._n, 'saude': status, 'em_manutencao': len(self._em_manutencao)}
@@ -2,9 +2,18 @@ import streamlit as st
 import pandas as pd
 import psycopg2
 from src.bd_conection import get_postgres_connection
+from src.cache_referencia import cache_referencia, invalidar_cache
+from src.geo import completar_coordenadas, tabela_para_mapa
+from src.abrigos_proximos import obter_indice_abrigos
+from src.rotas_evacuacao import obter_grafo_evacuacao
+from src.otimizacao_evacuacao import OtimizadorEvacuacao
+from src.community_support import obter_comunidades
+from src.flood_monitoring import obter_ultimas_leituras
+from src.classificacao_alertas import obter_classificador
 
 
 
+@cache_referencia('ROTAS_EVACUACAO')
 def obter_rotas_evacuacao():
     """Obtém todas as rotas de evacuação do banco de dados."""
     conn = get_postgres_connection()
@@ -31,6 +40,7 @@ def obter_rotas_evacuacao():
             conn.close()
     return df_rotas
 
+@cache_referencia('ABRIGOS')
 def obter_abrigos():
     """Obtém todos os abrigos de emergência do banco de dados."""
     conn = get_postgres_connection()
@@ -42,6 +52,8 @@ def obter_abrigos():
                 abrigo_id,
                 nome_abrigo,
                 localizacao_geo,
+                latitude,
+                longitude,
                 capacidade_maxima,
                 capacidade_atual,
                 endereco,
@@ -51,16 +63,9 @@ def obter_abrigos():
             ORDER BY abrigo_id;
             """
             df_abrigos = pd.read_sql(query, conn)
-            df_abrigos.columns = ['ID', 'Nome do Abrigo', 'Localização Geo', 'Capacidade Máxima', 'Capacidade Atual', 'Endereço', 'Contato', 'Status']
-
-            # Extrair Latitude e Longitude para o mapa (se Localização Geo for formatada como "Lat:X, Lon:Y")
-            # Isso é uma simplificação. Em um sistema real, você teria colunas separadas para lat/lon ou tipo de dado geográfico.
-            df_abrigos['Latitude'] = df_abrigos['Localização Geo'].apply(
-                lambda x: float(x.split(',')[0].replace('Lat:', '').strip()) if x and 'Lat:' in x else None
-            )
-            df_abrigos['Longitude'] = df_abrigos['Localização Geo'].apply(
-                lambda x: float(x.split(',')[1].replace('Lon:', '').strip()) if x and 'Lon:' in x else None
-            )
+            df_abrigos.columns = ['ID', 'Nome do Abrigo', 'Localização Geo', 'Latitude', 'Longitude', 'Capacidade Máxima', 'Capacidade Atual', 'Endereço', 'Contato', 'Status']
+            # LATITUDE/LONGITUDE são mantidas pelo banco a partir de LOCALIZACAO_GEO; o texto só é lido se faltarem
+            df_abrigos = completar_coordenadas(df_abrigos)
 
         except psycopg2.Error as e:
             st.error(f"Erro ao obter abrigos: {e}")
@@ -78,6 +83,8 @@ def obter_dados_mobilidade():
             SELECT
                 dado_id,
                 localizacao_geo,
+                latitude,
+                longitude,
                 nivel_trafego,
                 tempo_viagem_estimado,
                 timestamp_dado
@@ -86,13 +93,59 @@ def obter_dados_mobilidade():
             LIMIT 10; -- Pega os 10 dados mais recentes
             """
             df_mobilidade = pd.read_sql(query, conn)
-            df_mobilidade.columns = ['ID', 'Localização Geo', 'Nível de Tráfego', 'Tempo Viagem Est.', 'Timestamp']
+            df_mobilidade.columns = ['ID', 'Localização Geo', 'Latitude', 'Longitude', 'Nível de Tráfego', 'Tempo Viagem Est.', 'Timestamp']
+            df_mobilidade = completar_coordenadas(df_mobilidade)
         except psycopg2.Error as e:
             st.error(f"Erro ao obter dados de mobilidade: {e}")
         finally:
             conn.close()
     return df_mobilidade
 
+def obter_tempos_mobilidade_atuais():
+    """Obtém o dado de mobilidade mais recente de cada local (custos dos trechos no grafo de rotas)."""
+    conn = get_postgres_connection()
+    df_mobilidade = pd.DataFrame()
+    if conn:
+        try:
+            query = """
+            SELECT DISTINCT ON (localizacao_geo)
+                dado_id,
+                localizacao_geo,
+                latitude,
+                longitude,
+                nivel_trafego,
+                tempo_viagem_estimado,
+                timestamp_dado
+            FROM dados_mobilidade
+            ORDER BY localizacao_geo, timestamp_dado DESC;
+            """
+            df_mobilidade = pd.read_sql(query, conn)
+            df_mobilidade.columns = ['ID', 'Localização Geo', 'Latitude', 'Longitude', 'Nível de Tráfego', 'Tempo Viagem Est.', 'Timestamp']
+            df_mobilidade = completar_coordenadas(df_mobilidade)
+        except psycopg2.Error as e:
+            st.error(f"Erro ao obter dados de mobilidade: {e}")
+        finally:
+            conn.close()
+    return df_mobilidade
+
+def atualizar_status_rota(rota_id, novo_status):
+    """Atualiza o status de uma rota de evacuação no banco de dados."""
+    conn = get_postgres_connection()
+    if conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("UPDATE ROTAS_EVACUACAO SET STATUS_ROTA = %s WHERE ROTA_ID = %s", (novo_status, int(rota_id)))
+            conn.commit()
+            invalidar_cache('ROTAS_EVACUACAO')
+            return True
+        except psycopg2.Error as e:
+            conn.rollback()
+            st.error(f"Erro ao atualizar status da rota: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+    return False
+
 # --- Função Principal do Módulo Streamlit ---
 def evacuation_system():
     st.header("🗺️ Análise e Tomada de Decisão para Evacuação")
@@ -116,10 +169,8 @@ def evacuation_system():
         # Adicionar mapa dos abrigos
         st.write("#### Localização dos Abrigos")
         # Filtrar abrigos com coordenadas válidas para o mapa
-        df_map_abrigos = df_abrigos.dropna(subset=['Latitude', 'Longitude'])
+        df_map_abrigos = tabela_para_mapa(df_abrigos)
         if not df_map_abrigos.empty:
-            # st.map espera colunas 'lat' e 'lon' por padrão
-            df_map_abrigos = df_map_abrigos.rename(columns={'Latitude': 'lat', 'Longitude': 'lon'})
             st.map(df_map_abrigos, zoom=10) # Ajuste o zoom conforme a área da sua cidade
         else:
             st.warning("Não há abrigos com coordenadas geográficas válidas para exibir no mapa.")
@@ -129,21 +180,110 @@ def evacuation_system():
 
     st.markdown("---")
 
+    st.subheader("Abrigos Disponíveis Mais Próximos")
+    if not df_abrigos.empty:
+        origem = st.radio("Calcular para:", ["Comunidades", "Sensores em alerta"], horizontal=True)
+        col1, col2 = st.columns(2)
+        k = col1.number_input("Abrigos por ponto:", min_value=1, max_value=10, value=3)
+        vagas_minimas = col2.number_input("Vagas mínimas no abrigo:", min_value=1, value=1)
+
+        if origem == "Comunidades":
+            df_pontos, coluna_nome = obter_comunidades(), 'Nome da Comunidade'
+        else:
+            df_pontos, coluna_nome = obter_ultimas_leituras(), 'Localização'
+            if not df_pontos.empty:
+                codigos = obter_classificador().classificar(
+                    df_pontos['Valor Lido'], sensor_ids=df_pontos['ID Sensor'], tipos=df_pontos['Tipo Sensor'])
+                df_pontos = df_pontos[codigos > 0]
+
+        if df_pontos.empty:
+            st.info("Nenhum ponto de origem disponível para a busca.")
+        else:
+            indice = obter_indice_abrigos(df_abrigos)
+            df_proximos = indice.abrigos_mais_proximos(df_pontos, coluna_nome, int(k), int(vagas_minimas))
+            if not df_proximos.empty:
+                st.dataframe(df_proximos, hide_index=True)
+            else:
+                st.warning("Nenhum abrigo disponível com as vagas mínimas informadas.")
+    else:
+        st.info("Nenhum abrigo cadastrado para a busca.")
+
+    st.markdown("---")
+
+    st.subheader("Rotas até os Abrigos")
+    df_comunidades = obter_comunidades()
+    if not df_rotas.empty and not df_abrigos.empty and not df_comunidades.empty:
+        grafo = obter_grafo_evacuacao(df_rotas, obter_tempos_mobilidade_atuais(), df_comunidades, df_abrigos)
+
+        with st.expander("Alterar status de uma rota"):
+            opcoes_rotas = df_rotas.set_index('ID')['Nome da Rota'].to_dict()
+            rota_id = st.selectbox("Rota:", list(opcoes_rotas), format_func=lambda x: opcoes_rotas[x])
+            novo_status = st.selectbox("Novo status:", ['ABERTA', 'FECHADA', 'BLOQUEADA'])
+            if st.button("Aplicar status"):
+                if atualizar_status_rota(rota_id, novo_status):
+                    recalculados = grafo.alterar_status_rota(rota_id, novo_status)
+                    st.success(f"Rota atualizada. {len(recalculados)} árvore(s) de rotas recalculada(s) em {grafo.ultimo_recalculo_ms:.1f} ms.")
+
+        nomes_comunidades = df_comunidades.set_index('ID')['Nome da Comunidade'].to_dict()
+        comunidade_id = st.selectbox("Comunidade de origem:", list(nomes_comunidades), format_func=lambda x: nomes_comunidades[x])
+        df_caminhos = grafo.custos_ate_abrigos(comunidade_id)
+        if not df_caminhos.empty:
+            st.dataframe(df_caminhos, hide_index=True)
+        else:
+            st.warning("Nenhum abrigo alcançável pelas rotas abertas a partir desta comunidade.")
+    else:
+        st.info("São necessárias rotas, abrigos e comunidades cadastrados para calcular os caminhos.")
+
+    st.markdown("---")
+
+    st.subheader("Plano de Alocação de Evacuação")
+    st.write("Distribui a população estimada das comunidades entre os abrigos disponíveis, respeitando as vagas e minimizando o deslocamento total.")
+    if not df_abrigos.empty and not df_comunidades.empty:
+        col1, col2 = st.columns(2)
+        criterio = col1.radio("Minimizar:", ["Distância", "Tempo pelas rotas"], horizontal=True)
+        candidatos = col2.slider("Abrigos candidatos por comunidade:", min_value=1, max_value=50, value=10)
+        if st.button("Calcular plano de alocação"):
+            try:
+                if criterio == "Distância":
+                    otimizador = OtimizadorEvacuacao(df_comunidades, df_abrigos, 'distancia', candidatos=candidatos)
+                else:
+                    grafo = obter_grafo_evacuacao(df_rotas, obter_tempos_mobilidade_atuais(), df_comunidades, df_abrigos)
+                    otimizador = OtimizadorEvacuacao(df_comunidades, df_abrigos, 'tempo', grafo=grafo, candidatos=candidatos)
+                st.session_state['plano_evacuacao'] = otimizador.resolver()
+            except RuntimeError as e:
+                st.error(f"Erro ao calcular o plano de alocação: {e}")
+
+        otimizador = st.session_state.get('plano_evacuacao')
+        if otimizador is not None:
+            with st.expander("Abrigo ficou cheio ou foi fechado"):
+                abrigos_plano = dict(zip(otimizador.abrigo_ids, otimizador.nomes_abrigos))
+                abrigo_id = st.selectbox("Abrigo:", list(abrigos_plano), format_func=lambda x: abrigos_plano[x])
+                status_abrigo = st.selectbox("Situação:", ['CHEIO', 'FECHADO'])
+                if st.button("Realocar população"):
+                    realocadas = otimizador.fechar_abrigo(abrigo_id, status_abrigo)
+                    st.success(f"{realocadas} pessoa(s) realocada(s) em {otimizador.tempo_solucao_ms:.0f} ms.")
+
+            resumo = otimizador.resumo()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Pessoas alocadas", resumo['pessoas_alocadas'])
+            col2.metric("Sem vaga", resumo['pessoas_nao_alocadas'])
+            col3.metric("Custo médio/pessoa", f"{resumo['custo_medio_por_pessoa']:.2f} {'km' if otimizador.criterio == 'distancia' else 'min'}")
+            col4.metric("Tempo de cálculo", f"{resumo['tempo_solucao_ms']:.0f} ms")
+            st.dataframe(otimizador.tabela_alocacao(), hide_index=True)
+            st.write("#### Ocupação Prevista dos Abrigos")
+            st.dataframe(otimizador.ocupacao_abrigos(), hide_index=True)
+    else:
+        st.info("São necessários abrigos e comunidades cadastrados para calcular o plano.")
+
+    st.markdown("---")
+
     st.subheader("Condições de Tráfego e Mobilidade Recente")
     df_mobilidade = obter_dados_mobilidade()
     if not df_mobilidade.empty:
-        st.dataframe(df_mobilidade)
+        st.dataframe(df_mobilidade.drop(columns=['Latitude', 'Longitude']))
         # Exemplo de visualização de tráfego no mapa (simplificado)
         st.write("#### Pontos de Tráfego Recentes")
-        df_map_mobilidade = df_mobilidade.copy()
-        # Extrair Latitude e Longitude para o mapa (se Localização Geo for formatada como "Lat:X, Lon:Y")
-        df_map_mobilidade['lat'] = df_map_mobilidade['Localização Geo'].apply(
-            lambda x: float(x.split(',')[0].replace('Lat:', '').strip()) if x and 'Lat:' in x else None
-        )
-        df_map_mobilidade['lon'] = df_map_mobilidade['Localização Geo'].apply(
-            lambda x: float(x.split(',')[1].replace('Lon:', '').strip()) if x and 'Lon:' in x else None
-        )
-        df_map_mobilidade = df_map_mobilidade.dropna(subset=['lat', 'lon'])
+        df_map_mobilidade = tabela_para_mapa(df_mobilidade)
         if not df_map_mobilidade.empty:
             st.map(df_map_mobilidade, zoom=10)
         else:
@@ -1,53 +1,37 @@
 import streamlit as st
 import pandas as pd
-import random
 import datetime
 import psycopg2  
+import numpy as np
+import pydeck as pdk
 from src.bd_conection import get_postgres_connection  # Importando a função de conexão com o banco de dados
+from src.cache_referencia import cache_referencia, invalidar_cache
+from src.geo import completar_coordenadas
+from src.classificacao_alertas import NIVEIS_ALERTA, obter_classificador
+from src.armazem_leituras import obter_armazem_sincronizado
 
-# --- Funções de Simulação e Lógica de Monitoramento ---
-
-# Limiares de alerta para nível de água (em metros)
-LIMIARES_NIVEL_AGUA = {
-    'BAIXO': 2.0,
-    'MEDIO': 3.5,
-    'ALTO': 5.0,
-    'CRITICO': 6.5
-}
-
-# Limiares de alerta para volume de chuva (em mm/h)
-LIMIARES_CHUVA = {
-    'BAIXO': 5,
-    'MEDIO': 20,
-    'ALTO': 40,
-    'CRITICO': 60
-}
-
-def simular_leitura_sensor(tipo_sensor):
-    """Simula a leitura de um sensor."""
-    if tipo_sensor == "Nível de Água":
-        leitura = random.uniform(2.5, 6.0)
-        return round(leitura, 2)
-    elif tipo_sensor == "Pluviômetro":
-        leitura = random.uniform(0, 50)
-        if random.random() < 0.1:
-            leitura = random.uniform(50, 80)
-        return round(leitura, 2)
-    else:
-        return 0.0
-
-def determinar_nivel_alerta(leitura, limiares):
-    """Determina o nível de alerta com base na leitura e limiares."""
-    if leitura >= limiares['CRITICO']:
-        return 'CRITICO'
-    elif leitura >= limiares['ALTO']:
-        return 'ALTO'
-    elif leitura >= limiares['MEDIO']:
-        return 'MEDIO'
-    elif leitura >= limiares['BAIXO']:
-        return 'BAIXO'
-    else:
-        return 'SEGURO'
+# Acima disso a página abre na visão geral agregada; o modo por sensor mostra no máximo esse número de colunas
+LIMITE_SENSORES_DETALHE = 12
+N_PIORES_PADRAO = 6
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+# Cor RGBA de cada nível no mapa (índice = código em NIVEIS_ALERTA)
+CORES_NIVEL = np.array([
+    [46, 160, 67, 160],     # SEGURO
+    [241, 196, 15, 180],    # BAIXO
+    [230, 126, 34, 200],    # MEDIO
+    [231, 76, 60, 220],     # ALTO
+    [142, 30, 140, 240],    # CRITICO
+], dtype=np.uint8)
+
+# --- Funções de Lógica de Monitoramento ---
+
+def unidade_do_sensor(tipo_sensor):
+    """Unidade de medida usada para cada tipo de sensor."""
+    return "m" if tipo_sensor == "Nível de Água" else "mm/h" if tipo_sensor == "Pluviômetro" else ""
+
+def classificar_leitura(tipo_sensor, leitura, sensor_id=None):
+    """Aplica os limiares de LIMIARES_ALERTA (do sensor, se houver, ou do tipo); tipos sem limiar são sempre 'SEGURO'."""
+    return obter_classificador().nivel(tipo_sensor, leitura, sensor_id)
 
 def gerar_alerta(tipo_alerta, nivel, valor_lido, unidade, localizacao):
     """Gera uma descrição de alerta."""
@@ -84,7 +68,6 @@ def salvar_leitura_no_bd(sensor_id, valor_lido, unidade_medida, timestamp_leitur
             query = """
             INSERT INTO LEITURAS_SENSORES (SENSOR_ID, VALOR_LIDO, UNIDADE_MEDIDA, TIMESTAMP_LEITURA)
             VALUES (%s, %s, %s, %s)
-            RETURNING LEITURA_ID
             """
             cursor.execute(query, (sensor_id, valor_lido, unidade_medida, timestamp_leitura))
             conn.commit()
@@ -97,28 +80,30 @@ def salvar_leitura_no_bd(sensor_id, valor_lido, unidade_medida, timestamp_leitur
             conn.close()
     return False
 
-def salvar_alerta_no_bd(tipo_alerta, nivel_alerta, descricao_alerta, area_afetada, recomendacao):
-    """Salva um alerta no banco de dados PostgreSQL."""
+def salvar_alerta_no_bd(tipo_alerta, nivel_alerta, descricao_alerta, area_afetada, recomendacao, sensor_id=None):
+    """Salva um alerta no banco de dados PostgreSQL. Retorna o ALERTA_ID criado (None em caso de erro)."""
     conn = get_postgres_connection()
     if conn:
         cursor = conn.cursor()
         try:
             query = """
-            INSERT INTO ALERTAS_DESASTRE (TIPO_ALERTA, NIVEL_ALERTA, DESCRICAO_ALERTA, AREA_AFETADA, RECOMENDACAO, TIMESTAMP_ALERTA, STATUS_ALERTA)
-            VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP, 'ATIVO')
+            INSERT INTO ALERTAS_DESASTRE (SENSOR_ID, TIPO_ALERTA, NIVEL_ALERTA, DESCRICAO_ALERTA, AREA_AFETADA, RECOMENDACAO, TIMESTAMP_ALERTA, STATUS_ALERTA)
+            VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, 'ATIVO')
             RETURNING ALERTA_ID
             """
-            cursor.execute(query, (tipo_alerta, nivel_alerta, descricao_alerta, area_afetada, recomendacao))
+            cursor.execute(query, (sensor_id, tipo_alerta, nivel_alerta, descricao_alerta, area_afetada, recomendacao))
+            alerta_id = cursor.fetchone()[0]
             conn.commit()
-            return True
+            return alerta_id
         except psycopg2.Error as e:
             st.error(f"Erro ao salvar alerta no BD: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
-    return False
+    return None
 
+@cache_referencia('SENSORES_AMBIENTAIS')
 def obter_sensores_cadastrados():
     """Obtém os sensores cadastrados no banco de dados."""
     conn = get_postgres_connection()
@@ -126,13 +111,15 @@ def obter_sensores_cadastrados():
     if conn:
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT SENSOR_ID, TIPO_SENSOR, DESCRICAO, LOCALIZACAO_GEO FROM SENSORES_AMBIENTAIS ORDER BY SENSOR_ID")
+            cursor.execute("SELECT SENSOR_ID, TIPO_SENSOR, DESCRICAO, LOCALIZACAO_GEO, LATITUDE, LONGITUDE FROM SENSORES_AMBIENTAIS ORDER BY SENSOR_ID")
             for row in cursor:
                 sensores.append({
                     "SENSOR_ID": row[0],
                     "TIPO_SENSOR": row[1],
                     "DESCRICAO": row[2],
-                    "LOCALIZACAO_GEO": row[3]
+                    "LOCALIZACAO_GEO": row[3],
+                    "LATITUDE": row[4],
+                    "LONGITUDE": row[5]
                 })
         except psycopg2.Error as e:
             st.error(f"Erro ao obter sensores do BD: {e}")
@@ -154,6 +141,7 @@ def cadastrar_novo_sensor(tipo, descricao, localizacao):
             """
             cursor.execute(query, (tipo, descricao, localizacao))
             conn.commit()
+            invalidar_cache('SENSORES_AMBIENTAIS')
             st.success("Sensor cadastrado com sucesso!")
             return True
         except psycopg2.Error as e:
@@ -164,28 +152,43 @@ def cadastrar_novo_sensor(tipo, descricao, localizacao):
             conn.close()
     return False
 
-def obter_historico_leituras():
-    """Obtém o histórico de leituras do banco de dados."""
+def obter_ultimas_leituras():
+    """Obtém a leitura mais recente de cada sensor cadastrado."""
     conn = get_postgres_connection()
     if conn:
         try:
             query = """
             SELECT
-                L.TIMESTAMP_LEITURA,
+                S.SENSOR_ID,
                 S.TIPO_SENSOR,
                 S.LOCALIZACAO_GEO,
+                S.LATITUDE,
+                S.LONGITUDE,
                 L.VALOR_LIDO,
-                L.UNIDADE_MEDIDA
-            FROM LEITURAS_SENSORES L
-            JOIN SENSORES_AMBIENTAIS S ON L.SENSOR_ID = S.SENSOR_ID
-            ORDER BY L.TIMESTAMP_LEITURA DESC
-            LIMIT 100
+                L.UNIDADE_MEDIDA,
+                L.TIMESTAMP_LEITURA,
+                S.STATUS_OPERACIONAL,
+                COALESCE(H.STATUS_SAUDE, 'OK'),
+                H.ULTIMO_MOTIVO
+            FROM SENSORES_AMBIENTAIS S
+            LEFT JOIN SAUDE_SENSORES H ON H.SENSOR_ID = S.SENSOR_ID
+            LEFT JOIN LATERAL (
+                SELECT VALOR_LIDO, UNIDADE_MEDIDA, TIMESTAMP_LEITURA
+                FROM LEITURAS_SENSORES
+                WHERE SENSOR_ID = S.SENSOR_ID
+                ORDER BY TIMESTAMP_LEITURA DESC
+                LIMIT 1
+            ) L ON TRUE
+            ORDER BY S.SENSOR_ID
             """
-            df_leituras = pd.read_sql(query, conn)
-            df_leituras.columns = ['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']
-            return df_leituras
+            df_ultimas = pd.read_sql(query, conn)
+            df_ultimas.columns = ['ID Sensor', 'Tipo Sensor', 'Localização', 'Latitude', 'Longitude', 'Valor Lido', 'Unidade', 'Timestamp',
+                                  'Status Operacional', 'Saúde', 'Motivo Anomalia']
+            df_ultimas['Valor Lido'] = pd.to_numeric(df_ultimas['Valor Lido'])
+            df_ultimas = completar_coordenadas(df_ultimas, coluna_texto='Localização')
+            return df_ultimas
         except psycopg2.Error as e:
-            st.error(f"Erro ao obter histórico de leituras do BD: {e}")
+            st.error(f"Erro ao obter últimas leituras do BD: {e}")
             return pd.DataFrame()
         finally:
             conn.close()
@@ -199,6 +202,7 @@ def obter_historico_alertas():
             query = """
             SELECT
                 TIMESTAMP_ALERTA,
+                TIMESTAMP_ATUALIZACAO,
                 TIPO_ALERTA,
                 NIVEL_ALERTA,
                 AREA_AFETADA,
@@ -209,7 +213,7 @@ def obter_historico_alertas():
             LIMIT 50
             """
             df_alertas = pd.read_sql(query, conn)
-            df_alertas.columns = ['Timestamp', 'Tipo', 'Nível', 'Área Afetada', 'Recomendação', 'Status']
+            df_alertas.columns = ['Timestamp', 'Atualizado em', 'Tipo', 'Nível', 'Área Afetada', 'Recomendação', 'Status']
             return df_alertas
         except psycopg2.Error as e:
             st.error(f"Erro ao obter histórico de alertas do BD: {e}")
@@ -218,6 +222,130 @@ def obter_historico_alertas():
             conn.close()
     return pd.DataFrame()
 
+def ordenar_por_gravidade(df_ultimas):
+    """Sensores do pior para o melhor: nível, leitura relativa ao limiar crítico e subida mais rápida."""
+    return df_ultimas.sort_values(['Código Nível', 'Severidade', 'Variação (/h)'], ascending=False, na_position='last')
+
+def exibir_visao_geral(df_ultimas, armazem):
+    """
+    A rede inteira em poucos componentes de tamanho fixo: contagem por nível, os N piores sensores,
+    um único mapa (uma camada pydeck) e uma tabela paginada. O número de widgets não cresce com os sensores.
+    """
+    contagem = df_ultimas['Nível'].value_counts()
+    colunas = st.columns(len(NIVEIS_ALERTA) + 1)
+    for coluna, nivel in zip(colunas, NIVEIS_ALERTA):
+        coluna.metric(nivel, int(contagem.get(nivel, 0)))
+    colunas[-1].metric("Saúde ≠ OK", int((df_ultimas['Saúde'] != 'OK').sum()))
+
+    # --- Piores sensores ---
+    n_piores = st.slider("Sensores mais críticos em destaque:", 3, 12, N_PIORES_PADRAO)
+    piores = ordenar_por_gravidade(df_ultimas[df_ultimas['Valor Lido'].notna()]).head(n_piores)
+    for coluna, sensor_info in zip(st.columns(n_piores), piores.to_dict('records')):
+        with coluna:
+            taxa = sensor_info['Variação (/h)']
+            st.metric(label=f"{sensor_info['Tipo Sensor']} #{sensor_info['ID Sensor']}",
+                      value=f"{sensor_info['Valor Lido']:.2f} {sensor_info['Unidade']}",
+                      delta=None if pd.isna(taxa) else f"{taxa:+.2f} {sensor_info['Unidade']}/h")
+            recentes = armazem.ultimas(sensor_info['ID Sensor'], 60)
+            if len(recentes) > 1:
+                st.line_chart(recentes.set_index('Timestamp')['Valor Lido'], height=80)
+            st.caption(sensor_info['Localização'])
+            if sensor_info['Nível'] != 'SEGURO':
+                st.error(f"🚨 {sensor_info['Nível']}")
+            else:
+                st.info("SEGURO")
+
+    # --- Mapa ---
+    df_mapa = df_ultimas.dropna(subset=['Latitude', 'Longitude'])
+    if not df_mapa.empty:
+        cores = CORES_NIVEL[df_mapa['Código Nível'].to_numpy()]
+        df_mapa = pd.DataFrame({
+            'lat': df_mapa['Latitude'].to_numpy(dtype=float), 'lon': df_mapa['Longitude'].to_numpy(dtype=float),
+            'r': cores[:, 0], 'g': cores[:, 1], 'b': cores[:, 2], 'a': cores[:, 3],
+            'raio': 60 + 60 * df_mapa['Código Nível'].to_numpy(),
+            'sensor': df_mapa['ID Sensor'].astype(str) + ' - ' + df_mapa['Tipo Sensor'],
+            'nivel': df_mapa['Nível'],
+            'valor': df_mapa['Valor Lido'].round(2).astype(str) + ' ' + df_mapa['Unidade'],
+        })
+        camada = pdk.Layer("ScatterplotLayer", df_mapa, get_position=['lon', 'lat'], get_fill_color=['r', 'g', 'b', 'a'],
+                           get_radius='raio', radius_min_pixels=3, radius_max_pixels=14, pickable=True)
+        vista = pdk.ViewState(latitude=float(df_mapa['lat'].mean()), longitude=float(df_mapa['lon'].mean()), zoom=10)
+        st.pydeck_chart(pdk.Deck(layers=[camada], initial_view_state=vista, map_style=None,
+                                 tooltip={"text": "{sensor}\n{nivel}: {valor}"}))
+
+    # --- Tabela paginada ---
+    col1, col2, col3 = st.columns(3)
+    niveis = col1.multiselect("Níveis:", list(NIVEIS_ALERTA), default=[])
+    tipos = col2.multiselect("Tipos de sensor:", sorted(df_ultimas['Tipo Sensor'].dropna().unique()), default=[])
+    tamanho_pagina = col3.selectbox("Linhas por página:", TAMANHOS_PAGINA)
+    df_tabela = df_ultimas
+    if niveis:
+        df_tabela = df_tabela[df_tabela['Nível'].isin(niveis)]
+    if tipos:
+        df_tabela = df_tabela[df_tabela['Tipo Sensor'].isin(tipos)]
+
+    colunas_tabela = ['ID Sensor', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade', 'Variação (/h)', 'Nível',
+                      'Timestamp', 'Saúde', 'Status Operacional']
+    col1, col2, col3 = st.columns(3)
+    ordem = col1.selectbox("Ordenar por:", ['Gravidade'] + colunas_tabela)
+    crescente = col2.checkbox("Crescente", value=False)
+    if ordem == 'Gravidade':
+        df_tabela = ordenar_por_gravidade(df_tabela)
+        if crescente:
+            df_tabela = df_tabela.iloc[::-1]
+    else:
+        df_tabela = df_tabela.sort_values(ordem, ascending=crescente, na_position='last')
+    paginas = max(1, -(-len(df_tabela) // tamanho_pagina))
+    pagina = col3.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, value=1, step=1)
+    inicio = (pagina - 1) * tamanho_pagina
+    st.dataframe(df_tabela[colunas_tabela].iloc[inicio:inicio + tamanho_pagina], hide_index=True,
+                 column_config={'Valor Lido': st.column_config.NumberColumn(format="%.2f"),
+                                'Variação (/h)': st.column_config.NumberColumn(format="%+.2f")})
+    st.caption(f"{len(df_tabela)} sensores; exibindo {min(inicio + 1, len(df_tabela))}-{min(inicio + tamanho_pagina, len(df_tabela))}.")
+
+def exibir_sensores_detalhados(df_ultimas, armazem):
+    """Uma coluna por sensor (no máximo LIMITE_SENSORES_DETALHE), com minigráfico, saúde e alerta."""
+    opcoes = df_ultimas['ID Sensor'].tolist()
+    rotulos = dict(zip(opcoes, df_ultimas['Tipo Sensor'] + ' - ' + df_ultimas['Localização'].fillna('')))
+    # Redes pequenas abrem com todos os sensores; as grandes, com os 4 mais críticos
+    n_padrao = len(opcoes) if len(opcoes) <= LIMITE_SENSORES_DETALHE else 4
+    padrao = ordenar_por_gravidade(df_ultimas)['ID Sensor'].head(n_padrao).tolist()
+    escolhidos = st.multiselect("Sensores:", opcoes, default=padrao, format_func=lambda sensor_id: f"#{sensor_id} {rotulos[sensor_id]}",
+                                max_selections=LIMITE_SENSORES_DETALHE)
+    if not escolhidos:
+        st.info("Selecione ao menos um sensor.")
+        return
+    df_escolhidos = df_ultimas.set_index('ID Sensor').loc[escolhidos].reset_index()
+
+    cols = st.columns(len(df_escolhidos))
+    for i, sensor_info in enumerate(df_escolhidos.to_dict('records')):
+        with cols[i]:
+            st.metric(label=f"Sensor: {sensor_info['Tipo Sensor']} ({sensor_info['Localização']})", value="")
+
+            if pd.isna(sensor_info['Valor Lido']):
+                st.metric(label="Valor Atual", value="Aguardando...")
+                continue
+
+            leitura_atual = sensor_info['Valor Lido']
+            unidade = sensor_info['Unidade']
+            taxa = sensor_info['Variação (/h)']
+            st.metric(label="Valor Atual", value=f"{leitura_atual:.2f} {unidade}",
+                      delta=None if pd.isna(taxa) else f"{taxa:+.2f} {unidade}/h")
+            recentes = armazem.ultimas(sensor_info['ID Sensor'], 60)
+            if len(recentes) > 1:
+                st.line_chart(recentes.set_index('Timestamp')['Valor Lido'], height=80)
+            st.caption(f"Lido em {pd.Timestamp(sensor_info['Timestamp']):%d/%m/%Y %H:%M:%S}")
+            if sensor_info['Saúde'] != 'OK':
+                st.warning(f"Sensor {sensor_info['Saúde']} ({sensor_info['Motivo Anomalia'] or 'anomalias recentes'}) - "
+                           f"status {sensor_info['Status Operacional']}. Leituras suspeitas não geram alertas.")
+
+            nivel_alerta = sensor_info['Nível']
+            if nivel_alerta != 'SEGURO':
+                alerta = gerar_alerta(sensor_info['Tipo Sensor'], nivel_alerta, leitura_atual, unidade, sensor_info['Localização'])
+                st.error(f"🚨 ALERTA: {alerta['Nível']} - {alerta['Tipo']} - {alerta['Recomendação']}")
+            else:
+                st.info(f"Status: {nivel_alerta}")
+
 # --- Função Principal do Módulo Streamlit ---
 def monitor_environmental_conditions():
     st.header("💧 Monitoramento Ambiental e Alerta de Inundação")
@@ -238,56 +366,42 @@ def monitor_environmental_conditions():
                     st.warning("Por favor, preencha o Tipo de Sensor e a Localização.")
     st.markdown("---")
 
-    # --- Obter sensores cadastrados no BD ---
-    sensores_cadastrados = obter_sensores_cadastrados()
-    if not sensores_cadastrados:
+    # --- Últimas leituras gravadas pelo serviço de monitoramento ---
+    # A página apenas lê o banco: a coleta, a gravação e os alertas ficam a cargo
+    # do serviço contínuo (src/servico_monitoramento.py), independente de quantas pessoas estão vendo a página.
+    df_ultimas = obter_ultimas_leituras()
+    if df_ultimas.empty:
         st.warning("Nenhum sensor cadastrado. Por favor, cadastre um sensor para iniciar o monitoramento.")
         return
 
     st.subheader("📊 Dados Atuais dos Sensores e Alertas")
+    classificador = obter_classificador()
+    codigos = classificador.classificar(df_ultimas['Valor Lido'], sensor_ids=df_ultimas['ID Sensor'], tipos=df_ultimas['Tipo Sensor'])
+    df_ultimas['Nível'] = NIVEIS_ALERTA[codigos]
+    df_ultimas['Código Nível'] = codigos
+    # Leitura em relação ao limiar CRÍTICO do sensor: desempata sensores no mesmo nível
+    limiar_critico = classificador.limiares_de(df_ultimas['ID Sensor'], df_ultimas['Tipo Sensor'])[:, 3]
+    df_ultimas['Severidade'] = np.nan_to_num(df_ultimas['Valor Lido'].to_numpy(dtype=float) / limiar_critico)
+    # Variação e minigráficos vêm do armazém em memória, atualizado em segundo plano (sem consulta por rerun)
+    armazem = obter_armazem_sincronizado()
+    df_ultimas['Variação (/h)'] = df_ultimas['ID Sensor'].map(armazem.taxas_variacao(janela_s=3600))
+    df_ultimas['Unidade'] = df_ultimas['Unidade'].fillna(df_ultimas['Tipo Sensor'].map(unidade_do_sensor))
 
-    # Layout em colunas para os dados dos sensores
-    cols = st.columns(len(sensores_cadastrados))
-    alertas_gerados = []
-
-    for i, sensor_info in enumerate(sensores_cadastrados):
-        with cols[i]:
-            st.metric(label=f"Sensor: {sensor_info['TIPO_SENSOR']} ({sensor_info['LOCALIZACAO_GEO']})", value="Aguardando...")
-
-            # Simular leitura do sensor
-            leitura_atual = simular_leitura_sensor(sensor_info['TIPO_SENSOR'])
-            unidade = "m" if sensor_info['TIPO_SENSOR'] == "Nível de Água" else "mm/h" if sensor_info['TIPO_SENSOR'] == "Pluviômetro" else ""
-            st.metric(label="Valor Atual", value=f"{leitura_atual} {unidade}")
-
-            # Salvar leitura no banco de dados
-            if salvar_leitura_no_bd(sensor_info['SENSOR_ID'], leitura_atual, unidade, datetime.datetime.now()):
-                st.success(f"Leitura de {sensor_info['TIPO_SENSOR']} salva no BD!")
-
-            # Determinar nível de alerta e gerar alerta se aplicável
-            nivel_alerta = 'SEGURO'
-            if sensor_info['TIPO_SENSOR'] == "Nível de Água":
-                nivel_alerta = determinar_nivel_alerta(leitura_atual, LIMIARES_NIVEL_AGUA)
-            elif sensor_info['TIPO_SENSOR'] == "Pluviômetro":
-                nivel_alerta = determinar_nivel_alerta(leitura_atual, LIMIARES_CHUVA)
-
-            if nivel_alerta != 'SEGURO':
-                alerta = gerar_alerta(sensor_info['TIPO_SENSOR'], nivel_alerta, leitura_atual, unidade, sensor_info['LOCALIZACAO_GEO'])
-                st.error(f"🚨 ALERTA: {alerta['Nível']} - {alerta['Tipo']} - {alerta['Recomendação']}")
-                alertas_gerados.append(alerta)
-
-                # Salvar alerta no banco de dados
-                if salvar_alerta_no_bd(alerta['Tipo'], alerta['Nível'], alerta['DescricaoCompleta'], alerta['Localização'], alerta['Recomendação']):
-                    st.success(f"Alerta de {alerta['Tipo']} salvo no BD!")
-            else:
-                st.info(f"Status: {nivel_alerta}")
+    modos = ["Visão geral", "Por sensor"]
+    modo = st.radio("Exibição:", modos, horizontal=True, index=0 if len(df_ultimas) > LIMITE_SENSORES_DETALHE else 1)
+    if modo == "Visão geral":
+        exibir_visao_geral(df_ultimas, armazem)
+    else:
+        exibir_sensores_detalhados(df_ultimas, armazem)
 
     st.markdown("---")
 
     # --- Histórico de Leituras ---
     st.subheader("🕰️ Histórico Recente de Leituras dos Sensores")
-    df_leituras = obter_historico_leituras()
+    df_leituras = armazem.historico_recente(100)
     if not df_leituras.empty:
-        st.dataframe(df_leituras)
+        df_leituras = df_leituras.merge(df_ultimas[['ID Sensor', 'Tipo Sensor', 'Localização', 'Unidade']], on='ID Sensor', how='left')
+        st.dataframe(df_leituras[['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']], hide_index=True)
     else:
         st.info("Nenhuma leitura de sensor registrada ainda.")
 
@@ -302,4 +416,4 @@ def monitor_environmental_conditions():
         st.info("Nenhum alerta de desastre registrado ainda.")
 
     st.markdown("---")
-    st.info("As leituras dos sensores e os alertas são atualizados cada vez que a página é recarregada. Para um monitoramento contínuo, considere usar `st.rerun()` ou automatizar a atualização.")
\ No newline at end of file
+    st.info("As leituras e os alertas são gerados continuamente pelo serviço de monitoramento (`python -m src.servico_monitoramento`). Esta página apenas exibe os dados mais recentes gravados no banco.")
\ No newline at end of file
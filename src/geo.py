@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+# Formato livre usado em LOCALIZACAO_GEO: "Lat:-5.09, Lon:-42.81, descrição opcional"
+PADRAO_COORDENADAS = r"Lat:\s*(?P<lat>[-+]?\d+(?:\.\d+)?)\s*,\s*Lon:\s*(?P<lon>[-+]?\d+(?:\.\d+)?)"
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def extrair_coordenadas(localizacoes):
+    """
+    Extrai latitude e longitude de uma série de textos LOCALIZACAO_GEO em uma única passada vetorizada.
+    Retorna um DataFrame com as colunas 'lat' e 'lon' (float64, NaN quando o texto não tem coordenadas).
+    """
+    serie = pd.Series(localizacoes, dtype="string")
+    coordenadas = serie.str.extract(PADRAO_COORDENADAS, expand=True)
+    coordenadas = coordenadas.astype("float64")
+    coordenadas.loc[~coordenadas["lat"].between(-90, 90) | ~coordenadas["lon"].between(-180, 180)] = np.nan
+    return coordenadas
+
+def extrair_descricao(localizacoes):
+    """Parte descritiva de LOCALIZACAO_GEO, sem as coordenadas (ex.: "Ponte Estaiada")."""
+    serie = pd.Series(localizacoes, dtype="string")
+    return serie.str.replace(PADRAO_COORDENADAS, "", regex=True).str.strip(" ,;-")
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distância sobre a superfície (haversine), em km; aceita escalares ou arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def vetores_unitarios(coordenadas):
+    """Converte [lat, lon] em graus (array (n, 2)) para vetores unitários (x, y, z), base das KD-trees."""
+    lat = np.radians(coordenadas[:, 0])
+    lon = np.radians(coordenadas[:, 1])
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def km_para_corda(km):
+    """Distância sobre a superfície, em km -> distância em linha reta entre vetores unitários."""
+    return 2 * np.sin(np.asarray(km, dtype=np.float64) / (2 * RAIO_TERRA_KM))
+
+def completar_coordenadas(df, coluna_texto="Localização Geo", coluna_lat="Latitude", coluna_lon="Longitude"):
+    """
+    Garante as colunas numéricas de latitude/longitude no DataFrame.
+    Usa as colunas vindas do banco quando presentes e só interpreta o texto das linhas ainda sem coordenadas
+    (ex.: banco ainda não migrado com scripts/sql/migracao_coordenadas_geo.sql).
+    """
+    if df.empty:
+        for coluna in (coluna_lat, coluna_lon):
+            if coluna not in df.columns:
+                df[coluna] = pd.Series(dtype="float64")
+        return df
+    for coluna in (coluna_lat, coluna_lon):
+        df[coluna] = pd.to_numeric(df[coluna], errors="coerce") if coluna in df.columns else np.nan
+    faltantes = df[coluna_lat].isna() | df[coluna_lon].isna()
+    if faltantes.any() and coluna_texto in df.columns:
+        coordenadas = extrair_coordenadas(df.loc[faltantes, coluna_texto])
+        df.loc[faltantes, coluna_lat] = coordenadas["lat"].to_numpy()
+        df.loc[faltantes, coluna_lon] = coordenadas["lon"].to_numpy()
+    return df
+
+def coordenadas_em_array(df, coluna_lat="Latitude", coluna_lon="Longitude"):
+    """Coordenadas válidas como array (n, 2) de float64 [lat, lon], mais a máscara das linhas usadas."""
+    lat = df[coluna_lat].to_numpy(dtype="float64", na_value=np.nan)
+    lon = df[coluna_lon].to_numpy(dtype="float64", na_value=np.nan)
+    validas = ~(np.isnan(lat) | np.isnan(lon))
+    return np.column_stack([lat[validas], lon[validas]]), validas
+
+def tabela_para_mapa(df, coluna_lat="Latitude", coluna_lon="Longitude"):
+    """Linhas com coordenadas, com as colunas 'lat'/'lon' esperadas por st.map."""
+    return df.dropna(subset=[coluna_lat, coluna_lon]).rename(columns={coluna_lat: "lat", coluna_lon: "lon"})
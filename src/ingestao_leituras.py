@@ -0,0 +1,222 @@
+import io
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError
+
+from src.bd_conection import conexao_postgres
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_LEITURA = ['SENSOR_ID', 'VALOR_LIDO', 'UNIDADE_MEDIDA', 'TIMESTAMP_LEITURA']
+
+TAMANHO_LOTE_PADRAO = 5000
+INTERVALO_FLUSH_PADRAO = 2.0  # segundos
+
+
+def normalizar_lote_leituras(leituras):
+    """
+    Converte um lote de leituras em DataFrame com as colunas de LEITURAS_SENSORES.
+    Aceita:
+      * lista de tuplas (sensor_id, valor_lido, unidade, timestamp);
+      * DataFrame com essas quatro colunas (por nome ou nas quatro primeiras posições);
+      * tupla/lista de quatro arrays NumPy, ou dicionário de arrays com esses nomes.
+    Leituras sem valor (NaN) são descartadas, pois VALOR_LIDO é NOT NULL.
+    """
+    if isinstance(leituras, pd.DataFrame):
+        df = leituras.copy()
+        mapa = {c: c.upper() for c in df.columns if isinstance(c, str)}
+        df = df.rename(columns=mapa).rename(columns={'VALOR': 'VALOR_LIDO', 'UNIDADE': 'UNIDADE_MEDIDA', 'TIMESTAMP': 'TIMESTAMP_LEITURA'})
+        if not set(COLUNAS_LEITURA).issubset(df.columns):
+            df = df.iloc[:, :4]
+            df.columns = COLUNAS_LEITURA
+        df = df[COLUNAS_LEITURA]
+    elif isinstance(leituras, dict):
+        df = pd.DataFrame({col: leituras[chave] for col, chave in zip(COLUNAS_LEITURA, ['sensor_id', 'valor_lido', 'unidade', 'timestamp'])})
+    elif isinstance(leituras, (tuple, list)) and len(leituras) == 4 and all(isinstance(a, np.ndarray) for a in leituras):
+        df = pd.DataFrame(dict(zip(COLUNAS_LEITURA, leituras)))
+    else:
+        df = pd.DataFrame.from_records(list(leituras), columns=COLUNAS_LEITURA)
+
+    df['VALOR_LIDO'] = pd.to_numeric(df['VALOR_LIDO'], errors='coerce')
+    df['TIMESTAMP_LEITURA'] = pd.to_datetime(df['TIMESTAMP_LEITURA'])
+    return df.dropna(subset=['SENSOR_ID', 'VALOR_LIDO', 'TIMESTAMP_LEITURA'])
+
+def salvar_leituras_em_lote(leituras, metodo='copy'):
+    """
+    Grava um lote de leituras em LEITURAS_SENSORES numa única transação.
+    metodo='copy' usa COPY FROM STDIN (mais rápido); metodo='values' usa INSERT multi-linha.
+    Retorna o número de linhas gravadas. Erros de banco são propagados ao chamador.
+    """
+    df = normalizar_lote_leituras(leituras)
+    if df.empty:
+        return 0
+
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            if metodo == 'copy':
+                buffer = io.StringIO()
+                df.to_csv(buffer, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY LEITURAS_SENSORES ({', '.join(COLUNAS_LEITURA)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            else:
+                execute_values(
+                    cursor,
+                    f"INSERT INTO LEITURAS_SENSORES ({', '.join(COLUNAS_LEITURA)}) VALUES %s",
+                    list(df.itertuples(index=False, name=None)),
+                    page_size=1000
+                )
+    return len(df)
+
+
+class IngestorLeituras:
+    """
+    Acumula leituras em memória e as grava em lote quando o buffer atinge
+    `tamanho_lote` linhas ou quando `intervalo_flush` segundos se passam desde o último flush.
+    Com `iniciar()`, uma thread de fundo garante o flush por tempo mesmo sem novas leituras.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE_PADRAO, intervalo_flush=INTERVALO_FLUSH_PADRAO, metodo='copy', max_pendentes=None):
+        self.tamanho_lote = tamanho_lote
+        # Com o banco fora do ar o buffer não cresce indefinidamente: as leituras mais antigas são descartadas
+        self.max_pendentes = max_pendentes or tamanho_lote * 20
+        self.intervalo_flush = intervalo_flush
+        self.metodo = metodo
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._ultimo_flush = time.monotonic()
+        self._parar = threading.Event()
+        self._thread = None
+        self.linhas_gravadas = 0
+        self.lotes_gravados = 0
+        self.falhas = 0
+        self.descartadas = 0
+        self.rejeitadas = 0
+
+    def adicionar(self, sensor_id, valor_lido, unidade_medida, timestamp_leitura):
+        """Enfileira uma leitura; dispara o flush se o lote estiver cheio."""
+        with self._lock:
+            self._buffer.append((sensor_id, valor_lido, unidade_medida, timestamp_leitura))
+            cheio = len(self._buffer) >= self.tamanho_lote
+        if cheio or self._intervalo_expirado():
+            self.flush()
+
+    def adicionar_lote(self, leituras):
+        """Enfileira um lote inteiro (mesmos formatos de `normalizar_lote_leituras`)."""
+        df = normalizar_lote_leituras(leituras)
+        with self._lock:
+            self._buffer.extend(df.itertuples(index=False, name=None))
+            cheio = len(self._buffer) >= self.tamanho_lote
+        if cheio or self._intervalo_expirado():
+            self.flush()
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def _intervalo_expirado(self):
+        return time.monotonic() - self._ultimo_flush >= self.intervalo_flush
+
+    def flush(self):
+        """Grava tudo o que está no buffer, em lotes de até `tamanho_lote` linhas."""
+        with self._flush_lock:
+            with self._lock:
+                lote, self._buffer = self._buffer, []
+            self._ultimo_flush = time.monotonic()
+            gravadas = 0
+            for inicio in range(0, len(lote), self.tamanho_lote):
+                parte = lote[inicio:inicio + self.tamanho_lote]
+                gravadas_parte, restante, erro = self._gravar_parte(parte)
+                gravadas += gravadas_parte
+                if erro is not None:
+                    self.falhas += 1
+                    logger.error("Erro ao gravar lote de %d leituras: %s", len(restante), erro)
+                    # Devolve o que não foi gravado ao início do buffer para a próxima tentativa
+                    with self._lock:
+                        self._buffer[:0] = restante + lote[inicio + self.tamanho_lote:]
+                        excesso = len(self._buffer) - self.max_pendentes
+                        if excesso > 0:
+                            del self._buffer[:excesso]
+                            self.descartadas += excesso
+                    break
+            self.linhas_gravadas += gravadas
+            return gravadas
+
+    def _gravar_parte(self, parte):
+        """
+        Grava uma parte do buffer. Se o banco a rejeita (IntegrityError/DataError, ex.: sensor
+        inexistente), ela é dividida ao meio até isolar as leituras inválidas, que são descartadas;
+        as demais são gravadas. Retorna (gravadas, não gravadas por erro transitório, erro ou None).
+        """
+        gravadas = rejeitadas = 0
+        ultimo_erro = None
+        pilha = [parte]
+        try:
+            while pilha:
+                atual = pilha.pop()
+                try:
+                    gravadas += salvar_leituras_em_lote(atual, metodo=self.metodo)
+                    self.lotes_gravados += 1
+                except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                    # Tentar de novo a mesma linha não adianta; o resto do lote ainda pode ser gravado
+                    ultimo_erro = e
+                    if len(atual) == 1:
+                        rejeitadas += 1
+                    else:
+                        meio = len(atual) // 2
+                        pilha += [atual[meio:], atual[:meio]]
+                except (psycopg2.Error, PoolError) as e:
+                    return gravadas, [linha for bloco in [atual] + pilha[::-1] for linha in bloco], e
+        finally:
+            if rejeitadas:
+                self.falhas += 1
+                self.rejeitadas += rejeitadas
+                self.descartadas += rejeitadas
+                logger.error("%d de %d leituras rejeitadas pelo banco e descartadas: %s", rejeitadas, len(parte), ultimo_erro)
+        return gravadas, [], None
+
+    def _loop_flush(self):
+        while not self._parar.wait(self.intervalo_flush / 2):
+            if self._intervalo_expirado() and self.pendentes():
+                self.flush()
+
+    def iniciar(self):
+        """Inicia a thread de flush periódico."""
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop_flush, name="ingestor-leituras", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        """Para a thread de flush e grava o que restou no buffer."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def estatisticas(self):
+        return {
+            "linhas_gravadas": self.linhas_gravadas,
+            "lotes_gravados": self.lotes_gravados,
+            "falhas": self.falhas,
+            "descartadas": self.descartadas,
+            "rejeitadas": self.rejeitadas,
+            "pendentes": self.pendentes(),
+        }
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+        return False
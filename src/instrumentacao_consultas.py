@@ -0,0 +1,294 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTACAO_ATIVA = os.environ.get("PG_INSTRUMENTACAO", "1") != "0"
+# Consultas acima deste tempo (ms) são registradas no log como lentas
+LIMIAR_CONSULTA_LENTA_MS = float(os.environ.get("PG_CONSULTA_LENTA_MS", 500))
+# Se ativo, o plano (EXPLAIN, sem ANALYZE) das consultas lentas é anexado ao log
+EXPLAIN_CONSULTAS_LENTAS = os.environ.get("PG_EXPLAIN_LENTAS", "0") == "1"
+
+TAMANHO_JANELA_LATENCIAS = 500
+# Impressões digitais distintas mantidas no registro; acima disso sai a usada há mais tempo
+MAX_CONSULTAS_REGISTRADAS = int(os.environ.get("PG_INSTRUMENTACAO_MAX_CONSULTAS", 1000))
+LINHAS_AMOSTRA_BYTES = 50
+
+# Módulos ignorados ao procurar a função que originou a consulta
+_MODULOS_INTERNOS = ("src.instrumentacao_consultas", "src.bd_conection", "pandas", "psycopg2", "contextlib", "sqlalchemy")
+
+_RE_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAMETROS = re.compile(r"%\(\w+\)s|%s")
+# Parâmetro, opcionalmente com cast ("?::TIMESTAMP", "?::NUMERIC[]")
+_ITEM = r"\?(?:\s*::\s*\w+(?:\s*\[\s*\])?)?"
+_TUPLA = rf"\(\s*{_ITEM}(?:\s*,\s*{_ITEM})*\s*\)"
+# VALUES de várias linhas (execute_values) viram uma só, independentemente do tamanho do lote
+_RE_VALUES = re.compile(rf"\bVALUES\s*{_TUPLA}(?:\s*,\s*{_TUPLA})*", re.I)
+# Linhas repetidas de VALUES com expressões (ex.: "(?, NULLIF(?, ?), CURRENT_TIMESTAMP), (...)")
+_LINHA = r"\((?:[^()]|\([^()]*\))*\)"
+_RE_VALUES_REPETIDOS = re.compile(rf"\bVALUES\s*({_LINHA})(?:\s*,\s*\1)+", re.I)
+_RE_LISTAS = re.compile(rf"\(\s*{_ITEM}(?:\s*,\s*{_ITEM})+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def impressao_digital(sql):
+    """Normaliza o SQL (sem literais, parâmetros e espaços extras) para agrupar execuções da mesma consulta."""
+    if isinstance(sql, bytes):
+        sql = sql.decode(errors="replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    texto = _RE_COMENTARIOS.sub(" ", sql)
+    texto = _RE_TEXTOS.sub("?", texto)
+    texto = _RE_PARAMETROS.sub("?", texto)
+    texto = _RE_NUMEROS.sub("?", texto)
+    texto = _RE_VALUES_REPETIDOS.sub(r"VALUES \1", texto)
+    texto = _RE_VALUES.sub("VALUES (?...)", texto)
+    texto = _RE_LISTAS.sub("(?...)", texto)
+    return _RE_ESPACOS.sub(" ", texto).strip().rstrip(";").upper()
+
+def _chamador():
+    """Primeira função fora do driver, do pandas e do pool na pilha de chamadas."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if not modulo.startswith(_MODULOS_INTERNOS):
+            return f"{modulo}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+def _tamanho_aproximado(linhas):
+    """Estima o volume de dados de um conjunto de linhas a partir de uma amostra."""
+    if not linhas:
+        return 0
+    amostra = linhas[:LINHAS_AMOSTRA_BYTES]
+    total = sum(len(str(valor)) for linha in amostra for valor in (linha if isinstance(linha, tuple) else (linha,)))
+    return int(total * len(linhas) / len(amostra))
+
+
+class EstatisticasConsulta:
+    """Estatísticas acumuladas de uma impressão digital de consulta."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.chamadas = 0
+        self.erros = 0
+        self.tempo_total = 0.0
+        self.tempo_max = 0.0
+        self.linhas = 0
+        self.bytes = 0
+        self.chamadores = set()
+        self.latencias = deque(maxlen=TAMANHO_JANELA_LATENCIAS)
+        self.ultimo_plano = None
+
+    def percentil(self, p):
+        if not self.latencias:
+            return 0.0
+        ordenadas = sorted(self.latencias)
+        return ordenadas[int(p * (len(ordenadas) - 1))]
+
+
+class RegistroConsultas:
+    """
+    Registro em memória, compartilhado pelo processo, das consultas executadas pelo pool.
+    Guarda no máximo `max_consultas` impressões digitais, descartando a usada há mais tempo (LRU).
+    """
+
+    def __init__(self, max_consultas=MAX_CONSULTAS_REGISTRADAS):
+        self.max_consultas = max_consultas
+        self._lock = threading.Lock()
+        self._consultas = OrderedDict()
+        self.descartadas = 0
+
+    def registrar(self, sql, chamador, duracao, linhas, tamanho, erro=False):
+        chave = impressao_digital(sql)
+        with self._lock:
+            estatisticas = self._consultas.get(chave)
+            if estatisticas is None:
+                estatisticas = self._consultas[chave] = EstatisticasConsulta(chave)
+                if len(self._consultas) > self.max_consultas:
+                    self._consultas.popitem(last=False)
+                    self.descartadas += 1
+            else:
+                self._consultas.move_to_end(chave)
+            estatisticas.chamadas += 1
+            estatisticas.erros += int(erro)
+            estatisticas.tempo_total += duracao
+            estatisticas.tempo_max = max(estatisticas.tempo_max, duracao)
+            estatisticas.linhas += linhas
+            estatisticas.bytes += tamanho
+            estatisticas.chamadores.add(chamador)
+            estatisticas.latencias.append(duracao)
+        return estatisticas
+
+    def principais(self, n=20, ordenar_por="tempo_total_ms"):
+        """Lista as `n` consultas mais custosas segundo `ordenar_por`."""
+        with self._lock:
+            linhas = [{
+                "consulta": e.sql,
+                "chamadores": ", ".join(sorted(e.chamadores)),
+                "chamadas": e.chamadas,
+                "erros": e.erros,
+                "tempo_total_ms": round(e.tempo_total * 1000, 1),
+                "p50_ms": round(e.percentil(0.50) * 1000, 2),
+                "p95_ms": round(e.percentil(0.95) * 1000, 2),
+                "p99_ms": round(e.percentil(0.99) * 1000, 2),
+                "max_ms": round(e.tempo_max * 1000, 2),
+                "linhas": e.linhas,
+                "linhas_por_chamada": round(e.linhas / e.chamadas, 1),
+                "bytes_aprox": e.bytes,
+                "ultimo_plano": e.ultimo_plano,
+            } for e in self._consultas.values()]
+        return sorted(linhas, key=lambda linha: linha[ordenar_por], reverse=True)[:n]
+
+    def limpar(self):
+        with self._lock:
+            self._consultas.clear()
+            self.descartadas = 0
+
+
+registro_consultas = RegistroConsultas()
+
+
+class CursorInstrumentado:
+    """
+    Envolve um cursor psycopg2 medindo cada comando: tempo de execução mais o tempo
+    gasto buscando as linhas, número de linhas e tamanho aproximado do resultado.
+    A medição de um comando é fechada no próximo execute, no close ou ao sair do `with`.
+    """
+
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_atual", None)
+
+    # --- Ciclo de vida da medição ---
+    def _iniciar(self, sql, params):
+        self._finalizar()
+        object.__setattr__(self, "_atual", {
+            "sql": sql, "params": params, "chamador": _chamador(),
+            "duracao": 0.0, "linhas": 0, "bytes": 0, "erro": False,
+        })
+
+    def _finalizar(self):
+        atual = self._atual
+        if atual is None:
+            return
+        object.__setattr__(self, "_atual", None)
+        if atual["linhas"] == 0 and self._cursor.rowcount and self._cursor.rowcount > 0 and self._cursor.description is None:
+            atual["linhas"] = self._cursor.rowcount  # comandos de escrita
+        estatisticas = registro_consultas.registrar(
+            atual["sql"], atual["chamador"], atual["duracao"], atual["linhas"], atual["bytes"], atual["erro"]
+        )
+        if atual["duracao"] * 1000 >= LIMIAR_CONSULTA_LENTA_MS and not atual["erro"]:
+            plano = self._explicar(atual["sql"], atual["params"]) if EXPLAIN_CONSULTAS_LENTAS else None
+            if plano:
+                estatisticas.ultimo_plano = plano
+            logger.warning(
+                "Consulta lenta (%.0f ms, %d linhas) em %s: %s%s",
+                atual["duracao"] * 1000, atual["linhas"], atual["chamador"], impressao_digital(atual["sql"]),
+                f"\n{plano}" if plano else "",
+            )
+
+    def _explicar(self, sql, params):
+        """Plano estimado da consulta, quando for um SELECT e a transação permitir."""
+        texto = sql.decode() if isinstance(sql, bytes) else str(sql)
+        if not texto.lstrip().upper().startswith(("SELECT", "WITH")):
+            return None
+        conn = self._cursor.connection
+        if conn.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("EXPLAIN " + texto, params)
+                return "\n".join(linha[0] for linha in cursor.fetchall())
+        except psycopg2.Error:
+            return None
+
+    def _medir(self, funcao, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        except Exception:
+            if self._atual is not None:
+                self._atual["erro"] = True
+            raise
+        finally:
+            if self._atual is not None:
+                self._atual["duracao"] += time.perf_counter() - inicio
+
+    def _contar(self, linhas):
+        if self._atual is not None and linhas:
+            self._atual["linhas"] += len(linhas)
+            self._atual["bytes"] += _tamanho_aproximado(linhas)
+        return linhas
+
+    # --- Comandos ---
+    def execute(self, sql, params=None):
+        self._iniciar(sql, params)
+        return self._medir(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, params_seq):
+        self._iniciar(sql, None)
+        return self._medir(self._cursor.executemany, sql, params_seq)
+
+    def copy_expert(self, sql, arquivo, *args, **kwargs):
+        self._iniciar(sql, None)
+        return self._medir(self._cursor.copy_expert, sql, arquivo, *args, **kwargs)
+
+    # --- Busca de resultados ---
+    def fetchone(self):
+        linha = self._medir(self._cursor.fetchone)
+        self._contar([linha] if linha is not None else [])
+        return linha
+
+    def fetchmany(self, size=None):
+        linhas = self._medir(self._cursor.fetchmany, size if size is not None else self._cursor.arraysize)
+        return self._contar(linhas)
+
+    def fetchall(self):
+        return self._contar(self._medir(self._cursor.fetchall))
+
+    def __iter__(self):
+        while True:
+            linhas = self.fetchmany(self._cursor.itersize if self._cursor.name else self._cursor.arraysize or 100)
+            if not linhas:
+                return
+            yield from linhas
+
+    def close(self):
+        self._finalizar()
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- Demais atributos vão direto ao cursor original ---
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._cursor, nome, valor)
+
+
+def instrumentar_cursor(cursor):
+    """Envolve o cursor para medição, se a instrumentação estiver ativa."""
+    return CursorInstrumentado(cursor) if INSTRUMENTACAO_ATIVA else cursor
+
+def obter_principais_consultas(n=20, ordenar_por="tempo_total_ms"):
+    return registro_consultas.principais(n, ordenar_por)
+
+def limpar_estatisticas_consultas():
+    registro_consultas.limpar()
@@ -0,0 +1,258 @@
+"""
+Motor de alertas com estado por sensor.
+
+Em vez de inserir uma linha em ALERTAS_DESASTRE a cada leitura acima do limiar, cada sensor tem
+um estado (nível atual e ALERTA_ID do alerta aberto):
+- o alerta é aberto uma única vez, ao sair de SEGURO;
+- mudanças de nível atualizam a mesma linha (NIVEL_ALERTA, descrição, TIMESTAMP_ATUALIZACAO);
+- ao voltar a SEGURO o alerta é marcado RESOLVIDO.
+
+Histerese: para descer de nível a leitura precisa ficar `histerese` (fração do limiar) abaixo
+do limiar do nível atual, e cada mudança só é aplicada depois de a condição durar o tempo mínimo
+de permanência (subida, descida ou resolução). Oscilações em torno de um limiar não geram
+sequências de aberturas e resoluções.
+
+O estado é reconstruído a partir dos alertas ATIVO com SENSOR_ID ao iniciar (`carregar_ativos`),
+então reiniciar o serviço não reabre alertas já abertos. Só entram os alertas cujo tipo é o do
+próprio sensor; os preditivos (src/alerta_antecipado.py) têm estado à parte. Transições cuja
+gravação falhou continuam pendentes e são regravadas no ciclo seguinte.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from src.bd_conection import conexao_postgres
+from src.classificacao_alertas import CODIGO_NIVEL, NIVEIS_ALERTA, obter_classificador
+from src.flood_monitoring import gerar_alerta, unidade_do_sensor
+
+logger = logging.getLogger(__name__)
+
+HISTERESE_PADRAO = 0.05                # 5% abaixo do limiar para descer de nível
+PERMANENCIA_SUBIDA_PADRAO = 0.0        # segundos; subir de nível é imediato por padrão
+PERMANENCIA_DESCIDA_PADRAO = 300.0
+PERMANENCIA_RESOLUCAO_PADRAO = 600.0
+
+ABERTO, ESCALADO, REDUZIDO, RESOLVIDO = 'ABERTO', 'ESCALADO', 'REDUZIDO', 'RESOLVIDO'
+
+
+@dataclass
+class EstadoAlerta:
+    sensor_id: int
+    tipo_sensor: str
+    area: str
+    nivel: int = 0                  # código em NIVEIS_ALERTA
+    alerta_id: int = None
+    pendente: int = None            # nível candidato aguardando o tempo de permanência
+    pendente_desde: object = None
+    ultimo_valor: float = None
+
+
+@dataclass
+class Transicao:
+    evento: str                     # ABERTO, ESCALADO, REDUZIDO ou RESOLVIDO
+    estado: EstadoAlerta
+    nivel_anterior: int
+    valor: float
+    timestamp: object
+
+    def alerta(self):
+        """Dicionário no formato de `gerar_alerta` para o nível após a transição."""
+        nivel = NIVEIS_ALERTA[self.estado.nivel if self.evento != RESOLVIDO else self.nivel_anterior]
+        tipo = self.estado.tipo_sensor
+        return gerar_alerta(tipo, nivel, self.valor, unidade_do_sensor(tipo), self.estado.area)
+
+
+def gravar_alertas(novos, alterados, resolvidos):
+    """
+    Grava mudanças de alertas por sensor numa única transação e retorna {SENSOR_ID: ALERTA_ID}
+    dos inseridos.
+    novos: [(sensor_id, tipo, área, nível, descrição, recomendação, momento)]
+    alterados: [(alerta_id, nível, descrição, recomendação, momento)]
+    resolvidos: [(alerta_id, momento)]
+    """
+    ids = {}
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            if novos:
+                linhas = execute_values(cursor, """
+                    INSERT INTO ALERTAS_DESASTRE (SENSOR_ID, TIPO_ALERTA, AREA_AFETADA, NIVEL_ALERTA, DESCRICAO_ALERTA,
+                                                  RECOMENDACAO, TIMESTAMP_ALERTA, STATUS_ALERTA)
+                    VALUES %s
+                    RETURNING SENSOR_ID, ALERTA_ID
+                """, novos, template="(%s, %s, %s, %s, %s, %s, %s, 'ATIVO')", page_size=len(novos), fetch=True)
+                ids = dict(linhas)
+            if alterados:
+                execute_values(cursor, """
+                    UPDATE ALERTAS_DESASTRE a
+                    SET NIVEL_ALERTA = v.nivel, DESCRICAO_ALERTA = v.descricao, RECOMENDACAO = v.recomendacao,
+                        TIMESTAMP_ATUALIZACAO = v.momento
+                    FROM (VALUES %s) AS v(alerta_id, nivel, descricao, recomendacao, momento)
+                    WHERE a.ALERTA_ID = v.alerta_id
+                """, alterados, template="(%s, %s, %s, %s, %s::timestamp)", page_size=len(alterados))
+            if resolvidos:
+                execute_values(cursor, """
+                    UPDATE ALERTAS_DESASTRE a
+                    SET STATUS_ALERTA = 'RESOLVIDO', TIMESTAMP_ATUALIZACAO = v.momento
+                    FROM (VALUES %s) AS v(alerta_id, momento)
+                    WHERE a.ALERTA_ID = v.alerta_id
+                """, resolvidos, template="(%s, %s::timestamp)", page_size=len(resolvidos))
+    return ids
+
+
+class MotorAlertas:
+    """Máquina de estados de alerta por sensor, com histerese, tempo mínimo de permanência e gravação em lote."""
+
+    def __init__(self, histerese=HISTERESE_PADRAO, permanencia_subida=PERMANENCIA_SUBIDA_PADRAO,
+                 permanencia_descida=PERMANENCIA_DESCIDA_PADRAO, permanencia_resolucao=PERMANENCIA_RESOLUCAO_PADRAO,
+                 classificador=None):
+        if not 0 <= histerese < 1:
+            raise ValueError("A histerese deve estar em [0, 1).")
+        self.histerese = histerese
+        self.permanencia_subida = permanencia_subida
+        self.permanencia_descida = permanencia_descida
+        self.permanencia_resolucao = permanencia_resolucao
+        self._classificador = classificador
+        self._estados = {}
+        # Última transição de cada sensor ainda não confirmada no banco: {SENSOR_ID: Transicao}
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self.contadores = {ABERTO: 0, ESCALADO: 0, REDUZIDO: 0, RESOLVIDO: 0, 'leituras': 0, 'gravacoes': 0}
+
+    # --- Estado ---
+    def carregar_ativos(self):
+        """Recupera do banco os alertas ATIVO ligados a sensores. Retorna quantos foram carregados."""
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT a.ALERTA_ID, a.SENSOR_ID, a.NIVEL_ALERTA, s.TIPO_SENSOR, s.LOCALIZACAO_GEO
+                    FROM ALERTAS_DESASTRE a
+                    JOIN SENSORES_AMBIENTAIS s ON s.SENSOR_ID = a.SENSOR_ID
+                    WHERE a.STATUS_ALERTA = 'ATIVO' AND a.TIPO_ALERTA = s.TIPO_SENSOR
+                """)
+                linhas = cursor.fetchall()
+        with self._lock:
+            for alerta_id, sensor_id, nivel, tipo, area in linhas:
+                self._estados[sensor_id] = EstadoAlerta(sensor_id, tipo, area, CODIGO_NIVEL[nivel], alerta_id)
+        return len(linhas)
+
+    def estado(self, sensor_id):
+        return self._estados.get(sensor_id)
+
+    def alertas_ativos(self):
+        """Estados com alerta aberto (nível acima de SEGURO)."""
+        with self._lock:
+            return [estado for estado in self._estados.values() if estado.nivel > 0]
+
+    # --- Transições ---
+    def _transicao(self, estado, subida, descida, valor, timestamp):
+        """Avalia um sensor: `subida` é o nível da leitura, `descida` o nível com a folga da histerese."""
+        estado.ultimo_valor = valor
+        if subida > estado.nivel:
+            candidato, espera = subida, self.permanencia_subida
+            mesma_direcao = estado.pendente is not None and estado.pendente > estado.nivel
+        elif descida < estado.nivel:
+            candidato = descida
+            espera = self.permanencia_resolucao if descida == 0 else self.permanencia_descida
+            mesma_direcao = estado.pendente is not None and estado.pendente < estado.nivel
+        else:
+            # Dentro da faixa de histerese do nível atual: nada muda e a contagem de permanência recomeça
+            estado.pendente = estado.pendente_desde = None
+            return None
+
+        if not mesma_direcao:
+            estado.pendente_desde = timestamp
+        estado.pendente = candidato
+        if (timestamp - estado.pendente_desde).total_seconds() < espera:
+            return None
+
+        anterior = estado.nivel
+        estado.nivel = candidato
+        estado.pendente = estado.pendente_desde = None
+        if anterior == 0:
+            evento = ABERTO
+        elif candidato == 0:
+            evento = RESOLVIDO
+        else:
+            evento = ESCALADO if candidato > anterior else REDUZIDO
+        self.contadores[evento] += 1
+        return Transicao(evento, estado, anterior, valor, timestamp)
+
+    def processar(self, leituras, timestamp):
+        """
+        Aplica um lote de leituras [(sensor_info, valor)] (sensor_info com SENSOR_ID, TIPO_SENSOR e
+        LOCALIZACAO_GEO) e retorna as transições ocorridas. Não grava nada: a última transição de
+        cada sensor fica pendente até `gravar` confirmar a transação.
+        """
+        if not leituras:
+            return []
+        classificador = self._classificador or obter_classificador()
+        valores = np.array([valor for _, valor in leituras], dtype=np.float64)
+        sensor_ids = [info['SENSOR_ID'] for info, _ in leituras]
+        tipos = [info['TIPO_SENSOR'] for info, _ in leituras]
+        subida = classificador.classificar(valores, sensor_ids, tipos)
+        # v >= limiar * (1 - h)  <=>  v / (1 - h) >= limiar
+        descida = classificador.classificar(valores / (1 - self.histerese), sensor_ids, tipos)
+
+        transicoes = []
+        with self._lock:
+            for (info, valor), nivel_subida, nivel_descida in zip(leituras, subida, descida):
+                estado = self._estados.get(info['SENSOR_ID'])
+                if estado is None:
+                    if nivel_subida == 0:
+                        continue
+                    estado = self._estados[info['SENSOR_ID']] = EstadoAlerta(info['SENSOR_ID'], info['TIPO_SENSOR'], info['LOCALIZACAO_GEO'])
+                transicao = self._transicao(estado, int(nivel_subida), int(nivel_descida), float(valor), timestamp)
+                if transicao is not None:
+                    transicoes.append(transicao)
+                    self._pendentes[estado.sensor_id] = transicao
+                if estado.nivel == 0 and estado.pendente is None and estado.sensor_id not in self._pendentes:
+                    del self._estados[info['SENSOR_ID']]
+            self.contadores['leituras'] += len(leituras)
+        return transicoes
+
+    # --- Persistência ---
+    def gravar(self):
+        """
+        Grava a última transição pendente de cada sensor numa única transação: INSERT para alertas
+        novos, UPDATE da mesma linha para mudanças de nível e RESOLVIDO ao encerrar. O estado em
+        memória (ALERTA_ID, sensores sem alerta) só muda depois do commit; se a transação falhar,
+        as pendências continuam e são gravadas no próximo ciclo. Retorna o número de linhas gravadas.
+        """
+        with self._lock:
+            pendentes = list(self._pendentes.values())
+            alerta_ids = [transicao.estado.alerta_id for transicao in pendentes]
+        novos, alterados, resolvidos = [], [], []
+        for transicao, alerta_id in zip(pendentes, alerta_ids):
+            if transicao.evento == RESOLVIDO:
+                if alerta_id is not None:
+                    resolvidos.append((alerta_id, transicao.timestamp))
+                continue
+            alerta = transicao.alerta()
+            dados = (alerta['Nível'], alerta['DescricaoCompleta'], alerta['Recomendação'], transicao.timestamp)
+            if alerta_id is None:
+                novos.append((transicao.estado.sensor_id, alerta['Tipo'], alerta['Localização']) + dados)
+            else:
+                alterados.append((alerta_id,) + dados)
+
+        ids = gravar_alertas(novos, alterados, resolvidos) if (novos or alterados or resolvidos) else {}
+
+        with self._lock:
+            for transicao in pendentes:
+                estado = transicao.estado
+                if transicao.evento == RESOLVIDO:
+                    estado.alerta_id = None
+                elif estado.alerta_id is None:
+                    estado.alerta_id = ids.get(estado.sensor_id)
+                # Uma transição mais nova do mesmo sensor continua pendente para o próximo ciclo
+                if self._pendentes.get(estado.sensor_id) is transicao:
+                    del self._pendentes[estado.sensor_id]
+                    if estado.nivel == 0 and estado.pendente is None and self._estados.get(estado.sensor_id) is estado:
+                        del self._estados[estado.sensor_id]
+        self.contadores['gravacoes'] += len(novos) + len(alterados) + len(resolvidos)
+        return len(novos) + len(alterados) + len(resolvidos)
+
+    def estatisticas(self):
+        return {**self.contadores, 'sensores_em_alerta': len(self.alertas_ativos()), 'pendentes': len(self._pendentes)}
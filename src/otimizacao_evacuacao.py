@@ -0,0 +1,194 @@
+"""
+Alocação da população das comunidades nos abrigos, respeitando a capacidade.
+
+Problema de transporte resolvido por programação linear (scipy.optimize.linprog, HiGHS):
+    minimizar   soma custo[i, j] * x[i, j] + penalidade * nao_alocado[i]
+    sujeito a   soma_j x[i, j] + nao_alocado[i] = POPULACAO_ESTIMADA[i]      (cada comunidade)
+                soma_i x[i, j] <= vagas[j]                                   (cada abrigo)
+O custo é a distância (km) ou o tempo pelas rotas (min, ver src/rotas_evacuacao.py). Para caber
+em segundos com milhares de comunidades e centenas de abrigos, cada comunidade só concorre aos
+`candidatos` abrigos elegíveis mais próximos (src/abrigos_proximos.py). A variável "não alocado"
+mantém o problema viável quando falta capacidade.
+
+Quando um abrigo fica CHEIO ou FECHADO, o plano é refeito a partir do anterior: só a população
+que estava destinada a ele é realocada, nas vagas que sobraram nos demais abrigos.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix
+
+from src.abrigos_proximos import IndiceAbrigos
+from src.geo import coordenadas_em_array
+
+CRITERIOS = ('distancia', 'tempo')
+CANDIDATOS_PADRAO = 10
+
+
+class OtimizadorEvacuacao:
+    """Plano de alocação comunidade -> abrigo, com re-otimização a partir do plano anterior."""
+
+    def __init__(self, df_comunidades, df_abrigos, criterio='distancia', grafo=None, candidatos=CANDIDATOS_PADRAO):
+        if criterio not in CRITERIOS:
+            raise ValueError(f"Critério inválido: {criterio}")
+        if criterio == 'tempo' and grafo is None:
+            raise ValueError("O critério 'tempo' exige o grafo de rotas (obter_grafo_evacuacao).")
+        self.criterio = criterio
+        self.candidatos = candidatos
+        self._indice = IndiceAbrigos(df_abrigos)
+        self.abrigo_ids = self._indice.ids
+        self.nomes_abrigos = self._indice.nomes
+        self.vagas = np.where(self._indice.elegiveis(), self._indice.vagas(), 0).astype(np.float64)
+
+        populacao = pd.to_numeric(df_comunidades['População Estimada'], errors='coerce').fillna(0).to_numpy()
+        self.comunidade_ids = df_comunidades['ID'].to_numpy()
+        self.nomes_comunidades = df_comunidades['Nome da Comunidade'].to_numpy()
+        self.populacao = np.maximum(populacao, 0).astype(np.float64)
+        coordenadas, validas = coordenadas_em_array(df_comunidades)
+        self._coordenadas = np.full((len(df_comunidades), 2), np.nan)
+        self._coordenadas[validas] = coordenadas
+        if criterio == 'tempo':
+            self._tempos = grafo.matriz_custos().reindex(index=self.comunidade_ids, columns=self.abrigo_ids).to_numpy(dtype=np.float64, na_value=np.inf)
+
+        # Plano atual: uma entrada por aresta candidata (comunidade, abrigo) com o fluxo de pessoas
+        self._linhas = np.empty(0, dtype=np.int64)
+        self._colunas = np.empty(0, dtype=np.int64)
+        self._custos = np.empty(0)
+        self._fluxos = np.empty(0)
+        self.nao_alocado = self.populacao.copy()
+        self.tempo_solucao_ms = 0.0
+
+    # --- Candidatos ---
+    def _gerar_candidatos(self, linhas, vagas):
+        """Arestas (comunidade, abrigo, custo) para os `candidatos` abrigos com vagas mais próximos de cada comunidade."""
+        com_vagas = vagas > 0
+        if not com_vagas.any() or len(linhas) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+        if self.criterio == 'distancia':
+            linhas = linhas[~np.isnan(self._coordenadas[linhas]).any(axis=1)]
+            indices, distancias = self._indice.consultar(self._coordenadas[linhas], self.candidatos, elegiveis=com_vagas)
+            k = indices.shape[1]
+            return np.repeat(linhas, k), indices.ravel(), distancias.ravel()
+
+        tempos = np.where(com_vagas, self._tempos[linhas], np.inf)
+        k = min(self.candidatos, tempos.shape[1])
+        proximos = np.argpartition(tempos, k - 1, axis=1)[:, :k]
+        custos = np.take_along_axis(tempos, proximos, axis=1)
+        alcancaveis = np.isfinite(custos).ravel()
+        return np.repeat(linhas, k)[alcancaveis], proximos.ravel()[alcancaveis], custos.ravel()[alcancaveis]
+
+    # --- Programa linear ---
+    def _resolver_lp(self, linhas, demanda, vagas):
+        """Resolve o transporte para as comunidades `linhas` com `demanda` pessoas; retorna arestas, fluxos e não alocados."""
+        cand_linhas, cand_colunas, custos = self._gerar_candidatos(linhas, vagas)
+        n_linhas, n_arestas = len(linhas), len(cand_linhas)
+        if n_arestas == 0:
+            return cand_linhas, cand_colunas, custos, np.empty(0), demanda.copy()
+
+        posicao = np.full(len(self.populacao), -1, dtype=np.int64)
+        posicao[linhas] = np.arange(n_linhas)
+        abrigos_usados, coluna_compacta = np.unique(cand_colunas, return_inverse=True)
+        penalidade = 10 * max(float(custos.max()), 1.0)
+
+        c = np.concatenate([custos, np.full(n_linhas, penalidade)])
+        a_eq = csr_matrix(
+            (np.ones(n_arestas + n_linhas),
+             (np.concatenate([posicao[cand_linhas], np.arange(n_linhas)]), np.arange(n_arestas + n_linhas))),
+            shape=(n_linhas, n_arestas + n_linhas),
+        )
+        a_ub = csr_matrix(
+            (np.ones(n_arestas), (coluna_compacta, np.arange(n_arestas))),
+            shape=(len(abrigos_usados), n_arestas + n_linhas),
+        )
+        resultado = linprog(c, A_ub=a_ub, b_ub=vagas[abrigos_usados], A_eq=a_eq, b_eq=demanda,
+                            bounds=(0, None), method='highs')
+        if resultado.status != 0:
+            raise RuntimeError(f"Otimização de evacuação não convergiu: {resultado.message}")
+        # Problema de transporte com dados inteiros: a solução ótima é inteira (arredonda ruído numérico)
+        x = np.round(resultado.x)
+        return cand_linhas, cand_colunas, custos, x[:n_arestas], x[n_arestas:]
+
+    def resolver(self):
+        """Calcula o plano completo para todas as comunidades."""
+        inicio = time.perf_counter()
+        linhas = np.nonzero(self.populacao > 0)[0]
+        self._linhas, self._colunas, self._custos, self._fluxos, nao_alocado = self._resolver_lp(linhas, self.populacao[linhas], self.vagas)
+        self.nao_alocado = np.zeros_like(self.populacao)
+        self.nao_alocado[linhas] = nao_alocado
+        self._descartar_arestas_vazias()
+        self.tempo_solucao_ms = (time.perf_counter() - inicio) * 1000
+        return self
+
+    def fechar_abrigo(self, abrigo_id, status='FECHADO'):
+        """
+        Abrigo passou a CHEIO/FECHADO: mantém o restante do plano e realoca só a população que ia para ele.
+        Retorna o número de pessoas realocadas.
+        """
+        inicio = time.perf_counter()
+        colunas = np.nonzero(self.abrigo_ids == abrigo_id)[0]
+        if len(colunas) == 0:
+            return 0
+        coluna = colunas[0]
+        self.vagas[coluna] = 0
+        self._indice.atualizar_capacidade(abrigo_id, status=status)
+
+        afetadas = self._colunas == coluna
+        deslocados = np.bincount(self._linhas[afetadas], weights=self._fluxos[afetadas], minlength=len(self.populacao))
+        mantidas = ~afetadas
+        self._linhas, self._colunas, self._custos, self._fluxos = (
+            self._linhas[mantidas], self._colunas[mantidas], self._custos[mantidas], self._fluxos[mantidas]
+        )
+        linhas = np.nonzero(deslocados > 0)[0]
+        if len(linhas):
+            carga = np.bincount(self._colunas, weights=self._fluxos, minlength=len(self.vagas))
+            restantes = np.maximum(self.vagas - carga, 0)
+            novas = self._resolver_lp(linhas, deslocados[linhas], restantes)
+            self._linhas = np.concatenate([self._linhas, novas[0]])
+            self._colunas = np.concatenate([self._colunas, novas[1]])
+            self._custos = np.concatenate([self._custos, novas[2]])
+            self._fluxos = np.concatenate([self._fluxos, novas[3]])
+            self.nao_alocado[linhas] += novas[4]
+            self._descartar_arestas_vazias()
+        self.tempo_solucao_ms = (time.perf_counter() - inicio) * 1000
+        return int(deslocados.sum())
+
+    def _descartar_arestas_vazias(self):
+        usadas = self._fluxos > 0
+        self._linhas, self._colunas, self._custos, self._fluxos = (
+            self._linhas[usadas], self._colunas[usadas], self._custos[usadas], self._fluxos[usadas]
+        )
+
+    # --- Resultados ---
+    def tabela_alocacao(self):
+        """Uma linha por (comunidade, abrigo) com pessoas alocadas e custo unitário."""
+        unidade = 'km' if self.criterio == 'distancia' else 'min'
+        return pd.DataFrame({
+            'ID Comunidade': self.comunidade_ids[self._linhas],
+            'Comunidade': self.nomes_comunidades[self._linhas],
+            'ID Abrigo': self.abrigo_ids[self._colunas],
+            'Abrigo': self.nomes_abrigos[self._colunas],
+            'Pessoas': self._fluxos.astype(np.int64),
+            f'Custo ({unidade})': np.round(self._custos, 2),
+        }).sort_values(['Comunidade', f'Custo ({unidade})'], ignore_index=True)
+
+    def ocupacao_abrigos(self):
+        """Vagas iniciais e pessoas destinadas a cada abrigo no plano atual."""
+        carga = np.bincount(self._colunas, weights=self._fluxos, minlength=len(self.vagas))
+        return pd.DataFrame({
+            'ID Abrigo': self.abrigo_ids,
+            'Abrigo': self.nomes_abrigos,
+            'Vagas': self.vagas.astype(np.int64),
+            'Pessoas Destinadas': carga.astype(np.int64),
+        })
+
+    def resumo(self):
+        total = float(self._fluxos.sum())
+        return {
+            'pessoas_alocadas': int(total),
+            'pessoas_nao_alocadas': int(self.nao_alocado.sum()),
+            'custo_medio_por_pessoa': float((self._custos * self._fluxos).sum() / total) if total else 0.0,
+            'tempo_solucao_ms': round(self.tempo_solucao_ms, 1),
+        }
@@ -0,0 +1,355 @@
+"""
+Grafo das rotas de evacuação e caminhos mínimos até os abrigos.
+
+Os pontos de passagem de ROTAS_EVACUACAO.PONTOS_CHAVE ("Ponte Estaiada, Av. Raul Lopes, Abrigo Central")
+viram nós, e cada par consecutivo vira um trecho. O custo de um trecho (minutos) vem do
+TEMPO_VIAGEM_ESTIMADO mais recente de DADOS_MOBILIDADE nos seus pontos; sem dado de tráfego, da
+distância entre os pontos; sem coordenadas, de um custo padrão. Comunidades e abrigos são ligados
+aos pontos de passagem pelo nome (abrigos) ou pelos pontos com coordenadas mais próximos.
+
+Os acessos são direcionados e terminais: comunidade -> ponto de passagem e ponto -> abrigo, de modo
+que nenhum caminho atravessa outra comunidade ou outro abrigo; o deslocamento entre pontos é sempre
+por trechos de rota. Um ponto de passagem em que todas as rotas estão fechadas também perde os
+acessos. Uma árvore de caminhos mínimos é mantida por abrigo, calculada no grafo reverso a partir
+do abrigo, e dá o caminho de cada comunidade até ele. Quando uma rota é fechada/bloqueada ou um
+tempo de viagem muda, só são recalculadas as árvores que a mudança pode afetar:
+  - trecho mais caro ou removido: árvores que usam o trecho;
+  - trecho mais barato ou reaberto: árvores em que o trecho encurta a distância de uma das pontas.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from unidecode import unidecode
+
+from src.geo import distancia_km, extrair_descricao
+
+STATUS_ROTA_FECHADOS = ('FECHADA', 'BLOQUEADA')
+FATOR_RISCO = {'BAIXO': 1.0, 'MEDIO': 1.25, 'ALTO': 1.5}
+CUSTO_PADRAO_MINUTOS = 10.0
+VELOCIDADE_ROTA_KMH = 40.0
+VELOCIDADE_ACESSO_KMH = 15.0   # deslocamento da comunidade/abrigo até o ponto de passagem
+VIZINHOS_ACESSO = 2
+CUSTO_MINIMO = 1e-3            # o csgraph ignora arestas de custo zero
+
+_SEPARADORES = re.compile(r"\s*(?:->|→|;|,|\n)\s*")
+
+
+def normalizar_ponto(texto):
+    """Forma usada para comparar nomes de pontos (sem acentos, minúsculas, espaços simples)."""
+    return re.sub(r"\s+", " ", unidecode(str(texto))).lower().strip(" .")
+
+def separar_pontos_chave(texto):
+    """Lista ordenada dos pontos de passagem de PONTOS_CHAVE."""
+    if not texto:
+        return []
+    return [parte.strip() for parte in _SEPARADORES.split(texto) if normalizar_ponto(parte)]
+
+
+class GrafoEvacuacao:
+    """Grafo ponderado das rotas com árvores de caminhos mínimos por abrigo."""
+
+    def __init__(self, df_rotas, df_mobilidade, df_comunidades, df_abrigos):
+        self._lock = threading.RLock()
+        self.rotulos = []
+        self._indices = {}
+        self.coordenadas = {}
+        self.tempos_mobilidade = {}
+        self.rotas = {}
+        self._acessos = {}              # {(de, para): minutos}, no sentido da evacuação
+        self._ponto_do_acesso = {}
+        self._acessos_por_ponto = {}
+        self._rotas_por_trecho = {}
+        self._trechos_por_no = {}
+        self.origens = {}
+        self.destinos = {}
+        self._custos = {}
+        self.recalculos_arvores = 0
+        self.ultimo_recalculo_ms = 0.0
+        self._montar(df_rotas, df_mobilidade, df_comunidades, df_abrigos)
+        self._ordem_abrigos = list(self.destinos)
+        self._linha_abrigo = {abrigo_id: linha for linha, abrigo_id in enumerate(self._ordem_abrigos)}
+        self.distancias = np.full((len(self._ordem_abrigos), len(self.rotulos)), np.inf)
+        self.predecessores = np.full(self.distancias.shape, -9999, dtype=np.int32)
+        self._arestas_arvore = [set() for _ in self._ordem_abrigos]
+        self.recalcular_tudo()
+
+    # --- Montagem ---
+    def _no(self, chave, rotulo):
+        if chave not in self._indices:
+            self._indices[chave] = len(self.rotulos)
+            self.rotulos.append(rotulo)
+        return self._indices[chave]
+
+    @staticmethod
+    def _aresta(i, j):
+        return (i, j) if i < j else (j, i)
+
+    def _acesso(self, de, para, ponto, custo):
+        """Acesso direcionado (de -> para) entre um ponto de passagem e uma comunidade ou um abrigo."""
+        self._acessos[(de, para)] = custo
+        self._ponto_do_acesso[(de, para)] = ponto
+        self._acessos_por_ponto.setdefault(ponto, set()).add((de, para))
+
+    def _ligar_mais_proximos(self, no, lat, lon, pontos_com_coordenadas, abrigo=False):
+        """
+        Liga um nó aos pontos de passagem com coordenadas mais próximos (custo pelo tempo de
+        deslocamento): comunidade -> ponto, ou ponto -> abrigo com `abrigo`.
+        """
+        if not pontos_com_coordenadas:
+            return
+        pontos = np.array(pontos_com_coordenadas)
+        coordenadas = np.array([self.coordenadas[p] for p in pontos])
+        distancias = distancia_km(lat, lon, coordenadas[:, 0], coordenadas[:, 1])
+        for posicao in np.argsort(distancias)[:VIZINHOS_ACESSO]:
+            minutos = max(distancias[posicao] / VELOCIDADE_ACESSO_KMH * 60, CUSTO_MINIMO)
+            ponto = int(pontos[posicao])
+            self._acesso(ponto, no, ponto, minutos) if abrigo else self._acesso(no, ponto, ponto, minutos)
+
+    def _montar(self, df_rotas, df_mobilidade, df_comunidades, df_abrigos):
+        # Pontos de passagem e trechos de cada rota
+        for rota in df_rotas.itertuples(index=False):
+            rota_id, pontos_chave, status, risco = rota[0], rota[3], rota[4], rota[5]
+            nos = [self._no("ponto:" + normalizar_ponto(p), p) for p in separar_pontos_chave(pontos_chave)]
+            trechos = [self._aresta(a, b) for a, b in zip(nos, nos[1:]) if a != b]
+            self.rotas[rota_id] = {'status': status, 'fator': FATOR_RISCO.get(risco, 1.0), 'trechos': trechos}
+            for trecho in trechos:
+                self._rotas_por_trecho.setdefault(trecho, set()).add(rota_id)
+                for no in trecho:
+                    self._trechos_por_no.setdefault(no, set()).add(trecho)
+
+        # Coordenadas e tempo de viagem dos pontos citados em DADOS_MOBILIDADE
+        if not df_mobilidade.empty:
+            descricoes = extrair_descricao(df_mobilidade['Localização Geo']).fillna('').map(normalizar_ponto)
+            for descricao, lat, lon, tempo in zip(descricoes, df_mobilidade['Latitude'], df_mobilidade['Longitude'],
+                                                  df_mobilidade['Tempo Viagem Est.']):
+                no = self._indices.get("ponto:" + descricao)
+                if no is None:
+                    continue
+                if pd.notna(lat) and pd.notna(lon):
+                    self.coordenadas[no] = (float(lat), float(lon))
+                if pd.notna(tempo):
+                    self.tempos_mobilidade[no] = float(tempo)
+
+        # Abrigos: ligados ao ponto de mesmo nome ("Abrigo Central" -> "Abrigo Central Teresina") ou aos mais próximos
+        pontos_de_passagem = [i for chave, i in self._indices.items() if chave.startswith("ponto:")]
+        sem_nome_correspondente = []
+        for abrigo in df_abrigos.itertuples(index=False):
+            abrigo_id, nome = abrigo[0], abrigo[1]
+            lat, lon = getattr(abrigo, 'Latitude', np.nan), getattr(abrigo, 'Longitude', np.nan)
+            no = self._no(f"abrigo:{abrigo_id}", nome)
+            self.destinos[abrigo_id] = no
+            nome_normalizado = normalizar_ponto(nome)
+            correspondentes = [
+                p for p in pontos_de_passagem
+                if len(self.rotulos[p]) >= 5 and (normalizar_ponto(self.rotulos[p]) in nome_normalizado
+                                                  or nome_normalizado in normalizar_ponto(self.rotulos[p]))
+            ]
+            if pd.notna(lat) and pd.notna(lon):
+                self.coordenadas[no] = (float(lat), float(lon))
+                for p in correspondentes:
+                    self.coordenadas.setdefault(p, self.coordenadas[no])
+            for p in correspondentes:
+                self._acesso(p, no, p, CUSTO_MINIMO)
+            if not correspondentes and no in self.coordenadas:
+                sem_nome_correspondente.append(no)
+
+        pontos_com_coordenadas = [p for p in pontos_de_passagem if p in self.coordenadas]
+        for no in sem_nome_correspondente:
+            self._ligar_mais_proximos(no, *self.coordenadas[no], pontos_com_coordenadas, abrigo=True)
+
+        # Comunidades: ligadas aos pontos de passagem com coordenadas mais próximos
+        for comunidade in df_comunidades.itertuples(index=False):
+            comunidade_id, nome = comunidade[0], comunidade[1]
+            no = self._no(f"comunidade:{comunidade_id}", nome)
+            self.origens[comunidade_id] = no
+            lat, lon = getattr(comunidade, 'Latitude', np.nan), getattr(comunidade, 'Longitude', np.nan)
+            if pd.notna(lat) and pd.notna(lon):
+                self.coordenadas[no] = (float(lat), float(lon))
+                self._ligar_mais_proximos(no, float(lat), float(lon), pontos_com_coordenadas)
+
+    # --- Custos ---
+    def _custo_base(self, trecho):
+        i, j = trecho
+        tempos = [self.tempos_mobilidade[n] for n in trecho if n in self.tempos_mobilidade]
+        if tempos:
+            return sum(tempos) / len(tempos)
+        if i in self.coordenadas and j in self.coordenadas:
+            return distancia_km(*self.coordenadas[i], *self.coordenadas[j]) / VELOCIDADE_ROTA_KMH * 60
+        return CUSTO_PADRAO_MINUTOS
+
+    def _ponto_aberto(self, ponto):
+        return any(self.rotas[rota_id]['status'] not in STATUS_ROTA_FECHADOS
+                   for trecho in self._trechos_por_no.get(ponto, ()) for rota_id in self._rotas_por_trecho[trecho])
+
+    def _custo_aresta(self, aresta):
+        """
+        Custo atual da aresta: o acesso (se o ponto de passagem tem alguma rota aberta), ou o menor
+        custo entre as rotas abertas que passam pelo trecho; None se nenhum.
+        """
+        if aresta in self._acessos:
+            return self._acessos[aresta] if self._ponto_aberto(self._ponto_do_acesso[aresta]) else None
+        custos = [
+            self._custo_base(aresta) * self.rotas[rota_id]['fator']
+            for rota_id in self._rotas_por_trecho.get(aresta, ())
+            if self.rotas[rota_id]['status'] not in STATUS_ROTA_FECHADOS
+        ]
+        return max(min(custos), CUSTO_MINIMO) if custos else None
+
+    def _matriz(self):
+        """Grafo reverso (arestas para -> de), para o Dijkstra partir de cada abrigo."""
+        n = len(self.rotulos)
+        if not self._custos:
+            return csr_matrix((n, n))
+        arestas = np.array(list(self._custos), dtype=np.int32)
+        custos = np.fromiter(self._custos.values(), dtype=np.float64, count=len(self._custos))
+        # Trechos valem nos dois sentidos; acessos só no sentido da evacuação
+        trecho = np.array([aresta not in self._acessos for aresta in self._custos])
+        linhas = np.concatenate([arestas[:, 1], arestas[trecho, 0]])
+        colunas = np.concatenate([arestas[:, 0], arestas[trecho, 1]])
+        return csr_matrix((np.concatenate([custos, custos[trecho]]), (linhas, colunas)), shape=(n, n))
+
+    # --- Árvores de caminhos mínimos ---
+    def _recalcular(self, linhas):
+        if not linhas:
+            return
+        inicio = time.perf_counter()
+        fontes = [self.destinos[self._ordem_abrigos[linha]] for linha in linhas]
+        distancias, predecessores = dijkstra(self._matriz(), directed=True, indices=fontes, return_predecessors=True)
+        for posicao, linha in enumerate(linhas):
+            self.distancias[linha] = distancias[posicao]
+            self.predecessores[linha] = predecessores[posicao]
+            # No grafo reverso o predecessor é o próximo nó rumo ao abrigo: arestas (nó, próximo)
+            nos = np.nonzero(predecessores[posicao] >= 0)[0]
+            self._arestas_arvore[linha] = set(zip(nos.tolist(), predecessores[posicao][nos].tolist()))
+        self.recalculos_arvores += len(linhas)
+        self.ultimo_recalculo_ms = (time.perf_counter() - inicio) * 1000
+
+    def recalcular_tudo(self):
+        with self._lock:
+            todas = set(self._acessos) | set(self._rotas_por_trecho)
+            self._custos = {a: c for a in todas if (c := self._custo_aresta(a)) is not None}
+            self._recalcular(list(range(len(self._ordem_abrigos))))
+
+    def _aplicar(self, arestas):
+        """Atualiza o custo das arestas e recalcula só as árvores afetadas. Retorna os abrigos recalculados."""
+        afetadas = set()
+        for aresta in set(arestas):
+            antigo, novo = self._custos.get(aresta), self._custo_aresta(aresta)
+            if antigo == novo:
+                continue
+            if novo is None:
+                del self._custos[aresta]
+            else:
+                self._custos[aresta] = novo
+            i, j = aresta
+            sentidos = [(i, j)] if aresta in self._acessos else [(i, j), (j, i)]
+            if novo is None or (antigo is not None and novo > antigo):
+                afetadas.update(linha for linha, arvore in enumerate(self._arestas_arvore)
+                                if any(sentido in arvore for sentido in sentidos))
+            else:
+                encurta = np.zeros(len(self._ordem_abrigos), dtype=bool)
+                for de, para in sentidos:
+                    encurta |= self.distancias[:, para] + novo < self.distancias[:, de]
+                afetadas.update(np.nonzero(encurta)[0].tolist())
+        linhas = sorted(afetadas)
+        self._recalcular(linhas)
+        return [self._ordem_abrigos[linha] for linha in linhas]
+
+    def alterar_status_rota(self, rota_id, status):
+        """Aplica a mudança de STATUS_ROTA de uma rota; retorna os abrigos cujas árvores foram recalculadas."""
+        with self._lock:
+            rota = self.rotas.get(rota_id)
+            if rota is None or rota['status'] == status:
+                return []
+            rota['status'] = status
+            # Os acessos dos pontos da rota dependem de haver alguma rota aberta no ponto
+            acessos = [a for trecho in rota['trechos'] for no in trecho for a in self._acessos_por_ponto.get(no, ())]
+            return self._aplicar(rota['trechos'] + acessos)
+
+    def atualizar_tempo_mobilidade(self, localizacao, minutos):
+        """Aplica um novo TEMPO_VIAGEM_ESTIMADO num ponto de passagem; retorna os abrigos recalculados."""
+        with self._lock:
+            no = self._indices.get("ponto:" + normalizar_ponto(localizacao))
+            if no is None or self.tempos_mobilidade.get(no) == minutos:
+                return []
+            self.tempos_mobilidade[no] = float(minutos)
+            return self._aplicar(self._trechos_por_no.get(no, ()))
+
+    # --- Consultas ---
+    def caminho(self, comunidade_id, abrigo_id):
+        """Pontos do caminho mínimo da comunidade até o abrigo (lista vazia se não houver caminho)."""
+        with self._lock:
+            linha, no = self._linha_abrigo.get(abrigo_id), self.origens.get(comunidade_id)
+            if linha is None or no is None or not np.isfinite(self.distancias[linha, no]):
+                return []
+            pontos = [self.rotulos[no]]
+            while self.predecessores[linha, no] >= 0:
+                no = self.predecessores[linha, no]
+                pontos.append(self.rotulos[no])
+            return pontos
+
+    def matriz_custos(self):
+        """Tempo estimado (min) de cada comunidade (linhas) até cada abrigo (colunas); inf quando não há caminho."""
+        with self._lock:
+            colunas = [self.origens[c] for c in self.origens]
+            return pd.DataFrame(self.distancias[:, colunas].T, index=list(self.origens), columns=self._ordem_abrigos)
+
+    def custos_ate_abrigos(self, comunidade_id):
+        """Abrigos alcançáveis a partir da comunidade, do mais rápido ao mais lento, com o caminho."""
+        no = self.origens.get(comunidade_id)
+        if no is None:
+            return pd.DataFrame(columns=['ID Abrigo', 'Abrigo', 'Tempo Estimado (min)', 'Caminho'])
+        linhas = [
+            {
+                'ID Abrigo': abrigo_id,
+                'Abrigo': self.rotulos[self.destinos[abrigo_id]],
+                'Tempo Estimado (min)': round(float(self.distancias[linha, no]), 1),
+                'Caminho': " → ".join(self.caminho(comunidade_id, abrigo_id)),
+            }
+            for linha, abrigo_id in enumerate(self._ordem_abrigos)
+            if np.isfinite(self.distancias[linha, no])
+        ]
+        return pd.DataFrame(linhas, columns=['ID Abrigo', 'Abrigo', 'Tempo Estimado (min)', 'Caminho']).sort_values('Tempo Estimado (min)', ignore_index=True)
+
+
+def _assinatura_topologia(df_rotas, df_mobilidade, df_comunidades, df_abrigos):
+    """O que muda a forma do grafo (pontos, ligações, coordenadas); status e tempos de viagem ficam de fora."""
+    def linhas(df, colunas):
+        colunas = [c for c in colunas if c in df.columns]
+        return tuple(map(tuple, df[colunas].astype(str).to_numpy())) if not df.empty else ()
+    return (
+        linhas(df_rotas, ['ID', 'Pontos Chave', 'Risco Associado']),
+        linhas(df_mobilidade, ['Localização Geo', 'Latitude', 'Longitude']),
+        linhas(df_comunidades, ['ID', 'Latitude', 'Longitude']),
+        linhas(df_abrigos, ['ID', 'Nome do Abrigo', 'Latitude', 'Longitude']),
+    )
+
+_grafo = None
+_assinatura = None
+_lock_grafo = threading.Lock()
+
+def obter_grafo_evacuacao(df_rotas, df_mobilidade, df_comunidades, df_abrigos):
+    """
+    Grafo compartilhado pelo processo. Se só status de rotas ou tempos de viagem mudaram desde a última
+    chamada, aplica as mudanças de forma incremental; se a topologia mudou, o grafo é remontado.
+    """
+    global _grafo, _assinatura
+    with _lock_grafo:
+        assinatura = _assinatura_topologia(df_rotas, df_mobilidade, df_comunidades, df_abrigos)
+        if _grafo is None or assinatura != _assinatura:
+            _grafo = GrafoEvacuacao(df_rotas, df_mobilidade, df_comunidades, df_abrigos)
+            _assinatura = assinatura
+            return _grafo
+        for rota_id, status in zip(df_rotas['ID'], df_rotas['Status']):
+            _grafo.alterar_status_rota(rota_id, status)
+        if not df_mobilidade.empty:
+            descricoes = extrair_descricao(df_mobilidade['Localização Geo']).fillna('')
+            for descricao, tempo in zip(descricoes, df_mobilidade['Tempo Viagem Est.']):
+                if pd.notna(tempo):
+                    _grafo.atualizar_tempo_mobilidade(descricao, float(tempo))
+        return _grafo
@@ -0,0 +1,247 @@
+"""
+Serviço contínuo de monitoramento ambiental.
+
+Coleta a leitura de todos os sensores cadastrados numa cadência fixa, grava as
+leituras em lote e mantém um alerta por sensor (aberto, atualizado e resolvido pelo
+motor de alertas, src/motor_alertas.py), além dos alertas preditivos pela taxa de
+subida do nível (src/alerta_antecipado.py), sem depender de alguém estar com a
+página do Streamlit aberta.
+
+Uso (a partir da raiz do projeto):
+    python -m src.servico_monitoramento --intervalo 10
+"""
+import argparse
+import datetime
+import logging
+import threading
+import time
+
+from src.flood_monitoring import unidade_do_sensor, obter_sensores_cadastrados
+from src.alerta_antecipado import AlertaAntecipado, HORIZONTE_PADRAO_H
+from src.armazem_leituras import ArmazemLeituras
+from src.classificacao_alertas import NIVEIS_ALERTA
+from src.deteccao_anomalias import DetectorAnomalias
+from src.despacho_alertas import DespachanteAlertas, destinos_do_ambiente
+from src.ingestao_leituras import IngestorLeituras
+from src.simulacao_sensores import LeitorSimulado
+from src.motor_alertas import (
+    MotorAlertas,
+    ABERTO,
+    ESCALADO,
+    RESOLVIDO,
+    HISTERESE_PADRAO,
+    PERMANENCIA_DESCIDA_PADRAO,
+    PERMANENCIA_RESOLUCAO_PADRAO,
+)
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_LEITURA_PADRAO = 10.0     # segundos entre ciclos de leitura
+INTERVALO_SENSORES_PADRAO = 60.0    # segundos entre recargas da lista de sensores
+
+
+class ServicoMonitoramento:
+    """
+    Agendador próprio do monitoramento: a cada `intervalo_leitura` segundos lê todos
+    os sensores pelo `leitor` (por padrão, a rede simulada contínua de LeitorSimulado),
+    envia as leituras ao IngestorLeituras e passa o ciclo ao DetectorAnomalias; só as
+    leituras aceitas chegam ao MotorAlertas, que abre, atualiza e resolve os alertas de
+    cada sensor, e ao AlertaAntecipado, que projeta o nível pela taxa de subida e abre
+    alertas preditivos. Com um DespachanteAlertas, cada transição também é notificada aos
+    destinos externos, sem esperar pela entrega.
+    """
+
+    def __init__(self, intervalo_leitura=INTERVALO_LEITURA_PADRAO, intervalo_sensores=INTERVALO_SENSORES_PADRAO,
+                 leitor=None, ingestor=None, motor_alertas=None, detector=None, armazem=None, antecipado=None,
+                 despachante=None):
+        self.intervalo_leitura = intervalo_leitura
+        self.intervalo_sensores = intervalo_sensores
+        self.leitor = leitor or LeitorSimulado(passo_s=intervalo_leitura)
+        self.ingestor = ingestor or IngestorLeituras(intervalo_flush=intervalo_leitura)
+        self.motor_alertas = motor_alertas or MotorAlertas()
+        self.detector = detector or DetectorAnomalias()
+        self.antecipado = antecipado or AlertaAntecipado()
+        self.despachante = despachante
+        # Últimas leituras de cada sensor em memória, alimentadas a cada ciclo
+        self.armazem = armazem or ArmazemLeituras()
+        self._sensores = []
+        self._sensores_carregados_em = 0.0
+        self._parar = threading.Event()
+        self._thread = None
+        self.ciclos = 0
+        self.ultimo_ciclo = None
+        self.duracao_ultimo_ciclo = 0.0
+
+    def _sensores_atuais(self):
+        if time.monotonic() - self._sensores_carregados_em >= self.intervalo_sensores or not self._sensores:
+            sensores = obter_sensores_cadastrados()
+            if sensores:
+                self._sensores = sensores
+            self._sensores_carregados_em = time.monotonic()
+        return self._sensores
+
+    def _filtrar_anomalias(self, lidos, timestamp):
+        """Leituras suspeitas (sensor travado, pico, fora da faixa) são gravadas, mas não geram alerta."""
+        aceitas, motivos = self.detector.avaliar(
+            [sensor_info['SENSOR_ID'] for sensor_info, _ in lidos],
+            [sensor_info['TIPO_SENSOR'] for sensor_info, _ in lidos],
+            [leitura for _, leitura in lidos],
+            [timestamp] * len(lidos),
+        )
+        for (sensor_info, leitura), motivo in zip(lidos, motivos):
+            if motivo:
+                logger.info("Leitura em quarentena (%s) do sensor %s: %s", motivo, sensor_info['SENSOR_ID'], leitura)
+        try:
+            self.detector.persistir()
+        except Exception:
+            logger.exception("Erro ao registrar a saúde dos sensores")
+        return [lido for lido, aceita in zip(lidos, aceitas) if aceita]
+
+    def _notificar(self, alerta, evento, sensor_id, nivel_anterior):
+        if self.despachante is not None:
+            self.despachante.enviar({**alerta, 'Evento': evento, 'ID Sensor': sensor_id,
+                                     'Nível Anterior': NIVEIS_ALERTA[nivel_anterior]})
+
+    def _processar_alertas(self, lidos, timestamp):
+        transicoes = self.motor_alertas.processar(lidos, timestamp)
+        try:
+            self.motor_alertas.gravar()
+        except Exception:
+            logger.exception("Erro ao gravar as transições de alerta; nova tentativa no próximo ciclo")
+        for transicao in transicoes:
+            alerta = transicao.alerta()
+            self._notificar(alerta, transicao.evento, transicao.estado.sensor_id, transicao.nivel_anterior)
+            if transicao.evento in (ABERTO, ESCALADO):
+                logger.warning("ALERTA %s %s - %s: %s", transicao.evento, alerta['Nível'], alerta['Tipo'], alerta['Localização'])
+            else:
+                nivel = 'SEGURO' if transicao.evento == RESOLVIDO else alerta['Nível']
+                logger.info("Alerta %s para %s - %s: %s", transicao.evento, nivel, alerta['Tipo'], alerta['Localização'])
+
+    def _processar_previsoes(self, lidos, timestamp):
+        previsoes = self.antecipado.processar(lidos, timestamp)
+        try:
+            self.antecipado.gravar()
+        except Exception:
+            logger.exception("Erro ao gravar os alertas preditivos; nova tentativa no próximo ciclo")
+        for previsao in previsoes:
+            alerta = previsao.alerta()
+            self._notificar(alerta, previsao.evento, previsao.sensor_id, previsao.nivel_anterior)
+            if previsao.evento == RESOLVIDO:
+                logger.info("Previsão %s encerrada: %s", alerta['Nível'], alerta['Localização'])
+            else:
+                logger.warning("PREVISÃO %s %s em ~%.0f min (%.2f m/h): %s", previsao.evento, alerta['Nível'],
+                               previsao.horas_ate_limiar * 60, previsao.taxa, alerta['Localização'])
+
+    def executar_ciclo(self):
+        """Lê todos os sensores uma vez, grava as leituras e atualiza os alertas do ciclo num único lote."""
+        inicio = time.perf_counter()
+        sensores = self._sensores_atuais()
+        timestamp = datetime.datetime.now()
+        leituras = self.leitor(sensores)
+        lidos = [(sensor_info, leitura) for sensor_info, leitura in zip(sensores, leituras) if leitura is not None]
+        for sensor_info, leitura in lidos:
+            self.ingestor.adicionar(sensor_info['SENSOR_ID'], leitura, unidade_do_sensor(sensor_info['TIPO_SENSOR']), timestamp)
+        self.armazem.adicionar_lote([sensor_info['SENSOR_ID'] for sensor_info, _ in lidos], [leitura for _, leitura in lidos], [timestamp] * len(lidos))
+        aceitos = self._filtrar_anomalias(lidos, timestamp)
+        self._processar_alertas(aceitos, timestamp)
+        self._processar_previsoes(aceitos, timestamp)
+        self.ingestor.flush()
+        self.ciclos += 1
+        self.ultimo_ciclo = timestamp
+        self.duracao_ultimo_ciclo = time.perf_counter() - inicio
+        return len(leituras)
+
+    def _loop(self):
+        proximo = time.monotonic()
+        while not self._parar.is_set():
+            try:
+                n = self.executar_ciclo()
+                logger.info("Ciclo %d: %d sensores lidos em %.3fs", self.ciclos, n, self.duracao_ultimo_ciclo)
+            except Exception:
+                logger.exception("Falha no ciclo de monitoramento")
+            # Cadência fixa: o próximo ciclo não atrasa pelo tempo gasto no anterior
+            proximo += self.intervalo_leitura
+            self._parar.wait(max(0.0, proximo - time.monotonic()))
+
+    def iniciar(self):
+        """Inicia o agendador numa thread de fundo."""
+        if self._thread is None or not self._thread.is_alive():
+            try:
+                carregados = self.motor_alertas.carregar_ativos()
+                logger.info("%d alertas ativos recuperados do banco", carregados)
+            except Exception:
+                logger.exception("Não foi possível recuperar os alertas ativos; o estado começa vazio")
+            try:
+                logger.info("%d alertas preditivos ativos recuperados do banco", self.antecipado.carregar_ativos())
+            except Exception:
+                logger.exception("Não foi possível recuperar os alertas preditivos ativos")
+            try:
+                logger.info("%d sensores em manutenção por falha recuperados do banco", self.detector.carregar_manutencao())
+            except Exception:
+                logger.exception("Não foi possível recuperar os sensores em manutenção")
+            if self.despachante is not None:
+                self.despachante.iniciar()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="servico-monitoramento", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        """Interrompe o agendador e grava as leituras pendentes."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.ingestor.flush()
+        if self.despachante is not None:
+            self.despachante.parar()
+
+    def executando(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        return {
+            "executando": self.executando(),
+            "ciclos": self.ciclos,
+            "ultimo_ciclo": self.ultimo_ciclo,
+            "duracao_ultimo_ciclo_s": round(self.duracao_ultimo_ciclo, 3),
+            "sensores": len(self._sensores),
+            "ingestao": self.ingestor.estatisticas(),
+            "alertas": self.motor_alertas.estatisticas(),
+            "anomalias": self.detector.estatisticas(),
+            "alerta_antecipado": self.antecipado.estatisticas(),
+            "armazem": self.armazem.estatisticas(),
+            "notificacoes": self.despachante.estatisticas() if self.despachante is not None else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço contínuo de monitoramento ambiental.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_LEITURA_PADRAO, help="Segundos entre ciclos de leitura.")
+    parser.add_argument("--intervalo-sensores", type=float, default=INTERVALO_SENSORES_PADRAO, help="Segundos entre recargas da lista de sensores.")
+    parser.add_argument("--histerese", type=float, default=HISTERESE_PADRAO, help="Fração abaixo do limiar exigida para reduzir o nível.")
+    parser.add_argument("--permanencia-descida", type=float, default=PERMANENCIA_DESCIDA_PADRAO, help="Segundos abaixo do nível antes de reduzi-lo.")
+    parser.add_argument("--permanencia-resolucao", type=float, default=PERMANENCIA_RESOLUCAO_PADRAO, help="Segundos em SEGURO antes de resolver o alerta.")
+    parser.add_argument("--horizonte", type=float, default=HORIZONTE_PADRAO_H, help="Horas à frente na projeção do nível de água.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    motor = MotorAlertas(args.histerese, permanencia_descida=args.permanencia_descida, permanencia_resolucao=args.permanencia_resolucao)
+    antecipado = AlertaAntecipado(horizonte_h=args.horizonte)
+    destinos = destinos_do_ambiente()
+    despachante = DespachanteAlertas(destinos) if destinos else None
+    if despachante is not None:
+        logger.info("Notificações de alerta para: %s", ", ".join(destino.nome for destino in destinos))
+    servico = ServicoMonitoramento(args.intervalo, args.intervalo_sensores, motor_alertas=motor,
+                                   antecipado=antecipado, despachante=despachante).iniciar()
+    logger.info("Serviço de monitoramento iniciado (ciclo de %.1fs). Ctrl+C para encerrar.", args.intervalo)
+    try:
+        while servico.executando():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Encerrando serviço de monitoramento...")
+    finally:
+        servico.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Servidor de ingestão de leituras para gateways de campo (asyncio, só biblioteca padrão).
+
+Protocolos:
+- HTTP: POST /leituras com um lote por requisição, em texto (uma leitura por linha,
+  "sensor_id,valor[,timestamp]", timestamp em segundos Unix ou ISO 8601) ou JSON
+  (Content-Type: application/json, lista de {"sensor_id", "valor", "timestamp"}).
+  Responde 202 com as contagens de aceitas/rejeitadas. GET /saude devolve as estatísticas.
+- UDP: um lote por datagrama, no mesmo formato texto ou no formato binário compacto
+  CABECALHO_BINARIO + registros FORMATO_REGISTRO (sensor_id uint32, timestamp float64, valor float64).
+
+As leituras são validadas contra SENSORES_AMBIENTAIS (sensor existente e não INATIVO, valor finito,
+timestamp plausível) e entram numa fila limitada. Uma tarefa de gravação junta os lotes e os
+entrega ao IngestorLeituras (COPY em lote). Com a fila cheia, o HTTP espera até `espera_fila`
+segundos e responde 503 com Retry-After; o UDP descarta o datagrama e conta a perda.
+O gravador também para de consumir a fila enquanto o ingestor acumula leituras sem conseguir
+gravar, de modo que a lentidão do banco chega aos gateways como 503.
+
+Uso (a partir da raiz do projeto):
+    python -m src.servidor_ingestao --porta-http 8080 --porta-udp 9999
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.bd_conection import conexao_postgres
+from src.flood_monitoring import unidade_do_sensor
+from src.armazem_leituras import ArmazemLeituras
+from src.ingestao_leituras import IngestorLeituras
+
+logger = logging.getLogger(__name__)
+
+CABECALHO_BINARIO = b'LS\x01'
+FORMATO_REGISTRO = struct.Struct('<Idd')
+
+TAMANHO_FILA_PADRAO = 1000             # lotes
+ESPERA_FILA_PADRAO = 2.0               # segundos que o HTTP espera por espaço na fila
+MAX_CORPO_BYTES = 8 * 1024 * 1024
+TOLERANCIA_FUTURO = datetime.timedelta(minutes=5)
+ATRASO_MAXIMO = datetime.timedelta(days=7)
+INTERVALO_SENSORES = 60.0
+
+
+class LoteInvalido(ValueError):
+    pass
+
+
+def decodificar_texto(corpo):
+    """Linhas "sensor_id,valor[,timestamp]" -> (ids, valores, timestamps em segundos Unix ou NaN)."""
+    try:
+        conteudo = corpo.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise LoteInvalido(f"texto não é UTF-8 válido: {e}") from None
+    ids, valores, timestamps = [], [], []
+    for numero, linha in enumerate(conteudo.splitlines(), start=1):
+        linha = linha.strip()
+        if not linha or linha.startswith('#'):
+            continue
+        partes = linha.split(',')
+        if len(partes) not in (2, 3):
+            raise LoteInvalido(f"linha {numero}: esperado sensor_id,valor[,timestamp]")
+        try:
+            ids.append(int(partes[0]))
+            valores.append(float(partes[1]))
+            if len(partes) == 3 and partes[2].strip():
+                texto = partes[2].strip()
+                try:
+                    timestamps.append(float(texto))
+                except ValueError:
+                    timestamps.append(datetime.datetime.fromisoformat(texto).timestamp())
+            else:
+                timestamps.append(np.nan)
+        except ValueError as e:
+            raise LoteInvalido(f"linha {numero}: {e}") from None
+    return np.array(ids, dtype=np.int64), np.array(valores, dtype=np.float64), np.array(timestamps, dtype=np.float64)
+
+def decodificar_json(corpo):
+    try:
+        registros = json.loads(corpo)
+        df = pd.DataFrame.from_records(registros, columns=['sensor_id', 'valor', 'timestamp'])
+        timestamps = df['timestamp'].map(
+            lambda t: np.nan if t is None else t if isinstance(t, (int, float)) else datetime.datetime.fromisoformat(t).timestamp()
+        )
+        return df['sensor_id'].astype(np.int64).to_numpy(), df['valor'].astype(np.float64).to_numpy(), timestamps.astype(np.float64).to_numpy()
+    except (ValueError, TypeError, KeyError) as e:
+        raise LoteInvalido(f"JSON inválido: {e}") from None
+
+def decodificar_binario(corpo):
+    dados = corpo[len(CABECALHO_BINARIO):]
+    if len(dados) % FORMATO_REGISTRO.size:
+        raise LoteInvalido("datagrama binário com tamanho inválido")
+    registros = np.frombuffer(dados, dtype=np.dtype([('id', '<u4'), ('ts', '<f8'), ('valor', '<f8')]))
+    return registros['id'].astype(np.int64), registros['valor'].copy(), registros['ts'].copy()
+
+def codificar_binario(ids, valores, timestamps):
+    """Monta um datagrama binário (usado pelo cliente de teste e por gateways em Python)."""
+    registros = np.empty(len(ids), dtype=np.dtype([('id', '<u4'), ('ts', '<f8'), ('valor', '<f8')]))
+    registros['id'], registros['ts'], registros['valor'] = ids, timestamps, valores
+    return CABECALHO_BINARIO + registros.tobytes()
+
+
+class ServidorIngestao:
+    """Recebe lotes por HTTP/UDP, valida e entrega ao IngestorLeituras com fila limitada."""
+
+    def __init__(self, ingestor=None, tamanho_fila=TAMANHO_FILA_PADRAO, espera_fila=ESPERA_FILA_PADRAO, consumidores=()):
+        self.ingestor = ingestor or IngestorLeituras()
+        self.espera_fila = espera_fila
+        # Chamados com cada lote gravado (sensor_ids, valores, unidades, timestamps), na thread do gravador
+        self.consumidores = list(consumidores)
+        self._fila = asyncio.Queue(maxsize=tamanho_fila)
+        self._unidades = pd.Series(dtype=object)
+        self._tarefas = []
+        self._servidores = []
+        self.estatisticas_recepcao = {'lotes': 0, 'aceitas': 0, 'rejeitadas': 0, 'lotes_invalidos': 0,
+                                     'recusadas_fila_cheia': 0, 'datagramas_descartados': 0}
+
+    # --- Validação ---
+    def _carregar_sensores(self):
+        with conexao_postgres() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT SENSOR_ID, TIPO_SENSOR FROM SENSORES_AMBIENTAIS WHERE STATUS_OPERACIONAL <> 'INATIVO'")
+                linhas = cursor.fetchall()
+        return pd.Series({sensor_id: unidade_do_sensor(tipo) for sensor_id, tipo in linhas}, dtype=object)
+
+    async def _atualizar_sensores(self):
+        while True:
+            await asyncio.sleep(INTERVALO_SENSORES)
+            try:
+                self._unidades = await asyncio.get_running_loop().run_in_executor(None, self._carregar_sensores)
+            except Exception:
+                logger.exception("Não foi possível recarregar os sensores; mantendo a lista anterior")
+
+    def validar(self, ids, valores, timestamps):
+        """Filtra o lote; retorna ((ids, valores, unidades, timestamps) aceitos, quantidade rejeitada)."""
+        agora = time.time()
+        timestamps = np.where(np.isnan(timestamps), agora, timestamps)
+        unidades = pd.Series(ids).map(self._unidades).to_numpy()
+        validas = (
+            pd.notna(unidades)
+            & np.isfinite(valores)
+            & (timestamps <= agora + TOLERANCIA_FUTURO.total_seconds())
+            & (timestamps >= agora - ATRASO_MAXIMO.total_seconds())
+        )
+        momentos = (timestamps[validas] * 1e6).astype('int64').astype('datetime64[us]')
+        # Leituras sem fuso são gravadas no horário local, como o restante do sistema
+        momentos = momentos + np.timedelta64(int(datetime.datetime.now().astimezone().utcoffset().total_seconds()), 's')
+        return (ids[validas], valores[validas], unidades[validas], momentos), int((~validas).sum())
+
+    # --- Recepção ---
+    def _receber(self, decodificado):
+        aceito, rejeitadas = self.validar(*decodificado)
+        self.estatisticas_recepcao['lotes'] += 1
+        self.estatisticas_recepcao['rejeitadas'] += rejeitadas
+        return aceito, rejeitadas
+
+    async def receber_http(self, corpo, tipo_conteudo):
+        """Processa o corpo de um POST /leituras; retorna (status HTTP, resposta)."""
+        try:
+            decodificado = decodificar_json(corpo) if 'json' in tipo_conteudo else decodificar_texto(corpo)
+        except LoteInvalido as e:
+            self.estatisticas_recepcao['lotes_invalidos'] += 1
+            return 400, {'erro': str(e)}
+        aceito, rejeitadas = self._receber(decodificado)
+        if len(aceito[0]):
+            try:
+                await asyncio.wait_for(self._fila.put(aceito), timeout=self.espera_fila)
+            except asyncio.TimeoutError:
+                self.estatisticas_recepcao['recusadas_fila_cheia'] += len(aceito[0])
+                return 503, {'erro': 'fila de ingestão cheia, tente novamente'}
+        self.estatisticas_recepcao['aceitas'] += len(aceito[0])
+        return 202, {'aceitas': len(aceito[0]), 'rejeitadas': rejeitadas}
+
+    def receber_datagrama(self, dados):
+        try:
+            decodificado = decodificar_binario(dados) if dados.startswith(CABECALHO_BINARIO) else decodificar_texto(dados)
+        except LoteInvalido:
+            self.estatisticas_recepcao['lotes_invalidos'] += 1
+            return
+        aceito, _ = self._receber(decodificado)
+        if not len(aceito[0]):
+            return
+        try:
+            self._fila.put_nowait(aceito)
+            self.estatisticas_recepcao['aceitas'] += len(aceito[0])
+        except asyncio.QueueFull:
+            self.estatisticas_recepcao['datagramas_descartados'] += 1
+
+    async def _tratar_conexao_http(self, reader, writer):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length', 0))
+                if tamanho > MAX_CORPO_BYTES:
+                    await self._responder(writer, 413, {'erro': 'lote grande demais'}, manter=False)
+                    break
+                corpo = await reader.readexactly(tamanho) if tamanho else b''
+
+                if metodo == 'POST' and caminho.rstrip('/') == '/leituras':
+                    status, resposta = await self.receber_http(corpo, cabecalhos.get('content-type', ''))
+                elif metodo == 'GET' and caminho.rstrip('/') == '/saude':
+                    status, resposta = 200, self.estatisticas()
+                else:
+                    status, resposta = 404, {'erro': 'rota não encontrada'}
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                await self._responder(writer, status, resposta, manter)
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _responder(writer, status, resposta, manter=True):
+        motivos = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+        corpo = json.dumps(resposta, default=str).encode('utf-8')
+        cabecalhos = [f"HTTP/1.1 {status} {motivos[status]}", "Content-Type: application/json",
+                      f"Content-Length: {len(corpo)}", f"Connection: {'keep-alive' if manter else 'close'}"]
+        if status == 503:
+            cabecalhos.append("Retry-After: 1")
+        writer.write(("\r\n".join(cabecalhos) + "\r\n\r\n").encode('latin-1') + corpo)
+        await writer.drain()
+
+    # --- Gravação ---
+    def _entregar(self, lotes):
+        lote = tuple(np.concatenate(partes) for partes in zip(*lotes))
+        self.ingestor.adicionar_lote(lote)
+        for consumidor in self.consumidores:
+            try:
+                consumidor(lote)
+            except Exception:
+                logger.exception("Erro no consumidor de leituras %r", consumidor)
+
+    async def _gravador(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Banco lento ou fora do ar: segura a fila para que a pressão chegue aos gateways
+            while self.ingestor.pendentes() >= self.ingestor.max_pendentes // 2:
+                await asyncio.sleep(0.1)
+            lotes = [await self._fila.get()]
+            linhas = len(lotes[0][0])
+            while linhas < self.ingestor.tamanho_lote and not self._fila.empty():
+                lotes.append(self._fila.get_nowait())
+                linhas += len(lotes[-1][0])
+            try:
+                await loop.run_in_executor(None, self._entregar, lotes)
+            except Exception:
+                logger.exception("Erro ao entregar %d leituras ao ingestor", linhas)
+            finally:
+                for _ in lotes:
+                    self._fila.task_done()
+
+    # --- Ciclo de vida ---
+    async def iniciar(self, host='0.0.0.0', porta_http=8080, porta_udp=None):
+        loop = asyncio.get_running_loop()
+        # A primeira carga acontece antes de abrir as portas: sem ela todo lote seria aceito com 202
+        # e todas as leituras rejeitadas. Uma falha aqui interrompe a inicialização.
+        self._unidades = await loop.run_in_executor(None, self._carregar_sensores)
+        self.ingestor.iniciar()
+        self._tarefas = [asyncio.create_task(self._atualizar_sensores()), asyncio.create_task(self._gravador())]
+        if porta_http:
+            self._servidores.append(await asyncio.start_server(self._tratar_conexao_http, host, porta_http))
+        if porta_udp:
+            servidor = self
+
+            class _ProtocoloUDP(asyncio.DatagramProtocol):
+                def datagram_received(self, dados, endereco):
+                    servidor.receber_datagrama(dados)
+
+            transporte, _ = await loop.create_datagram_endpoint(_ProtocoloUDP, local_addr=(host, porta_udp))
+            self._servidores.append(transporte)
+        logger.info("Servidor de ingestão em %s (HTTP %s, UDP %s)", host, porta_http, porta_udp)
+        return self
+
+    async def parar(self):
+        """Espera a fila esvaziar, encerra os servidores e grava o que restou."""
+        for servidor in self._servidores:
+            servidor.close()
+        await self._fila.join()
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, self.ingestor.parar)
+
+    def estatisticas(self):
+        return {
+            **self.estatisticas_recepcao,
+            'fila_lotes': self._fila.qsize(),
+            'sensores_validos': len(self._unidades),
+            'ingestao': self.ingestor.estatisticas(),
+            'consumidores': [c.estatisticas() for c in self.consumidores if hasattr(c, 'estatisticas')],
+        }
+
+
+async def _executar(args):
+    servidor = ServidorIngestao(tamanho_fila=args.fila, consumidores=[ArmazemLeituras()])
+    await servidor.iniciar(args.host, args.porta_http, args.porta_udp)
+    try:
+        while True:
+            await asyncio.sleep(30)
+            logger.info("Ingestão: %s", servidor.estatisticas())
+    finally:
+        await servidor.parar()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de ingestão de leituras (HTTP/UDP) para gateways de campo.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--porta-http", type=int, default=8080, help="0 desativa o HTTP.")
+    parser.add_argument("--porta-udp", type=int, default=9999, help="0 desativa o UDP.")
+    parser.add_argument("--fila", type=int, default=TAMANHO_FILA_PADRAO, help="Máximo de lotes aguardando gravação.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(_executar(args))
+    except KeyboardInterrupt:
+        logger.info("Servidor de ingestão encerrado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Rede de sensores sintética para testes de carga e de longa duração.
+
+Todos os sensores avançam juntos, um passo de tempo por chamada, com operações NumPy sobre arrays
+(sem laço por sensor):
+- cada bacia tem uma chuva (mm/h) que alterna entre tempo seco e tempestades;
+- o nível de água de cada sensor sobe com a chuva da sua bacia, com defasagem própria, e
+  escoa de volta ao nível de base;
+- a umidade do solo responde à chuva e seca lentamente;
+- falhas injetadas: leituras perdidas (dropout), valor travado por vários passos e picos espúrios.
+
+`passo()` devolve os arrays (sensor_id, valor, unidade, timestamp) no formato aceito por
+`IngestorLeituras.adicionar_lote`, então a rede alimenta diretamente o caminho de ingestão.
+"""
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.flood_monitoring import unidade_do_sensor
+
+TIPOS_SIMULADOS = ('Nível de Água', 'Pluviômetro', 'Umidade do Solo')
+PROPORCAO_TIPOS_PADRAO = (0.4, 0.4, 0.2)
+
+
+@dataclass
+class TaxasFalha:
+    """Probabilidades por leitura (dropout, pico) e por passo (início de travamento)."""
+    dropout: float = 0.01
+    travamento: float = 0.0005
+    duracao_travamento: int = 60      # passos
+    pico: float = 0.002
+
+
+class RedeSensoresSimulada:
+    """Gera leituras correlacionadas de milhares de sensores a cada passo de `passo_s` segundos."""
+
+    def __init__(self, sensor_ids, tipos, n_bacias=None, passo_s=10.0, falhas=None, semente=None, inicio=None):
+        self.sensor_ids = np.asarray(sensor_ids)
+        self.tipos = np.asarray(tipos, dtype=object)
+        n = len(self.sensor_ids)
+        if len(self.tipos) != n:
+            raise ValueError("sensor_ids e tipos devem ter o mesmo tamanho.")
+        self.passo_s = float(passo_s)
+        self.falhas = falhas or TaxasFalha()
+        self._rng = np.random.default_rng(semente)
+        self.momento = inicio or datetime.datetime.now()
+        self.passos = 0
+
+        self.n_bacias = n_bacias or max(1, n // 50)
+        self.bacia = self._rng.integers(0, self.n_bacias, n)
+        self.unidades = np.array([unidade_do_sensor(t) for t in self.tipos], dtype=object)
+        self._nivel = self.tipos == 'Nível de Água'
+        self._pluvio = self.tipos == 'Pluviômetro'
+        self._umidade = self.tipos == 'Umidade do Solo'
+
+        # Chuva por bacia e histórico circular para a defasagem chuva -> nível
+        self.chuva = np.zeros(self.n_bacias)
+        self._tempestade = np.zeros(self.n_bacias, dtype=bool)
+        defasagem_max = int(np.ceil(6 * 3600 / self.passo_s))
+        self._historico_chuva = np.zeros((defasagem_max + 1, self.n_bacias))
+        self.defasagem = self._rng.integers(int(np.ceil(1800 / self.passo_s)), defasagem_max + 1, n)
+
+        # Estado físico por sensor
+        self.nivel_base = self._rng.uniform(1.0, 2.5, n)
+        self.resposta = self._rng.uniform(0.02, 0.06, n)       # m/h de subida por mm/h de chuva
+        self.escoamento = self._rng.uniform(0.05, 0.2, n)      # fração/h do excesso que escoa
+        self.valor = np.where(self._umidade, self._rng.uniform(20, 40, n), self.nivel_base)
+
+        self._travado_ate = np.full(n, -1, dtype=np.int64)
+        self._valor_travado = np.zeros(n)
+
+    @classmethod
+    def sintetica(cls, n_sensores, proporcao=PROPORCAO_TIPOS_PADRAO, id_inicial=1, **kwargs):
+        """Rede com `n_sensores` IDs sequenciais e tipos sorteados na `proporcao` de TIPOS_SIMULADOS."""
+        rng = np.random.default_rng(kwargs.get('semente'))
+        tipos = rng.choice(np.array(TIPOS_SIMULADOS, dtype=object), size=n_sensores, p=proporcao)
+        return cls(np.arange(id_inicial, id_inicial + n_sensores), tipos, **kwargs)
+
+    # --- Dinâmica ---
+    def _avancar_chuva(self):
+        horas = self.passo_s / 3600
+        # Tempestades começam ~1 vez a cada 2 dias por bacia e duram ~3 h
+        inicia = self._rng.random(self.n_bacias) < horas / 48
+        termina = self._rng.random(self.n_bacias) < horas / 3
+        self._tempestade = (self._tempestade | inicia) & ~(self._tempestade & termina)
+        alvo = np.where(self._tempestade, self._rng.gamma(2.0, 15.0, self.n_bacias), 0.0)
+        self.chuva = np.maximum(0.0, 0.8 * self.chuva + 0.2 * alvo)
+        self._historico_chuva[self.passos % len(self._historico_chuva)] = self.chuva
+
+    def _avancar_sensores(self):
+        horas = self.passo_s / 3600
+        n = len(self.sensor_ids)
+        linha = (self.passos - self.defasagem) % len(self._historico_chuva)
+        chuva_defasada = self._historico_chuva[linha, self.bacia]
+        chuva_local = self.chuva[self.bacia]
+
+        nivel = self.valor + horas * (self.resposta * chuva_defasada - self.escoamento * (self.valor - self.nivel_base))
+        umidade = np.clip(self.valor + horas * (0.8 * chuva_local * (100 - self.valor) / 100 - 0.5), 0, 100)
+        self.valor = np.where(self._nivel, nivel, np.where(self._umidade, umidade, self.valor))
+
+        ruido = self._rng.normal(0, 1, n)
+        leitura = np.select(
+            [self._nivel, self._pluvio, self._umidade],
+            [self.valor + 0.01 * ruido, np.maximum(0.0, chuva_local * (1 + 0.1 * ruido)), self.valor + 0.5 * ruido],
+            default=0.0,
+        )
+        return leitura
+
+    def _injetar_falhas(self, leitura):
+        n = len(leitura)
+        f = self.falhas
+        novos_travados = (self._travado_ate < self.passos) & (self._rng.random(n) < f.travamento)
+        self._valor_travado[novos_travados] = leitura[novos_travados]
+        self._travado_ate[novos_travados] = self.passos + f.duracao_travamento
+        travados = self._travado_ate >= self.passos
+        leitura = np.where(travados, self._valor_travado, leitura)
+
+        picos = self._rng.random(n) < f.pico
+        leitura = np.where(picos, leitura * self._rng.uniform(3, 10, n) + self._rng.uniform(5, 20, n), leitura)
+        leitura[self._rng.random(n) < f.dropout] = np.nan
+        return leitura
+
+    def passo(self):
+        """Avança um passo e devolve (sensor_ids, valores, unidades, timestamps), sem as leituras perdidas."""
+        self._avancar_chuva()
+        leitura = self._injetar_falhas(np.round(self._avancar_sensores(), 2))
+        presentes = ~np.isnan(leitura)
+        timestamps = np.full(int(presentes.sum()), np.datetime64(self.momento, 'us'))
+        lote = (self.sensor_ids[presentes], leitura[presentes], self.unidades[presentes], timestamps)
+        self.passos += 1
+        self.momento += datetime.timedelta(seconds=self.passo_s)
+        return lote
+
+    def gerar(self, n_passos):
+        """Iterador de `n_passos` lotes consecutivos."""
+        for _ in range(n_passos):
+            yield self.passo()
+
+
+class LeitorSimulado:
+    """
+    Fonte de leituras do serviço de monitoramento enquanto não há equipamentos reais: uma
+    RedeSensoresSimulada com os sensores cadastrados, avançada um passo por ciclo, de modo que as
+    leituras são contínuas no tempo (o nível sobe e escoa com a chuva da bacia) e passam pela
+    detecção de anomalias como leituras de campo passariam.
+
+    A rede é refeita quando o conjunto de sensores muda; os sensores que continuam mantêm o estado.
+    Tipos fora de TIPOS_SIMULADOS (ex.: Vento, Temperatura) não têm leitura: uma série constante
+    inventada seria marcada como travada pelo detector e levaria o sensor à manutenção.
+    """
+
+    def __init__(self, passo_s=10.0, falhas=None, semente=None):
+        self.passo_s = passo_s
+        self.falhas = falhas
+        self.semente = semente
+        self._rede = None
+
+    def _reconstruir(self, ids, tipos):
+        anterior = self._rede
+        rede = RedeSensoresSimulada(ids, tipos, passo_s=self.passo_s, falhas=self.falhas, semente=self.semente)
+        if anterior is not None:
+            posicoes = {sensor_id: i for i, sensor_id in enumerate(anterior.sensor_ids.tolist())}
+            novos, antigos = [], []
+            for i, (sensor_id, tipo) in enumerate(zip(ids.tolist(), tipos.tolist())):
+                j = posicoes.get(sensor_id)
+                if j is not None and anterior.tipos[j] == tipo:
+                    novos.append(i)
+                    antigos.append(j)
+            for campo in ('valor', 'nivel_base', 'resposta', 'escoamento'):
+                getattr(rede, campo)[novos] = getattr(anterior, campo)[antigos]
+        self._rede = rede
+
+    def __call__(self, sensores):
+        """
+        Leitura atual de cada sensor (lista alinhada a `sensores`; None quando a leitura se perdeu
+        ou o tipo não é simulado).
+        """
+        simulados = [sensor_info for sensor_info in sensores if sensor_info['TIPO_SENSOR'] in TIPOS_SIMULADOS]
+        if not simulados:
+            return [None] * len(sensores)
+        ids = np.array([sensor_info['SENSOR_ID'] for sensor_info in simulados])
+        tipos = np.array([sensor_info['TIPO_SENSOR'] for sensor_info in simulados], dtype=object)
+        if self._rede is None or not (np.array_equal(ids, self._rede.sensor_ids) and np.array_equal(tipos, self._rede.tipos)):
+            self._reconstruir(ids, tipos)
+        ids_lidos, valores, _, _ = self._rede.passo()
+        por_id = dict(zip(ids_lidos.tolist(), valores.tolist()))
+        return [por_id.get(sensor_info['SENSOR_ID']) for sensor_info in sensores]
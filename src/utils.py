@@ -1,12 +1,220 @@
 import psycopg2
+from psycopg2.pool import PoolError
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import streamlit as st
 import datetime
+import threading
 
-from src.bd_conection import get_postgres_connection
+from src.bd_conection import get_postgres_connection, conexao_postgres
+
+TAMANHO_BLOCO_PADRAO = 50_000
+# Leituras gravadas com atraso (lotes do ingestor, servidor de ingestão) chegam com timestamp
+# anterior à marca d'água; a busca incremental relê essa janela e descarta as já carregadas
+JANELA_REVISAO_PADRAO = datetime.timedelta(minutes=10)
+
+def _metadados_sensores():
+    """Tipo e localização de cada sensor, como categorias fixas para todos os blocos de uma leitura."""
+    with conexao_postgres() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT sensor_id, tipo_sensor, localizacao_geo FROM sensores_ambientais")
+            meta = pd.DataFrame(cursor.fetchall(), columns=['sensor_id', 'tipo', 'localizacao']).set_index('sensor_id')
+    meta['tipo'] = meta['tipo'].astype(pd.CategoricalDtype(sorted(meta['tipo'].dropna().unique())))
+    meta['localizacao'] = meta['localizacao'].astype(pd.CategoricalDtype(sorted(meta['localizacao'].dropna().unique())))
+    return meta
+
+def iterar_leituras_em_blocos(periodo_dias=30, tamanho_bloco=TAMANHO_BLOCO_PADRAO, inicio=None, com_id=False):
+    """
+    Gera as leituras do período em blocos de até `tamanho_bloco` linhas, usando um cursor
+    nomeado (no servidor): a memória do cliente fica limitada a um bloco por vez.
+    `inicio` (datetime) substitui `periodo_dias` e retorna só as leituras posteriores a ele.
+    Cada bloco tem as colunas de `obter_dados_leituras_sensores`, com 'Tipo Sensor',
+    'Localização' e 'Unidade' como categorias e 'Valor Lido' em float32; com `com_id`,
+    também 'LEITURA_ID'.
+    Erros de banco são propagados ao chamador.
+    """
+    if inicio is None:
+        inicio = datetime.datetime.now() - datetime.timedelta(days=periodo_dias)
+    meta = _metadados_sensores()
+    unidades = []
+
+    with conexao_postgres() as conn:
+        with conn.cursor(name='iterar_leituras_em_blocos') as cursor:
+            cursor.itersize = tamanho_bloco
+            # Só colunas estreitas trafegam; tipo e localização vêm dos metadados pelo SENSOR_ID
+            cursor.execute("""
+                SELECT timestamp_leitura, sensor_id, valor_lido::float8, unidade_medida, leitura_id
+                FROM leituras_sensores
+                WHERE timestamp_leitura > %s
+                ORDER BY timestamp_leitura ASC, leitura_id ASC
+            """, (inicio,))
+            while True:
+                linhas = cursor.fetchmany(tamanho_bloco)
+                if not linhas:
+                    break
+                timestamps, sensor_ids, valores, unidades_bloco, leitura_ids = zip(*linhas)
+                sensor_ids = np.asarray(sensor_ids, dtype=np.int32)
+                novas = set(unidades_bloco) - set(unidades) - {None}
+                if novas:
+                    unidades = sorted(set(unidades) | novas)
+                bloco = pd.DataFrame({
+                    'Timestamp': pd.to_datetime(pd.Series(timestamps)),
+                    'Tipo Sensor': meta['tipo'].reindex(sensor_ids).values,
+                    'Localização': meta['localizacao'].reindex(sensor_ids).values,
+                    'Valor Lido': np.asarray(valores, dtype=np.float32),
+                    'Unidade': pd.Categorical(unidades_bloco, categories=unidades),
+                })
+                if com_id:
+                    bloco['LEITURA_ID'] = np.asarray(leitura_ids, dtype=np.int64)
+                yield bloco
+
+def concatenar_blocos_leituras(blocos):
+    """Concatena blocos de leituras mantendo as colunas categóricas (une as categorias quando diferem)."""
+    blocos = [b for b in blocos if not b.empty]
+    if not blocos:
+        return pd.DataFrame(columns=['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade'])
+    if len(blocos) == 1:
+        return blocos[0].reset_index(drop=True)
+    df = pd.concat(blocos, ignore_index=True)
+    for coluna in ('Tipo Sensor', 'Localização', 'Unidade'):
+        if not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = union_categoricals([b[coluna].values for b in blocos], ignore_order=True)
+    return df
+
+def ler_leituras_em_blocos(periodo_dias=30, tamanho_bloco=TAMANHO_BLOCO_PADRAO, inicio=None, com_id=False):
+    """Lê o período inteiro com `iterar_leituras_em_blocos` e devolve um único DataFrame compacto."""
+    return concatenar_blocos_leituras(iterar_leituras_em_blocos(periodo_dias, tamanho_bloco, inicio, com_id))
+
+def _consultar_leituras(inicio):
+    """Leituras (com LEITURA_ID) mais novas que `inicio`, ou None (após exibir o erro) se a consulta falhar."""
+    try:
+        df = ler_leituras_em_blocos(inicio=inicio, com_id=True)
+        if 'LEITURA_ID' not in df:
+            df['LEITURA_ID'] = pd.Series(dtype=np.int64)
+        return df
+    except (psycopg2.Error, PoolError) as e:
+        st.error(f"Erro ao obter dados de leituras de sensores: {e}")
+        return None
+
+
+class CacheLeituras:
+    """
+    Cache de leituras do processo com marca d'água (watermark).
+    A primeira consulta (ou uma janela maior que a já carregada) busca o período inteiro;
+    as seguintes buscam as leituras mais novas que o maior timestamp já carregado menos
+    `janela_revisao`, descartam as que já estão no cache (pelo LEITURA_ID) e anexam o resto.
+    Assim entram também as leituras gravadas com atraso e timestamp anterior à marca d'água,
+    desde que dentro da janela. Leituras mais antigas que a maior janela já pedida são descartadas.
+    """
+
+    def __init__(self, janela_revisao=JANELA_REVISAO_PADRAO):
+        self.janela_revisao = janela_revisao
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._lock:
+            self._df = None
+            self._inicio = None
+            self._watermark = None
+            self._maior_periodo = datetime.timedelta(0)
+            self.hits = 0
+            self.misses = 0
+            self.linhas_buscadas = 0
+
+    def obter(self, periodo_dias):
+        agora = datetime.datetime.now()
+        periodo = datetime.timedelta(days=periodo_dias)
+        inicio_pedido = agora - periodo
+        with self._lock:
+            self._maior_periodo = max(self._maior_periodo, periodo)
+            if self._df is None or inicio_pedido < self._inicio:
+                novas = _consultar_leituras(inicio_pedido)
+                if novas is None:
+                    return pd.DataFrame()
+                self.misses += 1
+                self._df = novas
+                self._inicio = inicio_pedido
+            else:
+                revisao = self._watermark - self.janela_revisao
+                novas = _consultar_leituras(revisao)
+                if novas is None:
+                    return pd.DataFrame()
+                self.hits += 1
+                recentes = self._df['LEITURA_ID'][self._df['Timestamp'] > revisao]
+                novas = novas[~novas['LEITURA_ID'].isin(recentes)]
+                if not novas.empty:
+                    atrasadas = novas['Timestamp'].iloc[0] < self._watermark
+                    self._df = concatenar_blocos_leituras([self._df, novas])
+                    if atrasadas:
+                        self._df = self._df.sort_values('Timestamp', kind='stable', ignore_index=True)
+            self.linhas_buscadas += len(novas)
+            if not self._df.empty:
+                self._watermark = self._df['Timestamp'].iloc[-1]
+            elif self._watermark is None:
+                self._watermark = inicio_pedido
+
+            # Descarta o que ficou fora da maior janela já pedida
+            corte = agora - self._maior_periodo
+            if corte > self._inicio:
+                self._df = self._df[self._df['Timestamp'] > corte].reset_index(drop=True)
+                self._inicio = corte
+
+            return self._df.loc[self._df['Timestamp'] > inicio_pedido, self._df.columns != 'LEITURA_ID'].reset_index(drop=True)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "linhas_buscadas": self.linhas_buscadas,
+                "linhas_em_cache": 0 if self._df is None else len(self._df),
+                "watermark": self._watermark,
+            }
+
+
+_cache_leituras = CacheLeituras()
 
 def obter_dados_leituras_sensores(periodo_dias=30):
-    """Obtém leituras de sensores para um período específico."""
+    """Obtém leituras de sensores para um período específico (com cache incremental por marca d'água)."""
+    return _cache_leituras.obter(periodo_dias)
+
+def obter_estatisticas_cache_leituras():
+    """Contadores de hits/misses e linhas buscadas do cache de leituras."""
+    return _cache_leituras.estatisticas()
+
+def limpar_cache_leituras():
+    _cache_leituras.limpar()
+
+# Tabelas de agregados mantidas por trigger (ver scripts/sql/criar_tabelas.sql)
+AGREGADOS_LEITURAS = [
+    # (múltiplo de horas atendido, tabela, coluna do período)
+    (24, 'leituras_sensores_dia', 'dia'),
+    (1, 'leituras_sensores_hora', 'hora'),
+]
+
+def escolher_agregado_leituras(intervalo_horas):
+    """Retorna (tabela, coluna) do agregado mais grosso que atende ao intervalo, ou None para leituras brutas."""
+    if not intervalo_horas:
+        return None
+    for multiplo, tabela, coluna in AGREGADOS_LEITURAS:
+        if intervalo_horas % multiplo == 0:
+            return tabela, coluna
+    return None
+
+def obter_leituras_agregadas(periodo_dias=30, intervalo_horas=1):
+    """
+    Obtém a média das leituras de cada sensor em intervalos de `intervalo_horas`,
+    lendo o agregado horário ou diário em vez das leituras brutas.
+    Retorna as mesmas colunas de `obter_dados_leituras_sensores`, com um registro por sensor e intervalo.
+    Intervalos fracionários (ou zero) recaem nas leituras brutas.
+    """
+    agregado = escolher_agregado_leituras(intervalo_horas)
+    if agregado is None:
+        return obter_dados_leituras_sensores(periodo_dias)
+    tabela, coluna = agregado
+
     conn = get_postgres_connection()
     df_leituras = pd.DataFrame()
     if conn:
@@ -14,23 +222,25 @@ def obter_dados_leituras_sensores(periodo_dias=30):
             end_date = datetime.datetime.now()
             start_date = end_date - datetime.timedelta(days=periodo_dias)
 
+            # date_bin agrupa horas/dias em intervalos maiores; a média é ponderada pela contagem
             query = f"""
             SELECT
-                l.timestamp_leitura,
+                date_bin(make_interval(hours => %s), a.{coluna}, TIMESTAMP '2000-01-01') AS periodo,
                 s.tipo_sensor,
                 s.localizacao_geo,
-                l.valor_lido,
-                l.unidade_medida
-            FROM leituras_sensores l
-            JOIN sensores_ambientais s ON l.sensor_id = s.sensor_id
-            WHERE l.timestamp_leitura BETWEEN %s AND %s
-            ORDER BY l.timestamp_leitura ASC;
+                SUM(a.soma) / SUM(a.contagem) AS valor_medio,
+                MAX(a.unidade_medida) AS unidade_medida
+            FROM {tabela} a
+            JOIN sensores_ambientais s ON a.sensor_id = s.sensor_id
+            WHERE a.{coluna} BETWEEN %s AND %s
+            GROUP BY 1, a.sensor_id, s.tipo_sensor, s.localizacao_geo
+            ORDER BY 1 ASC;
             """
-            df_leituras = pd.read_sql(query, conn, params=(start_date, end_date))
+            df_leituras = pd.read_sql(query, conn, params=(int(intervalo_horas), start_date, end_date))
             df_leituras.columns = ['Timestamp', 'Tipo Sensor', 'Localização', 'Valor Lido', 'Unidade']
             df_leituras['Timestamp'] = pd.to_datetime(df_leituras['Timestamp'])
         except psycopg2.Error as e:
-            st.error(f"Erro ao obter dados de leituras de sensores: {e}")
+            st.error(f"Erro ao obter leituras agregadas de sensores: {e}")
         finally:
-            if conn: conn.close()
-    return df_leituras
\ No newline at end of file
+            conn.close()
+    return df_leituras